@@ -0,0 +1,96 @@
+"""Batch plan generation: one validation pass, vectorized mock costing, bounded concurrency"""
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # optional; costing falls back to plain Python
+    np = None
+
+MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', 1000))
+DEFAULT_BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 8))
+
+# Below this many budgets array setup costs more than it saves
+VECTORIZE_MIN_BATCH = 16
+
+# Share of the budget the mock planner assigns to each category
+MOCK_BUDGET_SHARES = {
+    "accommodation": 0.3,
+    "transportation": 0.25,
+    "food": 0.25,
+    "activities": 0.15,
+    "miscellaneous": 0.05
+}
+
+
+def mock_cost(budget):
+    """Total estimated cost and budget breakdown of a mock plan"""
+    return {
+        "total_estimated_cost": min(budget, budget * 0.95),
+        "budget_breakdown": {category: budget * share for category, share in MOCK_BUDGET_SHARES.items()}
+    }
+
+
+def mock_costs(budgets):
+    """mock_cost for a whole batch of budgets, computed as array arithmetic
+
+    Returns plain Python numbers, equal to what mock_cost gives one by one.
+    """
+    if np is None or len(budgets) < VECTORIZE_MIN_BATCH:
+        return [mock_cost(budget) for budget in budgets]
+
+    categories = list(MOCK_BUDGET_SHARES)
+    amounts = np.asarray(budgets, dtype=float)
+    totals = np.minimum(amounts, amounts * 0.95).tolist()
+    breakdowns = np.multiply.outer(amounts, np.array([MOCK_BUDGET_SHARES[c] for c in categories])).tolist()
+    return [
+        {"total_estimated_cost": total, "budget_breakdown": dict(zip(categories, breakdown))}
+        for total, breakdown in zip(totals, breakdowns)
+    ]
+
+
+def validate_batch(items, validate):
+    """Check every item of a batch in one pass
+
+    validate(item) returns an error message or None. Budget and travelers
+    must also be finite numbers (decimals such as "1500.5" included). Returns (valid, errors): valid is a list of
+    (index, item) pairs and errors maps index -> message.
+    """
+    valid = []
+    errors = {}
+    for index, item in enumerate(items):
+        error = validate(item) if isinstance(item, dict) else "Each plan input must be an object"
+        if error is None:
+            for field in ('budget', 'travelers'):
+                try:
+                    number = float(item[field])
+                except (TypeError, ValueError):
+                    number = None
+                if number is None or not math.isfinite(number):
+                    error = f"{field} must be a number"
+                    break
+        if error is None:
+            valid.append((index, item))
+        else:
+            errors[index] = error
+    return valid, errors
+
+
+def run_concurrently(fn, items, max_concurrency=DEFAULT_BATCH_CONCURRENCY):
+    """Call fn on every item with at most max_concurrency calls in flight
+
+    Returns one (result, error) pair per item, in order; an exception
+    raised for one item does not affect the others.
+    """
+    def call(item):
+        try:
+            return fn(item), None
+        except Exception as e:
+            print(f"Error in batch item: {e}")
+            return None, str(e) or e.__class__.__name__
+
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(items)))) as pool:
+        return list(pool.map(call, items))
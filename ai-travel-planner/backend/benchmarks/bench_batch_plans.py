@@ -0,0 +1,75 @@
+"""Plans per second for batch generation, from 1 to 1000 plans per batch
+
+Compares generating mock plans one request at a time (the loop a client
+calling /api/generate-plan N times causes) with generate_mock_travel_plans,
+which costs the whole batch in one vectorized pass, and with the full
+/api/generate-plans endpoint (validation, generation and storage).
+
+Run from the backend folder:
+    python benchmarks/bench_batch_plans.py
+    python benchmarks/bench_batch_plans.py --sizes 1 10 100 1000 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch
+import main as server
+
+DESTINATIONS = ['Goa', 'Kerala', 'Rajasthan', 'Agra, Goa', 'Himachal Pradesh', 'Paris']
+
+
+def make_inputs(size):
+    return [
+        {
+            "destinations": DESTINATIONS[i % len(DESTINATIONS)],
+            "budget": 500 + i,
+            "travelers": 1 + i % 4,
+            "start_date": "2024-03-01",
+            "end_date": "2024-03-04"
+        }
+        for i in range(size)
+    ]
+
+
+def best_rate(fn, size, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return size / best
+
+
+def logged_in_client():
+    client = server.app.test_client()
+    client.post('/api/register', json={
+        "name": "Bench", "email": "bench@example.com", "mobile": "9999999999",
+        "password": "benchpass", "confirm_password": "benchpass"
+    })
+    client.post('/api/login', json={"email": "bench@example.com", "password": "benchpass"})
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    client = logged_in_client()
+    print(f"numpy: {'yes' if batch.np is not None else 'no (plain Python costing)'}")
+    print(f"{'batch':>6} {'one by one (plans/s)':>21} {'batched (plans/s)':>18} {'endpoint (plans/s)':>19}")
+    for size in args.sizes:
+        inputs = make_inputs(size)
+        single = best_rate(lambda: [server.generate_mock_travel_plan(i) for i in inputs], size, args.repeat)
+        batched = best_rate(lambda: server.generate_mock_travel_plans(inputs), size, args.repeat)
+        endpoint = best_rate(lambda: client.post('/api/generate-plans', json=inputs), size, args.repeat)
+        print(f"{size:>6} {single:>21,.0f} {batched:>18,.0f} {endpoint:>19,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Worker cold start: startup time and first AI request latency per AI_WARMUP mode
+
+Each mode runs in a fresh Python process, which imports ai_service,
+builds the shared planner, idles for a while as a new worker would
+before its first request, then generates two plans. fake_genai answers
+instead of Gemini. Its import is slowed down to match the real
+google.generativeai import, which is measured when the SDK is installed
+and otherwise taken from --sdk-import-seconds.
+
+Run from the backend folder:
+    python benchmarks/bench_cold_start.py
+    python benchmarks/bench_cold_start.py --idle 0 --sdk-import-seconds 2
+"""
+import argparse
+import importlib.abc
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.join(BACKEND, 'benchmarks')
+MODES = ('off', 'background', 'eager')
+USER_INPUT = {"destinations": "Goa", "budget": 1500, "travelers": 2,
+              "start_date": "2024-03-01", "end_date": "2024-03-04"}
+
+
+class SlowFakeSDKFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """Imports fake_genai as google.generativeai, taking as long as the real SDK"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def find_spec(self, name, path, target=None):
+        if name == 'google.generativeai':
+            return importlib.util.spec_from_loader(name, self)
+        return None
+
+    def create_module(self, spec):
+        time.sleep(self.delay)
+        import fake_genai
+        return fake_genai
+
+    def exec_module(self, module):
+        sys.modules['google'].generativeai = module
+
+
+def measure_sdk_import():
+    """Seconds to import the real SDK in a fresh process, or None if not installed"""
+    code = ("import time; t = time.perf_counter(); import google.generativeai; "
+            "print(time.perf_counter() - t)")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def run_child(args):
+    sys.path[:0] = [BACKEND, BENCHMARKS]
+    import types
+    google = sys.modules.setdefault('google', types.ModuleType('google'))
+    google.__path__ = []
+    sys.meta_path.insert(0, SlowFakeSDKFinder(args.sdk_import_seconds))
+
+    started = time.perf_counter()
+    import ai_service
+    import_seconds = time.perf_counter() - started
+    ai_service.get_ai_planner()
+    startup_seconds = time.perf_counter() - started
+
+    time.sleep(args.idle)
+    planner = ai_service.get_ai_planner()
+    requests = []
+    for _ in range(2):
+        request_started = time.perf_counter()
+        planner.generate_travel_plan(dict(USER_INPUT), use_cache=False)
+        requests.append(time.perf_counter() - request_started)
+
+    print(json.dumps({
+        "import_seconds": import_seconds,
+        "startup_seconds": startup_seconds,
+        "first_request_seconds": requests[0],
+        "second_request_seconds": requests[1],
+        "cold_start": planner.cold_start
+    }))
+
+
+def run_mode(mode, args):
+    env = dict(os.environ, AI_WARMUP=mode, GEMINI_API_KEY='fake-key')
+    command = [sys.executable, os.path.abspath(__file__), '--child',
+               '--idle', str(args.idle), '--sdk-import-seconds', str(args.sdk_import_seconds)]
+    result = subprocess.run(command, capture_output=True, text=True, env=env, cwd=BACKEND)
+    if result.returncode != 0:
+        raise RuntimeError(f"{mode} run failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--idle', type=float, default=2.0,
+                        help='seconds between worker startup and its first request')
+    parser.add_argument('--sdk-import-seconds', type=float, default=None,
+                        help='simulated SDK import time (default: measured, else 1.5)')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    if args.sdk_import_seconds is None:
+        measured = measure_sdk_import()
+        if measured is None:
+            print("google.generativeai is not installed; simulating a 1.5s import")
+            args.sdk_import_seconds = 1.5
+        else:
+            print(f"google.generativeai imports in {measured:.2f}s")
+            args.sdk_import_seconds = measured
+
+    print(f"{'AI_WARMUP':<12} {'import (ms)':>12} {'startup (ms)':>13} "
+          f"{'1st request (ms)':>17} {'2nd request (ms)':>17}")
+    for mode in MODES:
+        result = run_mode(mode, args)
+        print(f"{mode:<12} {result['import_seconds'] * 1000:>12.1f} {result['startup_seconds'] * 1000:>13.1f} "
+              f"{result['first_request_seconds'] * 1000:>17.1f} {result['second_request_seconds'] * 1000:>17.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Destination dataset load and lookup cost as the dataset grows
+
+Pads the bundled dataset with synthetic destinations, compiles it, and
+times opening the compiled file, building the alias index, and matching
+every destination in a typical multi-destination string.
+
+Run from the backend folder:
+    python benchmarks/bench_destination_index.py
+    python benchmarks/bench_destination_index.py --sizes 10 1000 50000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from destinations import DEFAULT_DATASET, DestinationIndex, build_dataset_file, load_dataset
+
+QUERY = "Agra, UP, Rajasthan, Place 7 North, Goa beaches, Europe"
+
+
+def write_dataset(size, path):
+    """The bundled dataset padded with synthetic multi-word destinations"""
+    with open(DEFAULT_DATASET, encoding='utf-8') as f:
+        source = json.load(f)
+    template = source['destinations']['goa']
+    for i in range(max(0, size - len(source['destinations']))):
+        key = f"place {i} north"
+        source['destinations'][key] = dict(template, name=key.title())
+        source['aliases'][f"p{i}n"] = key
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(source, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000, 100000])
+    parser.add_argument('--lookups', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'destinations':>12} {'json (KB)':>10} {'bin (KB)':>9} {'open (ms)':>10} "
+          f"{'index (ms)':>11} {'find_all (us)':>14}  matches")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            source_path = os.path.join(tmp, 'destinations.json')
+            compiled_path = os.path.join(tmp, 'destinations.bin')
+            write_dataset(size, source_path)
+            build_dataset_file(source_path, compiled_path)
+
+            start = time.perf_counter()
+            dataset = load_dataset(compiled_path)
+            open_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            index = DestinationIndex(dataset, dataset.aliases)
+            index_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            for _ in range(args.lookups):
+                records = index.find_all(QUERY)
+            lookup_us = (time.perf_counter() - start) / args.lookups * 1e6
+
+            print(f"{size:>12} {os.path.getsize(source_path) / 1024:>10.0f} "
+                  f"{os.path.getsize(compiled_path) / 1024:>9.0f} {open_ms:>10.1f} {index_ms:>11.1f} "
+                  f"{lookup_us:>14.2f}  {', '.join(r['name'] for r in records)}")
+
+
+if __name__ == '__main__':
+    main()
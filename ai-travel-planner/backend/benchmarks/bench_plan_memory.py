@@ -0,0 +1,113 @@
+"""Memory per stored plan, plain dicts vs. compact PlanRecords
+
+Fills an in-memory PlanStore with mock plans spread over the bundled
+destinations (plus some unknown ones) and some repeat users, the way
+main.save_plan stores them. Memory is measured with tracemalloc. Every
+compact record is checked to read back exactly as stored.
+
+Run from the backend folder:
+    python benchmarks/bench_plan_memory.py
+    python benchmarks/bench_plan_memory.py --plans 100000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main as server
+from store import PlanStore
+
+DESTINATIONS = ['Goa', 'Kerala', 'Rajasthan', 'Uttar Pradesh', 'Himachal Pradesh',
+                'Agra, Goa', 'Paris', 'Kyoto']
+
+
+def make_plans(count):
+    """Plan records as main.save_plan builds them (generated once, reused)"""
+    generated = {}
+    plans = []
+    for i in range(count):
+        user_input = {
+            "destinations": DESTINATIONS[i % len(DESTINATIONS)],
+            "budget": 500 + (i % 40) * 100,
+            "travelers": 1 + i % 4,
+            "start_date": "2024-03-01",
+            "end_date": "2024-03-04",
+            "preferences": "Culture, food"
+        }
+        key = json.dumps(user_input, sort_keys=True)
+        if key not in generated:
+            generated[key] = server.generate_mock_travel_plan(user_input)
+        plans.append({
+            "id": i + 1,
+            "user_id": 1 + i % 5000,
+            # Round-trip through JSON so no two plans share objects up front,
+            # as with plans arriving from requests or another process
+            "user_input": json.loads(json.dumps(user_input)),
+            "ai_plan": json.loads(json.dumps(generated[key])),
+            "created_at": datetime.now().isoformat(),
+            "type": "ai_generated"
+        })
+    return plans
+
+
+def measure_memory(compact, count):
+    """Bytes held by a store of `count` plans; also checks they read back unchanged"""
+    gc.collect()
+    tracemalloc.start()
+    store = PlanStore(compact=compact)
+    source = make_plans(count)
+    for plan in source:
+        store.add(plan)
+    expected = [json.dumps(plan, sort_keys=True) for plan in source[:1000]]
+    del source
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    for i, text in enumerate(expected):
+        assert json.dumps(store.get(i + 1), sort_keys=True) == text, f"plan {i + 1} changed"
+    return store, current
+
+
+def measure_speed(compact, count):
+    """(add, get) time per plan in microseconds, without tracemalloc"""
+    source = make_plans(count)
+    store = PlanStore(compact=compact)
+    start = time.perf_counter()
+    for plan in source:
+        store.add(plan)
+    add_us = (time.perf_counter() - start) / count * 1e6
+    start = time.perf_counter()
+    for plan in source:
+        store.get(plan['id'])
+    get_us = (time.perf_counter() - start) / count * 1e6
+    return add_us, get_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--plans', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'store':<10} {'plans':>8} {'MB':>8} {'bytes/plan':>11} {'add (us)':>9} {'get (us)':>9}")
+    results = {}
+    for compact in (False, True):
+        store, current = measure_memory(compact, args.plans)
+        add_us, get_us = measure_speed(compact, min(args.plans, 20000))
+        name = 'compact' if compact else 'dicts'
+        results[name] = current / args.plans
+        print(f"{name:<10} {args.plans:>8} {current / 1e6:>8.1f} {current / args.plans:>11.0f} "
+              f"{add_us:>9.1f} {get_us:>9.1f}")
+        if compact:
+            print(f"shared pool entries: {len(store._pool)}")
+        del store
+    print(f"saved: {1 - results['compact'] / results['dicts']:.0%} per plan")
+
+if __name__ == '__main__':
+    main()
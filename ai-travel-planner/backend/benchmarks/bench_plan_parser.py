@@ -0,0 +1,99 @@
+"""Parse time and recovery rate for messy Gemini plan responses
+
+benchmarks/data/gemini_responses.jsonl holds responses showing the
+failure modes we get from the model: prose and fences around the JSON,
+truncation, trailing commas, comments, Python literals, raw newlines,
+currency strings. Each case lists the sections and number of itinerary
+days a correct parser should recover.
+
+The legacy extractor (find/rfind + json.loads, as _generate_ai_plan used
+to do) is compared with parse_plan_text, both whole-text and fed in
+small chunks the way streamed responses arrive.
+
+Run from the backend folder:
+    python benchmarks/bench_plan_parser.py
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plan_stream import PlanStreamParser, parse_plan_text
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gemini_responses.jsonl')
+
+
+def legacy_extract(response_text):
+    if '```json' in response_text:
+        json_start = response_text.find('```json') + 7
+        json_end = response_text.find('```', json_start)
+        response_text = response_text[json_start:json_end]
+    elif '{' in response_text:
+        json_start = response_text.find('{')
+        json_end = response_text.rfind('}') + 1
+        response_text = response_text[json_start:json_end]
+    try:
+        plan = json.loads(response_text)
+        return plan if isinstance(plan, dict) else {}
+    except ValueError:
+        return {}
+
+
+def streamed_extract(response_text, chunk_size=64):
+    parser = PlanStreamParser()
+    for i in range(0, len(response_text), chunk_size):
+        parser.feed(response_text[i:i + chunk_size])
+    return parser.finish()
+
+
+def recovered(case, plan):
+    """(items recovered, items expected) for sections plus itinerary days"""
+    expected = len(case['expected_sections']) + case['expected_days']
+    found = sum(1 for key in case['expected_sections'] if key in plan)
+    days = plan.get('itinerary') if isinstance(plan.get('itinerary'), list) else []
+    found += min(len(days), case['expected_days'])
+    return found, expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', default=CORPUS)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding='utf-8') as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+
+    extractors = {
+        "legacy": legacy_extract,
+        "parse_plan_text": lambda text: parse_plan_text(text)[0],
+        "streamed": streamed_extract
+    }
+
+    print(f"{'case':<28}" + ''.join(f"{name:>18}" for name in extractors))
+    totals = {name: [0, 0, 0.0] for name in extractors}
+    for case in cases:
+        row = f"{case['name']:<28}"
+        for name, extract in extractors.items():
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                plan = extract(case['text'])
+            elapsed_us = (time.perf_counter() - start) / args.repeat * 1e6
+            found, expected = recovered(case, plan)
+            totals[name][0] += found
+            totals[name][1] += expected
+            totals[name][2] += elapsed_us
+            row += f"{found:>5}/{expected:<3}{elapsed_us:>8.0f}us"
+        print(row)
+
+    print()
+    for name, (found, expected, elapsed_us) in totals.items():
+        rate = found / expected if expected else 1.0
+        print(f"{name:<16} recovery {rate:6.1%}   mean parse {elapsed_us / len(cases):8.0f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""NDJSON export and import of plans: throughput and peak memory
+
+Writes --plans generated plans to an NDJSON file, imports them into a
+fresh SQLite database with manage_plans.py, then exports them again:
+everything, one user's plans and one month of plans. Each step runs in
+its own process, and its peak RSS is read from the kernel when it exits.
+A process that only imports the modules gives the baseline. Peak RSS
+that stays the same from the smaller run to the 1M run shows memory
+does not grow with the number of plans.
+
+Run from the backend folder:
+    python benchmarks/bench_plan_transfer.py
+    python benchmarks/bench_plan_transfer.py --plans 10000 100000 --workdir /var/tmp
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from main import generate_mock_travel_plan
+
+USERS = 10000
+DESTINATIONS = ['Goa', 'Kerala', 'Rajasthan', 'Uttar Pradesh', 'Himachal Pradesh', 'Paris', 'Tokyo', 'Bali']
+START = datetime(2024, 1, 1)
+
+
+def write_plans(path, count):
+    """count plans spread over USERS users and one year, from a few templates"""
+    templates = []
+    for destination in DESTINATIONS:
+        user_input = {"destinations": destination, "budget": 1500, "travelers": 2,
+                      "start_date": "2024-03-01", "end_date": "2024-03-05", "preferences": "food, culture"}
+        templates.append((json.dumps(user_input, separators=(',', ':')),
+                          json.dumps(generate_mock_travel_plan(user_input), separators=(',', ':'))))
+    seconds_per_plan = 365 * 24 * 3600 / count
+    with open(path, 'w') as out:
+        for plan_id in range(1, count + 1):
+            user_input, ai_plan = templates[plan_id % len(templates)]
+            created_at = (START + timedelta(seconds=plan_id * seconds_per_plan)).isoformat()
+            out.write(f'{{"id":{plan_id},"user_id":{plan_id % USERS + 1},"user_input":{user_input},'
+                      f'"ai_plan":{ai_plan},"created_at":"{created_at}","type":"ai_generated"}}\n')
+
+
+def run(args, stdout=subprocess.DEVNULL):
+    """(seconds, peak RSS in MB) of a child process"""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable] + args, cwd=BACKEND, stdout=stdout)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode not in (0, 1):
+        raise RuntimeError(f"{' '.join(args)} exited with {process.returncode}")
+    # ru_maxrss is in kilobytes on Linux
+    return elapsed, usage.ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--plans', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--workdir', default=None, help="directory for the database and NDJSON files")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='plan-transfer-', dir=args.workdir)
+    try:
+        _, baseline = run(['-c', 'import manage_plans, main'])
+        print(f"baseline (modules imported): {baseline:.0f} MB peak RSS")
+        print(f"{'plans':>8} {'step':<14} {'exported':>9} {'seconds':>8} {'plans/s':>9} {'MB/s':>7} {'peak RSS MB':>12}")
+        for count in args.plans:
+            source = os.path.join(workdir, f'plans-{count}.ndjson')
+            database = os.path.join(workdir, f'plans-{count}.db')
+            exported = os.path.join(workdir, f'export-{count}.ndjson')
+            write_plans(source, count)
+            size = os.path.getsize(source) / 1e6
+
+            seconds, rss = run(['manage_plans.py', '--database', database, 'import', source])
+            print(f"{count:>8} {'import':<14} {'':>9} {seconds:>8.1f} {count / seconds:>9.0f} "
+                  f"{size / seconds:>7.1f} {rss:>12.0f}")
+
+            steps = [
+                ('export all', []),
+                ('export user', ['--user-id', '1']),
+                ('export month', ['--created-from', '2024-06-01', '--created-to', '2024-07-01'])
+            ]
+            for name, filters in steps:
+                with open(exported, 'wb') as out:
+                    seconds, rss = run(['manage_plans.py', '--database', database, 'export'] + filters, stdout=out)
+                with open(exported, 'rb') as lines:
+                    written = sum(1 for _ in lines)
+                if not filters and os.path.getsize(exported) != os.path.getsize(source):
+                    raise RuntimeError("exported NDJSON differs in size from the imported file")
+                print(f"{count:>8} {name:<14} {written:>9} {seconds:>8.1f} {written / seconds:>9.0f} "
+                      f"{os.path.getsize(exported) / 1e6 / seconds:>7.1f} {rss:>12.0f}")
+
+            for path in (source, database, exported):
+                os.remove(path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
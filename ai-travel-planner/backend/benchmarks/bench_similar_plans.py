@@ -0,0 +1,101 @@
+"""Similar-plan index at scale: build time, lookup latency and hit rate
+
+Indexes --plans requests drawn from a skewed workload (a handful of
+destinations get most of the traffic; budgets, group sizes, trip lengths
+and preferences cluster around typical values), one add() at a time as
+the service does. Then it replays fresh requests from the same workload
+at each --thresholds value, reporting the hit rate and lookup latency.
+The hottest destination holds the largest share of plans, so its
+latency is reported on its own as the worst case.
+
+Plans are stored as tiny stand-in documents; the memory reported is
+that of the feature arrays.
+
+Run from the backend folder:
+    python benchmarks/bench_similar_plans.py
+    python benchmarks/bench_similar_plans.py --plans 100000 --thresholds 0.8 0.9
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from similar_plans import SimilarPlanIndex
+
+DESTINATIONS = ['Goa', 'Kerala', 'Rajasthan', 'Uttar Pradesh', 'Himachal Pradesh'] + [
+    f"City {i}" for i in range(1, 46)
+]
+PREFERENCES = ['beaches', 'food', 'culture', 'history', 'nightlife', 'adventure', 'shopping',
+               'nature', 'relaxation', 'temples']
+START = date(2024, 3, 1)
+
+
+def make_request(rng, weights):
+    destination = rng.choices(DESTINATIONS, weights)[0]
+    days = rng.choice([2, 3, 3, 4, 4, 5, 5, 7, 10])
+    return {
+        "destinations": destination,
+        "budget": round(rng.lognormvariate(7.3, 0.4), -1) or 100,
+        "travelers": rng.choice([1, 2, 2, 2, 3, 4, 4, 6]),
+        "start_date": START.isoformat(),
+        "end_date": (START + timedelta(days=days - 1)).isoformat(),
+        "preferences": ', '.join(rng.sample(PREFERENCES, rng.choice([1, 2, 2, 3])))
+    }
+
+
+def percentile(sorted_samples, fraction):
+    return sorted_samples[min(len(sorted_samples) - 1, int(fraction * len(sorted_samples)))]
+
+
+def replay(index, requests):
+    hits = 0
+    latencies = []
+    for request in requests:
+        start = time.perf_counter()
+        match = index.find(request)
+        latencies.append(time.perf_counter() - start)
+        hits += match is not None
+    latencies.sort()
+    return hits / len(requests), [percentile(latencies, f) * 1000 for f in (0.5, 0.95, 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--plans', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.85, 0.9, 0.95])
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # Zipf-like: the first destinations get most requests
+    weights = [1 / (rank + 1) ** 1.2 for rank in range(len(DESTINATIONS))]
+    index = SimilarPlanIndex(threshold=args.thresholds[0], max_per_destination=args.plans)
+
+    requests = [make_request(rng, weights) for _ in range(args.plans)]
+    start = time.perf_counter()
+    for i, request in enumerate(requests):
+        index.add(request, '{"id":%d}' % i)
+    build = time.perf_counter() - start
+    del requests
+
+    stats = index.stats()
+    print(f"indexed {stats['size']} plans over {stats['destinations']} destinations in {build:.1f}s "
+          f"({build / args.plans * 1e6:.1f} us/add, feature arrays {stats['array_bytes'] / 1e6:.0f} MB)")
+
+    requests = [make_request(rng, weights) for _ in range(args.queries)]
+    hottest = [dict(request, destinations=DESTINATIONS[0]) for request in requests]
+    print(f"{'threshold':>9} {'hit rate':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'hot p95 ms':>11}")
+    for threshold in args.thresholds:
+        index.threshold = threshold
+        hit_rate, (p50, p95, p99) = replay(index, requests)
+        _, (_, hot_p95, _) = replay(index, hottest)
+        print(f"{threshold:>9.2f} {hit_rate:>9.1%} {p50:>8.2f} {p95:>8.2f} {p99:>8.2f} {hot_p95:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
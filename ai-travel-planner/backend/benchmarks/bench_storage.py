@@ -0,0 +1,86 @@
+"""Throughput of the memory and SQLite storage backends under concurrency
+
+Runs register, generate (store a plan) and list workloads on a thread pool
+against each backend and prints operations per second.
+
+Run from the backend folder:
+    python benchmarks/bench_storage.py
+    python benchmarks/bench_storage.py --threads 1 4 8 --ops 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import generate_mock_travel_plan
+from store import create_stores
+
+USER_INPUT = {"budget": 1500, "travelers": 2, "destinations": "Rajasthan", "preferences": "Culture"}
+
+
+def run_parallel(threads, ops, func):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(func, range(ops)))
+    return ops / (time.perf_counter() - start)
+
+
+def bench_backend(backend, threads, ops, database_path):
+    users, travel_plans = create_stores(backend, database_path)
+    ai_plan = generate_mock_travel_plan(USER_INPUT)
+
+    def register(i):
+        user_id = users.next_id()
+        users.add({
+            "id": user_id,
+            "name": f"User {user_id}",
+            "email": f"user{user_id}@example.com",
+            "mobile": "",
+            "password": "x",
+            "created_at": datetime.now().isoformat()
+        })
+
+    user_count = len(users)
+
+    def generate(i):
+        travel_plans.add({
+            "id": travel_plans.next_id(),
+            "user_id": i % user_count + 1,
+            "user_input": USER_INPUT,
+            "ai_plan": ai_plan,
+            "created_at": datetime.now().isoformat(),
+            "type": "ai_generated"
+        })
+
+    def list_plans(i):
+        travel_plans.page_for_user(i % user_count + 1, 20)
+
+    results = {"register": run_parallel(threads, ops, register)}
+    user_count = len(users)
+    results["generate"] = run_parallel(threads, ops, generate)
+    results["list"] = run_parallel(threads, ops, list_plans)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--ops', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'backend':>8} {'threads':>8} {'register/s':>12} {'generate/s':>12} {'list/s':>10}")
+    for threads in args.threads:
+        for backend in ('memory', 'sqlite'):
+            with tempfile.TemporaryDirectory() as tmp:
+                results = bench_backend(backend, threads, args.ops, os.path.join(tmp, 'bench.db'))
+            print(f"{backend:>8} {threads:>8} {results['register']:>12.0f} "
+                  f"{results['generate']:>12.0f} {results['list']:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
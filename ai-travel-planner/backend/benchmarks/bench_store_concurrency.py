@@ -0,0 +1,111 @@
+"""Multi-threaded stress test of the in-memory UserStore and PlanStore
+
+Each thread registers its own users and then creates, reads and deletes
+plans for them, taking every id from next_id() as main.py does. After each
+run the stores are checked: no id was handed out twice, deleted ids were
+never reused, and every user's plan index matches the plans stored.
+Throughput is reported per thread count, with the plan store split into
+--stripes partitions and, for comparison, with a single lock.
+
+Run from the backend folder:
+    python benchmarks/bench_store_concurrency.py
+    python benchmarks/bench_store_concurrency.py --threads 1 4 16 64 --ops 20000
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import generate_mock_travel_plan
+from store import PlanStore, UserStore
+
+USERS_PER_THREAD = 8
+USER_INPUT = {"budget": 1500, "travelers": 2, "destinations": "Goa", "preferences": "Beaches"}
+
+
+def worker(number, users, plans, ops, ai_plan, barrier, issued):
+    user_ids = []
+    for i in range(USERS_PER_THREAD):
+        user_id = users.next_id()
+        users.add({"id": user_id, "name": f"User {number}.{i}", "email": f"t{number}u{i}@example.com",
+                   "mobile": "", "password": "x", "created_at": ""})
+        user_ids.append(user_id)
+
+    barrier.wait()
+    kept = []
+    for op in range(ops):
+        user_id = user_ids[op % USERS_PER_THREAD]
+        plan_id = plans.next_id()
+        issued.append(plan_id)
+        plans.add({"id": plan_id, "user_id": user_id, "user_input": USER_INPUT,
+                   "ai_plan": ai_plan, "created_at": "", "type": "ai_generated"})
+        assert plans.get(plan_id, user_id=user_id)['id'] == plan_id
+        # Delete every other plan so later ids would collide if ids were reused
+        if op % 2:
+            assert plans.remove(plan_id)['id'] == plan_id
+        else:
+            kept.append((user_id, plan_id))
+    return user_ids, kept
+
+
+def check(users, plans, results, issued, expected_users):
+    assert len(set(issued)) == len(issued), "duplicate plan ids"
+    all_user_ids = [user_id for user_ids, _ in results for user_id in user_ids]
+    assert len(set(all_user_ids)) == len(all_user_ids) == expected_users, "duplicate user ids"
+    assert len(users) == expected_users
+
+    kept = {}
+    for _, pairs in results:
+        for user_id, plan_id in pairs:
+            kept.setdefault(user_id, []).append(plan_id)
+    assert len(plans) == sum(len(ids) for ids in kept.values()), "plan count mismatch"
+    for user_id, plan_ids in kept.items():
+        listed = [plan['id'] for plan in plans.list_for_user(user_id)]
+        assert listed == sorted(plan_ids), f"plan index of user {user_id} is wrong"
+
+
+def run(threads, ops, stripes, ai_plan):
+    users, plans = UserStore(), PlanStore(stripes=stripes)
+    barrier = threading.Barrier(threads + 1)
+    issued = []
+    results = [None] * threads
+
+    def target(number):
+        results[number] = worker(number, users, plans, ops // threads, ai_plan, barrier, issued)
+
+    pool = [threading.Thread(target=target, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    if any(result is None for result in results):
+        raise RuntimeError("a worker thread failed")
+    check(users, plans, results, issued, threads * USERS_PER_THREAD)
+    # add + get (+ remove for half of them)
+    return (ops // threads) * threads * 2.5 / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--ops', type=int, default=20000, help="plans created per run")
+    parser.add_argument('--stripes', type=int, default=16)
+    args = parser.parse_args()
+
+    ai_plan = generate_mock_travel_plan(USER_INPUT)
+    print(f"{'threads':>7} {'ops/s (' + str(args.stripes) + ' stripes)':>20} {'ops/s (1 lock)':>15}  ids")
+    for threads in args.threads:
+        striped = run(threads, args.ops, args.stripes, ai_plan)
+        single = run(threads, args.ops, 1, ai_plan)
+        print(f"{threads:>7} {striped:>20.0f} {single:>15.0f}  unique")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Plan latency under upstream faults, with and without the resilience layer
+
+fake_genai answers instead of Gemini, with a fault injected per
+scenario: a slow tail, a share of hung calls, random errors and a full
+outage. Each scenario is run with each policy:
+
+- none: one attempt, no timeout, no circuit breaker (the old behaviour)
+- retry: per-attempt timeout, jittered retries and the circuit breaker
+- hedge: as retry, plus a duplicate request after the p95 latency
+
+Every request has its own notes, so none is coalesced with another or
+served from cache. Reported per run: latency percentiles, the share of
+plans that came from Gemini rather than the mock fallback, and how many
+calls reached the fake upstream.
+
+Run from the backend folder:
+    python benchmarks/bench_upstream_faults.py
+    python benchmarks/bench_upstream_faults.py --requests 400 --scenarios tail hung --policies none hedge
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+os.environ.setdefault('GEMINI_API_KEY', 'fake-key')
+
+import fake_genai
+
+fake_genai.install()
+
+from ai_service import AITravelPlanner
+from metrics import MOCK_FALLBACKS
+from resilience import CircuitBreaker, ResilientCaller, parse_hedge_after
+
+BASE = {"latency": 0.2, "jitter": 0.05, "error_rate": 0.0, "slow_rate": 0.0, "slow_latency": 0.0}
+SCENARIOS = {
+    "healthy": {},
+    "tail": {"slow_rate": 0.05, "slow_latency": 2.0},
+    "hung": {"slow_rate": 0.2, "slow_latency": 10.0},
+    "flaky": {"error_rate": 0.2},
+    "outage": {"error_rate": 1.0}
+}
+POLICIES = ('none', 'retry', 'hedge')
+FALLBACK_REASONS = ('error', 'timeout', 'circuit_open')
+
+
+def make_caller(policy, timeout):
+    if policy == 'none':
+        return ResilientCaller(timeout=0, deadline=0, retries=0)
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=2.0)
+    hedge_after = parse_hedge_after('p95') if policy == 'hedge' else None
+    return ResilientCaller(timeout=timeout, retries=2, backoff=0.1, hedge_after=hedge_after, breaker=breaker)
+
+
+def percentile(sorted_samples, fraction):
+    return sorted_samples[min(len(sorted_samples) - 1, int(fraction * len(sorted_samples)))]
+
+
+def run(scenario, policy, args):
+    fake_genai.configure(**dict(BASE, **SCENARIOS[scenario]))
+    fake_genai.seed(args.seed)
+    fake_genai.reset_stats()
+    planner = AITravelPlanner()
+    planner.upstream = make_caller(policy, args.timeout)
+    fallbacks_before = sum(MOCK_FALLBACKS.value(reason=reason) for reason in FALLBACK_REASONS)
+
+    def one(i):
+        user_input = {"destinations": "Goa", "budget": 1500, "travelers": 2, "notes": f"request {i}",
+                      "start_date": "2024-03-01", "end_date": "2024-03-03"}
+        started = time.perf_counter()
+        planner.generate_travel_plan(user_input, use_cache=False)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    # Failed calls print an error each; keep the table readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            latencies = sorted(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    fallbacks = sum(MOCK_FALLBACKS.value(reason=reason) for reason in FALLBACK_REASONS) - fallbacks_before
+    stats = planner.upstream.stats()
+    return {
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "ai": 1 - fallbacks / args.requests,
+        "calls": fake_genai.stats['calls'],
+        "opened": stats['circuit_opened'],
+        "elapsed": elapsed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--timeout', type=float, default=1.0, help="per-attempt timeout of retry/hedge")
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--policies', nargs='+', choices=POLICIES, default=list(POLICIES))
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{args.requests} plans per run, {args.concurrency} concurrent, "
+          f"upstream latency {BASE['latency'] * 1000:.0f} +/- {BASE['jitter'] * 1000:.0f} ms")
+    print(f"{'scenario':<9} {'policy':<6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'from AI':>8} "
+          f"{'calls':>6} {'opened':>6} {'wall s':>7}")
+    for scenario in args.scenarios:
+        for policy in args.policies:
+            result = run(scenario, policy, args)
+            print(f"{scenario:<9} {policy:<6} {result['p50']:>8.0f} {result['p95']:>8.0f} {result['p99']:>8.0f} "
+                  f"{result['ai']:>8.1%} {result['calls']:>6} {result['opened']:>6} {result['elapsed']:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
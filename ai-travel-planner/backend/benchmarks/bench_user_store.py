@@ -0,0 +1,60 @@
+"""Lookup latency of UserStore from 1k to 1M users
+
+Run from the backend folder:
+    python benchmarks/bench_user_store.py
+    python benchmarks/bench_user_store.py --sizes 1000 10000 --lookups 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import UserStore
+
+
+def build_store(size):
+    store = UserStore()
+    for i in range(1, size + 1):
+        store.add({
+            "id": i,
+            "name": f"User {i}",
+            "email": f"user{i}@example.com",
+            "mobile": f"{9000000000 + i}",
+            "password": "x",
+            "created_at": ""
+        })
+    return store
+
+
+def time_lookups(func, keys):
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--lookups', type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'users':>10} {'by id (ns)':>12} {'by email (ns)':>14} {'by mobile (ns)':>15}")
+    for size in args.sizes:
+        store = build_store(size)
+        ids = [rng.randint(1, size) for _ in range(args.lookups)]
+        emails = [f"User{i}@Example.com " for i in ids]
+        mobiles = [f"{9000000000 + i}" for i in ids]
+
+        print(f"{size:>10} "
+              f"{time_lookups(store.get, ids):>12.0f} "
+              f"{time_lookups(store.find_by_email, emails):>14.0f} "
+              f"{time_lookups(store.find_by_mobile, mobiles):>15.0f}")
+
+
+if __name__ == '__main__':
+    main()
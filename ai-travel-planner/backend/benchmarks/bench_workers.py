@@ -0,0 +1,146 @@
+"""Throughput of serve.py as the number of worker processes grows
+
+For each worker count, starts serve.py on a fresh SQLite database, then
+drives it from --clients client processes with --threads threads each
+for --duration seconds. Every client thread logs in once, then repeats
+generate-plan, list-plans and a read of /api/user. Requests go through
+the server-side session store, so sessions are checked by every worker.
+
+Throughput can only grow with workers while there are idle cores for them
+(and for the clients, which run on the same machine).
+
+Run from the backend folder:
+    python benchmarks/bench_workers.py
+    python benchmarks/bench_workers.py --workers 1 2 4 8 --duration 20
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from load_test import DESTINATIONS, HttpClient
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers, port, database_path):
+    env = dict(os.environ, STORAGE_BACKEND='sqlite', DATABASE_PATH=database_path, SESSION_BACKEND='sqlite',
+               SECRET_KEY='bench', RATE_LIMIT_USER_PER_MINUTE='0', RATE_LIMIT_GLOBAL_PER_MINUTE='0',
+               MAX_CONCURRENT_GENERATIONS='0', MAX_CONCURRENT_GENERATIONS_PER_USER='0')
+    process = subprocess.Popen(
+        [sys.executable, 'serve.py', '--workers', str(workers), '--port', str(port)],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"serve.py with {workers} workers did not start")
+
+
+def client_thread(base_url, name, deadline, counts):
+    client = HttpClient(base_url)
+    rng = random.Random(name)
+    email = f"{name}@example.com"
+    client.request('POST', '/api/register', {
+        "name": name, "email": email, "password": "bench123", "confirm_password": "bench123"
+    })
+    status, _ = client.request('POST', '/api/login', {"email": email, "password": "bench123"})
+    if status != 200:
+        counts['errors'] += 1
+        return
+
+    while time.monotonic() < deadline:
+        for method, path, body in (
+            ('POST', '/api/generate-plan', {"destinations": rng.choice(DESTINATIONS),
+                                            "budget": rng.randint(300, 5000), "travelers": 2}),
+            ('GET', '/api/plans?limit=10&fields=summary', None),
+            ('GET', '/api/user', None)
+        ):
+            status, _ = client.request(method, path, body)
+            counts['requests'] += 1
+            if status not in (200, 201):
+                counts['errors'] += 1
+
+
+def client_process(base_url, run_id, number, threads, duration, results):
+    import threading
+
+    deadline = time.monotonic() + duration
+    counts = [{"requests": 0, "errors": 0} for _ in range(threads)]
+    workers = [
+        threading.Thread(target=client_thread, args=(base_url, f"w{run_id}c{number}t{i}", deadline, counts[i]))
+        for i in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    results.put((sum(c['requests'] for c in counts), sum(c['errors'] for c in counts)))
+
+
+def bench(workers, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        server = start_server(workers, port, os.path.join(tmp, 'bench.db'))
+        try:
+            results = multiprocessing.Queue()
+            run_id = f"{workers}x{int(time.time())}"
+            clients = [
+                multiprocessing.Process(target=client_process, args=(
+                    f"http://127.0.0.1:{port}", run_id, n, args.threads, args.duration, results
+                ))
+                for n in range(args.clients)
+            ]
+            start = time.perf_counter()
+            for client in clients:
+                client.start()
+            totals = [results.get() for _ in clients]
+            elapsed = time.perf_counter() - start
+            for client in clients:
+                client.join()
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+    requests = sum(t[0] for t in totals)
+    return requests / elapsed, sum(t[1] for t in totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=4, help="client processes")
+    parser.add_argument('--threads', type=int, default=8, help="threads per client process")
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} client processes x {args.threads} threads, {args.duration:.0f}s each")
+    print(f"{'workers':>7} {'req/s':>9} {'speedup':>8} {'errors':>7}")
+    baseline = None
+    for workers in args.workers:
+        rps, errors = bench(workers, args)
+        baseline = baseline or rps
+        print(f"{workers:>7} {rps:>9.1f} {rps / baseline:>7.2f}x {errors:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""Local stand-in for google.generativeai, for benchmarks and load tests
+
+install() registers this module as google.generativeai, so ai_service
+talks to it instead of Gemini. GenerativeModel.generate_content answers
+with a well-formed travel plan after a configurable delay, fails at a
+configurable rate, stalls for slow_latency on a slow_rate share of
+calls (a hung or overloaded upstream), and sizes its output with the
+days/activities settings. Streamed calls yield the same text in chunks.
+
+    import fake_genai
+    fake_genai.install(latency=0.2, jitter=0.05, error_rate=0.01, days=5)
+    from ai_service import ai_planner
+"""
+import json
+import random
+import sys
+import threading
+import time
+import types
+
+settings = {
+    "latency": 0.0,       # seconds before the response (or first chunk)
+    "jitter": 0.0,        # +/- seconds added uniformly to latency
+    "error_rate": 0.0,    # fraction of calls raising FakeUpstreamError
+    "slow_rate": 0.0,     # fraction of calls taking slow_latency instead
+    "slow_latency": 0.0,  # seconds for those slow calls
+    "days": 3,            # itinerary days in each plan
+    "activities": 4,      # activities per day
+    "chunk_size": 64,     # characters per streamed chunk
+    "chunk_latency": 0.0  # seconds before each later streamed chunk
+}
+
+stats = {"calls": 0, "errors": 0}
+_lock = threading.Lock()
+_random = random.Random()
+
+
+class FakeUpstreamError(Exception):
+    """Raised for the share of calls selected by error_rate"""
+
+
+def configure(api_key=None, **behavior):
+    """Accepts genai.configure(api_key=...); other keywords update settings"""
+    unknown = set(behavior) - set(settings)
+    if unknown:
+        raise TypeError(f"Unknown fake_genai settings: {', '.join(sorted(unknown))}")
+    settings.update(behavior)
+
+
+def seed(value):
+    _random.seed(value)
+
+
+def install(**behavior):
+    """Make `import google.generativeai` return this module"""
+    configure(**behavior)
+    module = sys.modules[__name__]
+    google = sys.modules.get('google')
+    if google is None:
+        google = sys.modules['google'] = types.ModuleType('google')
+        google.__path__ = []
+    google.generativeai = module
+    sys.modules['google.generativeai'] = module
+    return module
+
+
+def reset_stats():
+    with _lock:
+        stats.update(calls=0, errors=0)
+
+
+def plan_text(destination="Goa", days=None, activities=None):
+    """A model-style response: a short intro and the plan JSON in a fence"""
+    days = settings['days'] if days is None else days
+    activities = settings['activities'] if activities is None else activities
+    plan = {
+        "destination": {"name": destination, "country": "India", "description": f"A trip to {destination}"},
+        "itinerary": [
+            {
+                "day": day,
+                "title": f"Day {day} in {destination}",
+                "activities": [f"Activity {day}.{i}" for i in range(1, activities + 1)],
+                "estimated_cost": 100 + 10 * day
+            }
+            for day in range(1, days + 1)
+        ],
+        "accommodation": {"type": "Hotel", "estimated_cost_per_night": 80, "recommendations": ["Hotel A", "Hotel B"]},
+        "transportation": {"type": "Train", "estimated_cost": 200, "recommendations": "Book early"},
+        "total_estimated_cost": 900,
+        "budget_breakdown": {"accommodation": 300, "transportation": 200, "food": 200, "activities": 150, "miscellaneous": 50},
+        "tips": ["Carry cash", "Start early"],
+        "best_time_to_visit": "October to March",
+        "local_cuisine": ["Thali", "Chai"],
+        "cultural_highlights": ["Temples", "Markets"]
+    }
+    return "Here is your travel plan:\n```json\n" + json.dumps(plan, indent=2) + "\n```\n"
+
+
+class UsageMetadata:
+    def __init__(self, prompt, text):
+        self.prompt_token_count = max(1, len(prompt) // 4)
+        self.candidates_token_count = max(1, len(text) // 4)
+        self.cached_content_token_count = 0
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class Response:
+    def __init__(self, prompt, text):
+        self.text = text
+        self.usage_metadata = UsageMetadata(prompt, text)
+
+
+class StreamedResponse:
+    def __init__(self, prompt, text):
+        self._text = text
+        self.usage_metadata = UsageMetadata(prompt, text)
+
+    def __iter__(self):
+        size = settings['chunk_size']
+        for i in range(0, len(self._text), size):
+            if i:
+                time.sleep(settings['chunk_latency'])
+            yield Chunk(self._text[i:i + size])
+
+
+class GenerativeModel:
+    def __init__(self, model_name='gemini-pro', **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        with _lock:
+            stats['calls'] += 1
+            fail = _random.random() < settings['error_rate']
+            delay = settings['latency'] + _random.uniform(-settings['jitter'], settings['jitter'])
+            if _random.random() < settings['slow_rate']:
+                delay = settings['slow_latency']
+        time.sleep(max(0.0, delay))
+        if fail:
+            with _lock:
+                stats['errors'] += 1
+            raise FakeUpstreamError("fake upstream error")
+
+        prompt = str(prompt)
+        text = plan_text(_destination(prompt))
+        return StreamedResponse(prompt, text) if stream else Response(prompt, text)
+
+
+def _destination(prompt):
+    for line in prompt.splitlines():
+        if line.startswith('Destinations:'):
+            return line.split(':', 1)[1].strip() or "Goa"
+    return "Goa"
@@ -0,0 +1,307 @@
+"""End-to-end load test of the Flask API: register, login, generate, list, delete
+
+Each virtual user registers, logs in and then repeats generate-plan,
+list-plans and delete-plan. Users run on --concurrency threads. The
+report gives throughput and p50/p95/p99 latency per endpoint. Results are
+also written as JSON, and --baseline compares them with an earlier run.
+
+Modes:
+    inprocess  drive main.app through Flask's test client (default)
+    live       drive a running server at --url
+    serve      start main.app on --port for live runs
+
+With --generator ai, plans come from ai_service backed by fake_genai (a
+local stand-in for Gemini) instead of the mock generator. --latency,
+--jitter, --error-rate and --days shape its responses.
+
+Run from the backend folder:
+    python benchmarks/load_test.py --users 50 --concurrency 10
+    python benchmarks/load_test.py --generator ai --latency 0.2 --error-rate 0.05
+    python benchmarks/load_test.py --mode serve --generator ai --latency 0.2 &
+    python benchmarks/load_test.py --mode live --url http://127.0.0.1:5001
+    python benchmarks/load_test.py --baseline benchmarks/results/previous.json
+"""
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+DESTINATIONS = ['Goa', 'Kerala', 'Rajasthan', 'Himachal Pradesh', 'Agra, Goa', 'Paris']
+ENDPOINTS = ['register', 'login', 'generate-plan', 'list-plans', 'delete-plan']
+
+
+class InProcessClient:
+    """Requests through Flask's test client; keeps its own session cookie"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self.client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpClient:
+    """Requests to a running server over HTTP, with a cookie jar per user"""
+
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            req.add_header('Content-Type', 'application/json')
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                status, raw = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, raw = e.code, e.read()
+        except OSError:
+            return 0, None
+        try:
+            return status, json.loads(raw)
+        except ValueError:
+            return status, None
+
+
+class Recorder:
+    """Latency samples and error counts per endpoint"""
+
+    def __init__(self):
+        self.samples = {name: [] for name in ENDPOINTS}
+        self.errors = {name: 0 for name in ENDPOINTS}
+        self._lock = threading.Lock()
+
+    def timed(self, client, name, method, path, body=None, expect=(200, 201)):
+        start = time.perf_counter()
+        status, data = client.request(method, path, body)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.samples[name].append(elapsed)
+            if status not in expect:
+                self.errors[name] += 1
+        return status, data
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    rank = min(len(sorted_samples), max(1, math.ceil(fraction * len(sorted_samples)))) - 1
+    return sorted_samples[rank]
+
+
+def run_user(make_client, recorder, user_number, run_id, args):
+    client = make_client()
+    rng = random.Random(user_number)
+    email = f"load{run_id}u{user_number}@example.com"
+    password = "loadtest123"
+
+    recorder.timed(client, 'register', 'POST', '/api/register', {
+        "name": f"Load User {user_number}",
+        "email": email,
+        "mobile": str(6000000000 + (run_id * 100000 + user_number) % 4000000000),
+        "password": password,
+        "confirm_password": password
+    })
+    status, _ = recorder.timed(client, 'login', 'POST', '/api/login', {"email": email, "password": password})
+    if status != 200:
+        return
+
+    for _ in range(args.iterations):
+        plan_input = {
+            "destinations": rng.choice(DESTINATIONS),
+            "budget": rng.randint(300, 5000),
+            "travelers": rng.randint(1, 4),
+            "start_date": "2024-03-01",
+            "end_date": "2024-03-04"
+        }
+        if not args.cache:
+            plan_input['no_cache'] = True
+        status, plan = recorder.timed(client, 'generate-plan', 'POST', '/api/generate-plan', plan_input)
+        recorder.timed(client, 'list-plans', 'GET', f'/api/plans?limit={args.page_size}')
+        if status == 201 and plan:
+            recorder.timed(client, 'delete-plan', 'DELETE', f"/api/plans/{plan['id']}")
+
+
+def use_fake_ai(args):
+    """Make main serve plans from ai_service talking to fake_genai (call before importing main)"""
+    import fake_genai
+
+    fake_genai.install(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, days=args.days)
+    fake_genai.seed(args.seed)
+    os.environ['GEMINI_API_KEY'] = 'fake-key'
+
+
+def load_app(args):
+    if not args.rate_limits:
+        # Measure the app, not admission control, unless asked to
+        for name in ('RATE_LIMIT_USER_PER_MINUTE', 'RATE_LIMIT_GLOBAL_PER_MINUTE',
+                     'MAX_CONCURRENT_GENERATIONS', 'MAX_CONCURRENT_GENERATIONS_PER_USER'):
+            os.environ.setdefault(name, '0')
+    if args.generator == 'ai':
+        use_fake_ai(args)
+    else:
+        # The mock generator, even with a key in the environment or .env
+        os.environ['GEMINI_API_KEY'] = ''
+    import main as server
+
+    return server, server.ai_planner
+
+
+def summarize(recorder, duration):
+    endpoints = {}
+    for name in ENDPOINTS:
+        samples = sorted(recorder.samples[name])
+        if not samples:
+            continue
+        endpoints[name] = {
+            "count": len(samples),
+            "errors": recorder.errors[name],
+            "throughput_rps": round(len(samples) / duration, 2),
+            "mean_ms": round(sum(samples) / len(samples) * 1000, 2),
+            "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+            "max_ms": round(samples[-1] * 1000, 2)
+        }
+    total = sum(e['count'] for e in endpoints.values())
+    return {
+        "duration_s": round(duration, 3),
+        "total_requests": total,
+        "total_errors": sum(e['errors'] for e in endpoints.values()),
+        "throughput_rps": round(total / duration, 2),
+        "endpoints": endpoints
+    }
+
+
+def print_report(summary):
+    print(f"{'endpoint':<14} {'count':>7} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, e in summary['endpoints'].items():
+        print(f"{name:<14} {e['count']:>7} {e['errors']:>7} {e['throughput_rps']:>9.1f} "
+              f"{e['p50_ms']:>9.2f} {e['p95_ms']:>9.2f} {e['p99_ms']:>9.2f} {e['max_ms']:>9.2f}")
+    print(f"\n{summary['total_requests']} requests, {summary['total_errors']} errors in "
+          f"{summary['duration_s']:.2f}s ({summary['throughput_rps']:.1f} req/s)")
+
+
+def compare(summary, baseline, max_regression):
+    """Print p95 and throughput changes against a baseline; True if p95 regressed"""
+    regressed = False
+    print(f"\n{'endpoint':<14} {'p95 before':>11} {'p95 now':>9} {'change':>8} {'req/s change':>13}")
+    for name, now in summary['endpoints'].items():
+        before = baseline['summary']['endpoints'].get(name)
+        if not before:
+            continue
+        p95_change = (now['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+        rps_change = (now['throughput_rps'] - before['throughput_rps']) / before['throughput_rps'] if before['throughput_rps'] else 0.0
+        flag = '  REGRESSION' if p95_change > max_regression else ''
+        regressed = regressed or bool(flag)
+        print(f"{name:<14} {before['p95_ms']:>11.2f} {now['p95_ms']:>9.2f} {p95_change:>+8.1%} {rps_change:>+13.1%}{flag}")
+    return regressed
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def serve(args):
+    server, _ = load_app(args)
+    print(f"Load test server ({args.generator} generator) on http://127.0.0.1:{args.port}")
+    server.app.run(port=args.port, threaded=True, debug=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=['inprocess', 'live', 'serve'], default='inprocess')
+    parser.add_argument('--url', default='http://127.0.0.1:5001')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=5, help="generate/list/delete rounds per user")
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--cache', action='store_true', help="let identical inputs hit the plan cache")
+    parser.add_argument('--rate-limits', action='store_true', help="keep admission control on (inprocess/serve)")
+    parser.add_argument('--generator', choices=['mock', 'ai'], default='mock')
+    parser.add_argument('--latency', type=float, default=0.05, help="fake Gemini latency (s)")
+    parser.add_argument('--jitter', type=float, default=0.01, help="fake Gemini latency jitter (s)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fake Gemini error rate (0-1)")
+    parser.add_argument('--days', type=int, default=3, help="itinerary days per fake response")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="results JSON path (default: benchmarks/results/)")
+    parser.add_argument('--baseline', help="results JSON of an earlier run to compare with")
+    parser.add_argument('--max-regression', type=float, default=0.2, help="allowed p95 increase vs. baseline")
+    args = parser.parse_args()
+
+    if args.mode == 'serve':
+        serve(args)
+        return
+
+    planner = None
+    if args.mode == 'inprocess':
+        server, planner = load_app(args)
+        make_client = lambda: InProcessClient(server.app)
+    else:
+        make_client = lambda: HttpClient(args.url)
+
+    recorder = Recorder()
+    run_id = int(time.time()) % 100000
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(run_user, make_client, recorder, n, run_id, args) for n in range(args.users)]
+        for future in futures:
+            future.result()
+    summary = summarize(recorder, time.perf_counter() - start)
+
+    print_report(summary)
+    if planner is not None:
+        import fake_genai
+        print(f"fake Gemini: {fake_genai.stats['calls']} calls, {fake_genai.stats['errors']} errors")
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "commit": git_commit(),
+        "config": vars(args),
+        "summary": summary
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load_test_{args.mode}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            if compare(summary, json.load(f), args.max_regression):
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+"""Compile the destination dataset into its memory-mapped format
+
+Usage (from the backend folder):
+    python build_destinations.py
+    python build_destinations.py path/to/destinations.json path/to/destinations.bin
+
+The server compiles data/destinations.json on first use if the compiled
+file is missing or stale; run this at deploy time to do it ahead of time.
+"""
+import argparse
+import os
+
+from destinations import DEFAULT_DATASET, DestinationDataset, build_dataset_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source', nargs='?', default=DEFAULT_DATASET)
+    parser.add_argument('output', nargs='?')
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.source)[0] + '.bin'
+    size = build_dataset_file(args.source, output)
+    dataset = DestinationDataset.open(output)
+
+    print(f"✅ {len(dataset)} destinations, {len(dataset.aliases)} aliases")
+    print(f"   {os.path.getsize(args.source):,} bytes -> {size:,} bytes ({output})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""Destination dataset: compiled on-disk format, lazy loader and alias index
+
+The source of truth is data/destinations.json:
+
+    {"destinations": {key: record, ...}, "aliases": {alias: key, ...}}
+
+It is compiled (see build_destinations.py) into a binary file laid out as
+
+    MAGIC | header length (u32) | header JSON | offsets (u64 * (n + 1)) | records
+
+where the header holds the destination keys and the alias -> record number
+map, and each record is zlib-compressed compact JSON. The compiled file is
+memory-mapped and records are only decoded when a destination is looked
+up, so the dataset can grow to tens of thousands of entries without
+costing memory or startup time.
+"""
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from collections.abc import Mapping
+from functools import lru_cache
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+MAGIC = b'TPDEST01'
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_DATASET = os.path.join(DATA_DIR, 'destinations.json')
+
+# Trie key marking the end of an alias; never produced by tokenize()
+_END = ''
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text or '').lower())
+
+
+class DestinationIndex:
+    """Token trie over destination names and their aliases
+
+    Built once from a {key: record} dataset plus an {alias: key} map.
+    Matching walks the input's words left to right, taking the longest
+    alias at each position, so cost depends on the input length and the
+    longest alias, not on the number of destinations. Aliases only match
+    whole words: "UP" matches "Agra, UP" but not "Europe".
+    """
+
+    def __init__(self, records, aliases=None):
+        self.records = records
+        self._trie = {}
+        for key in records:
+            self.add_alias(key, key)
+        for alias, key in (aliases or {}).items():
+            self.add_alias(alias, key)
+
+    def add_alias(self, alias, key):
+        if key not in self.records:
+            raise KeyError(f"Alias {alias!r} points to unknown destination {key!r}")
+        node = self._trie
+        for token in tokenize(alias):
+            node = node.setdefault(token, {})
+        node[_END] = key
+
+    def find_keys(self, text):
+        """Keys of every destination mentioned in text, in order, without repeats"""
+        tokens = tokenize(text)
+        found = []
+        i = 0
+        while i < len(tokens):
+            node = self._trie
+            match, match_end = None, i
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if _END in node:
+                    match, match_end = node[_END], j
+
+            if match is None:
+                i += 1
+                continue
+            if match not in found:
+                found.append(match)
+            i = match_end
+        return found
+
+    def find_all(self, text):
+        """Records of every destination mentioned in text"""
+        return [self.records[key] for key in self.find_keys(text)]
+
+    def find(self, text):
+        """Record of the first destination mentioned in text, or None"""
+        keys = self.find_keys(text)
+        return self.records[keys[0]] if keys else None
+
+
+def compile_dataset(source):
+    """Encode a {"destinations": ..., "aliases": ...} dict in the compiled format"""
+    destinations = source['destinations']
+    keys = list(destinations)
+    positions = {key: i for i, key in enumerate(keys)}
+
+    aliases = {}
+    for alias, key in source.get('aliases', {}).items():
+        if key not in positions:
+            raise KeyError(f"Alias {alias!r} points to unknown destination {key!r}")
+        aliases[alias] = positions[key]
+
+    records = [
+        zlib.compress(json.dumps(destinations[key], separators=(',', ':'), ensure_ascii=False).encode(), 9)
+        for key in keys
+    ]
+    offsets = [0]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+
+    header = json.dumps({"keys": keys, "aliases": aliases}, separators=(',', ':'), ensure_ascii=False).encode()
+    return b''.join([
+        MAGIC,
+        struct.pack('<I', len(header)),
+        header,
+        struct.pack(f'<{len(offsets)}Q', *offsets),
+        *records
+    ])
+
+
+def build_dataset_file(source_path, output_path):
+    """Compile a JSON dataset file, replacing output_path atomically"""
+    with open(source_path, encoding='utf-8') as f:
+        data = compile_dataset(json.load(f))
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, output_path)
+    return len(data)
+
+
+class DestinationDataset(Mapping):
+    """Read-only {key: record} mapping over a compiled dataset buffer
+
+    Only the header is parsed up front; records are decompressed on first
+    access and kept in a small LRU. Aliases resolve to the same record
+    number, so a destination and its aliases share one decoded record.
+    Records are shared between callers and must not be modified.
+    """
+
+    def __init__(self, buffer, cache_size=1024):
+        if bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError("Not a compiled destination dataset")
+        self._buffer = buffer
+
+        header_len, = struct.unpack_from('<I', buffer, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        header = json.loads(bytes(buffer[header_start:header_start + header_len]))
+
+        self.keys_list = header['keys']
+        self.aliases = {alias: self.keys_list[i] for alias, i in header['aliases'].items()}
+        self._positions = {key: i for i, key in enumerate(self.keys_list)}
+        self._offsets_start = header_start + header_len
+        self._records_start = self._offsets_start + 8 * (len(self.keys_list) + 1)
+        self._record = lru_cache(maxsize=cache_size)(self._decode)
+
+    @classmethod
+    def open(cls, path, cache_size=1024):
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, cache_size)
+
+    def __getitem__(self, key):
+        return self._record(self._positions[key])
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def __iter__(self):
+        return iter(self.keys_list)
+
+    def __len__(self):
+        return len(self.keys_list)
+
+    def _decode(self, position):
+        start, end = struct.unpack_from('<2Q', self._buffer, self._offsets_start + 8 * position)
+        raw = self._buffer[self._records_start + start:self._records_start + end]
+        return json.loads(zlib.decompress(raw))
+
+
+def load_dataset(path=DEFAULT_DATASET):
+    """Open a dataset, compiling a JSON source next to itself when needed
+
+    A .json path is compiled to the matching .bin file if that is missing
+    or older than the source; if the directory is read-only the compiled
+    form is kept in memory instead.
+    """
+    if not path.endswith('.json'):
+        return DestinationDataset.open(path)
+
+    compiled_path = os.path.splitext(path)[0] + '.bin'
+    try:
+        if (not os.path.exists(compiled_path)
+                or os.path.getmtime(compiled_path) < os.path.getmtime(path)):
+            build_dataset_file(path, compiled_path)
+        return DestinationDataset.open(compiled_path)
+    except OSError:
+        with open(path, encoding='utf-8') as f:
+            return DestinationDataset(compile_dataset(json.load(f)))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_destination_index():
+    """Process-wide DestinationIndex over DESTINATIONS_PATH, built on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                dataset = load_dataset(os.getenv('DESTINATIONS_PATH', DEFAULT_DATASET))
+                _index = DestinationIndex(dataset, dataset.aliases)
+    return _index
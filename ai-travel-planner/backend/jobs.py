@@ -0,0 +1,179 @@
+"""Background job queue for travel plan generation"""
+import queue
+import threading
+import time
+import uuid
+
+# Finished jobs are purged at most this often (seconds), as sessions are
+PURGE_INTERVAL = 300
+
+
+class QueueFull(Exception):
+    """Raised when the job queue already holds max_depth jobs"""
+
+
+class JobQueue:
+    """Bounded worker pool running generation jobs recorded in a job store
+
+    submit() records the job and returns at once; at most `workers` jobs
+    run concurrently. A queued job is leased to this process for
+    queue_lease_seconds and a running one for lease_seconds. With a
+    durable store, a recovery loop picks up jobs whose lease expired
+    (their process died) or that no process holds, which also shares the
+    queue between processes using the same database. Jobs that ended
+    more than result_ttl seconds ago are purged.
+    """
+
+    def __init__(self, handler, store, workers=4, max_depth=1000,
+                 lease_seconds=600, queue_lease_seconds=60, poll_interval=5.0, result_ttl=3600):
+        self.handler = handler
+        self.store = store
+        self.workers = workers
+        self.max_depth = max_depth
+        self.lease_seconds = lease_seconds
+        self.queue_lease_seconds = queue_lease_seconds
+        self.poll_interval = poll_interval
+        self.result_ttl = result_ttl
+        self._next_purge = 0.0
+
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stopping = threading.Event()
+
+        self.running = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.started = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"plan-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            if self.store.durable:
+                thread = threading.Thread(target=self._recover_loop, name="plan-job-recovery", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        self._stopping.set()
+        for _ in range(self.workers):
+            self._queue.put(None)
+
+    def submit(self, user_id, payload):
+        """Record a new job and queue it; raises QueueFull at capacity"""
+        if self._queue.qsize() >= self.max_depth:
+            raise QueueFull(f"Job queue is full ({self.max_depth} jobs)")
+
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "status": "queued",
+            "payload": payload,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "lease_expires_at": now + self.queue_lease_seconds
+        }
+        self.store.add(job)
+        self.start()
+        self._enqueue(job['id'])
+        return job
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a job that has not started; returns its resulting status"""
+        return self.store.cancel(job_id, time.time())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "depth": self._queue.qsize(),
+                "running": self.running,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "avg_wait_seconds": self.total_wait / self.started if self.started else 0.0,
+                "max_wait_seconds": self.max_wait
+            }
+
+    def _enqueue(self, job_id):
+        with self._lock:
+            if job_id in self._pending:
+                return
+            self._pending.add(job_id)
+        self._queue.put(job_id)
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            with self._lock:
+                self._pending.discard(job_id)
+
+            now = time.time()
+            job = self.store.claim(job_id, now, now + self.lease_seconds)
+            if job is None:
+                # Cancelled, or claimed by another process
+                continue
+
+            wait = now - job['created_at']
+            with self._lock:
+                self.running += 1
+                self.started += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+
+            try:
+                result = self.handler(job)
+                self.store.finish(job_id, 'succeeded', time.time(), result=result)
+                succeeded = True
+            except Exception as e:
+                print(f"Error running job {job_id}: {e}")
+                self.store.finish(job_id, 'failed', time.time(), error=str(e))
+                succeeded = False
+
+            with self._lock:
+                self.running -= 1
+                if succeeded:
+                    self.succeeded += 1
+                else:
+                    self.failed += 1
+            self._purge(time.time())
+
+    def _recover_loop(self):
+        while True:
+            now = time.time()
+            try:
+                for job_id in self.store.recover(now, now + self.queue_lease_seconds):
+                    self._enqueue(job_id)
+            except Exception as e:
+                print(f"Error recovering jobs: {e}")
+            self._purge(now)
+            if self._stopping.wait(self.poll_interval):
+                return
+
+    def _purge(self, now):
+        """Drop jobs that ended more than result_ttl seconds ago, at most every PURGE_INTERVAL"""
+        with self._lock:
+            if now < self._next_purge:
+                return
+            self._next_purge = now + PURGE_INTERVAL
+        try:
+            self.store.purge(now - self.result_ttl)
+        except Exception as e:
+            print(f"Error purging jobs: {e}")
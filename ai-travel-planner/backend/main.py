@@ -1,27 +1,65 @@
-from flask import Flask, jsonify, request, session
+from flask import Flask, Response, g, jsonify, request, session
 from flask_cors import CORS 
 import json
+from contextlib import nullcontext
 from datetime import datetime
 import hashlib
+import hmac
+import math
 import re
 import os
-# from dotenv import load_dotenv
-# import google.generativeai as genai
-# from ai_service import ai_planner
+import time
+from plan_stream import iter_plan_events
+from compression import compress_response
+from batch import MAX_BATCH_SIZE, mock_cost, mock_costs, validate_batch
+from destinations import get_destination_index
+from jobs import JobQueue, QueueFull
+from rate_limit import AdmissionController, RateLimited, create_limiter_backend
+from sessions import DEFAULT_SECRET_KEY, ServerSessionInterface, create_session_store, secret_key_from_env
+from metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS, Gauge, render as render_metrics, span
+from multi_destination import generate_multi_destination_plan, merge_plans, split_destinations, split_user_input
+from plan_updates import apply_update, needs_generation, plan_update, trip_days
+from plan_transfer import export_chunks, export_filters, import_lines
+from store import create_job_store, create_stores
+from dotenv import load_dotenv
+from ai_service import get_ai_planner
 
 # Load environment variables
-# load_dotenv()
+load_dotenv()
 
 app = Flask(__name__)
-app.secret_key = 'ai_travel_planner_secret_key_2024'
+app.secret_key = secret_key_from_env() or DEFAULT_SECRET_KEY
 CORS(app, supports_credentials=True)
 
-# Configure Gemini AI (temporarily disabled)
-print("⚠️  AI features temporarily disabled. Using mock data for demonstration.")
-
-# In-memory storage
-users = []
-travel_plans = []
+# Gemini AI when GEMINI_API_KEY is set, else the sample plans below. The
+# planner serves sample plans itself whenever a Gemini call fails. Creating
+# it at import also starts the AI_WARMUP warm-up, so every worker process
+# loads the Gemini client as it starts rather than on its first request
+ai_planner = get_ai_planner()
+if not ai_planner.is_configured:
+    ai_planner = None
+    print("⚠️  GEMINI_API_KEY not set. Using mock data for demonstration.")
+
+# Storage (in-memory unless STORAGE_BACKEND=sqlite)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'memory')
+DATABASE_PATH = os.getenv('DATABASE_PATH', 'travel_planner.db')
+users, travel_plans = create_stores(STORAGE_BACKEND, DATABASE_PATH)
+
+# Sessions: signed cookies by default, or kept server-side (memory or
+# sqlite) so every worker process sees them and logout revokes them
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'sqlite' if STORAGE_BACKEND == 'sqlite' else 'cookie')
+if SESSION_BACKEND != 'cookie':
+    app.session_interface = ServerSessionInterface(create_session_store(SESSION_BACKEND, DATABASE_PATH))
+
+# Bearer token for the /api/admin endpoints, which are off without one
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Longest itinerary of the outline plans served under load
+MAX_SKELETON_DAYS = 30
+# Job payload flag for requests admitted as degraded (not a plan input)
+DEGRADED_JOB_KEY = '_degraded'
 
 # Helper functions
 def hash_password(password):
@@ -36,14 +74,191 @@ def validate_mobile(mobile):
     return re.match(pattern, mobile) is not None
 
 def find_user_by_email(email):
-    return next((user for user in users if user['email'] == email), None)
+    return users.find_by_email(email)
 
 def find_user_by_mobile(mobile):
-    return next((user for user in users if user['mobile'] == mobile), None)
+    return users.find_by_mobile(mobile)
+
+def find_user_by_id(user_id):
+    return users.get(user_id)
 
 def is_authenticated():
     return 'user_id' in session
 
+def is_admin():
+    """True if the request carries the ADMIN_TOKEN bearer token"""
+    expected = f"Bearer {ADMIN_TOKEN}".encode()
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected)
+
+def validate_plan_input(data):
+    """Return an error message for an invalid plan request, else None"""
+    with span('validation'):
+        if not data:
+            return "No data provided"
+
+        required_fields = ['budget', 'travelers', 'destinations']
+        for field in required_fields:
+            if field not in data or not data[field]:
+                return f"Missing required field: {field}"
+        return None
+
+def save_plan(user_id, user_input, ai_plan):
+    """Create and store the plan record for a generated plan"""
+    plan = {
+        "id": travel_plans.next_id(),
+        "user_id": user_id,
+        "user_input": user_input,
+        "ai_plan": ai_plan,
+        "created_at": datetime.now().isoformat(),
+        "type": "ai_generated"
+    }
+    with span('storage'):
+        return travel_plans.add(plan)
+
+def plan_summary(plan):
+    """Plan record without itinerary details, for ?fields=summary listings"""
+    ai_plan = plan['ai_plan']
+    return {
+        "id": plan['id'],
+        "user_id": plan['user_id'],
+        "created_at": plan['created_at'],
+        "type": plan['type'],
+        "user_input": plan['user_input'],
+        "ai_plan": {
+            "destination": ai_plan.get('destination'),
+            "total_estimated_cost": ai_plan.get('total_estimated_cost'),
+            "days": len(ai_plan.get('itinerary') or []),
+            "ai_generated": ai_plan.get('ai_generated', False)
+        }
+    }
+
+def plans_etag(user_id):
+    """Weak ETag for a plan listing: the user's plan-set version plus the query"""
+    query = '&'.join(f"{key}={value}" for key, value in sorted(request.args.items(multi=True)))
+    version = travel_plans.version_for_user(user_id)
+    return hashlib.sha1(f"{user_id}:{version}:{query}".encode()).hexdigest()[:20]
+
+def rate_limited_response(error):
+    """429 for a request rejected by admission control"""
+    return jsonify({
+        "error": "Too many plan requests, try again later",
+        "limit": error.scope,
+        "retry_after": error.retry_after_seconds
+    }), 429, {"Retry-After": str(error.retry_after_seconds)}
+
+def degraded_headers(ai_plan):
+    """Retry-After for a sample plan served while the Gemini circuit breaker is open"""
+    if ai_planner is None or not ai_plan.get('degraded'):
+        return {}
+    retry_after = ai_planner.circuit_breaker.retry_after()
+    return {"Retry-After": str(math.ceil(retry_after))} if retry_after > 0 else {}
+
+def format_sse(event, data):
+    """Encode one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def wants_async():
+    """True if the client asked for a 202 + job id instead of waiting"""
+    if request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return 'respond-async' in request.headers.get('Prefer', '')
+
+def run_generation_job(job):
+    """Job handler: generate and store the plan for a queued request
+
+    Jobs admitted as degraded carry DEGRADED_JOB_KEY in their payload and
+    get the cheap degraded plan.
+    """
+    user_input = dict(job['payload'])
+    degraded = user_input.pop(DEGRADED_JOB_KEY, False)
+    with span('generation'):
+        ai_plan = generate_degraded_plan(user_input) if degraded else generate_plan(user_input)
+    plan = save_plan(job['user_id'], user_input, ai_plan)
+    return {"plan_id": plan['id']}
+
+def job_response(job):
+    """Public view of a job, including the plan once it has succeeded"""
+    def timestamp(value):
+        return datetime.fromtimestamp(value).isoformat() if value else None
+
+    body = {
+        "id": job['id'],
+        "status": job['status'],
+        "created_at": timestamp(job['created_at']),
+        "started_at": timestamp(job['started_at']),
+        "finished_at": timestamp(job['finished_at'])
+    }
+    if job['status'] == 'succeeded':
+        body['plan'] = travel_plans.get(job['result']['plan_id'])
+    elif job['status'] == 'failed':
+        body['error'] = "Failed to generate travel plan"
+    return body
+
+# Background plan generation (see /api/generate-plan?async=true)
+job_queue = JobQueue(
+    run_generation_job,
+    create_job_store(STORAGE_BACKEND, DATABASE_PATH),
+    workers=int(os.getenv('GENERATION_WORKERS', 4)),
+    max_depth=int(os.getenv('JOB_QUEUE_MAX_DEPTH', 1000)),
+    result_ttl=float(os.getenv('JOB_RESULT_TTL', 3600))
+)
+
+# Admission control for plan generation; limits are shared between worker
+# processes with RATE_LIMIT_BACKEND=sqlite
+admission_control = AdmissionController(
+    create_limiter_backend(os.getenv('RATE_LIMIT_BACKEND', STORAGE_BACKEND), DATABASE_PATH),
+    user_rate=float(os.getenv('RATE_LIMIT_USER_PER_MINUTE', 30)),
+    user_burst=float(os.getenv('RATE_LIMIT_USER_BURST', 10)),
+    global_rate=float(os.getenv('RATE_LIMIT_GLOBAL_PER_MINUTE', 600)),
+    global_burst=float(os.getenv('RATE_LIMIT_GLOBAL_BURST', 100)),
+    max_concurrent=int(os.getenv('MAX_CONCURRENT_GENERATIONS', 32)),
+    max_concurrent_per_user=int(os.getenv('MAX_CONCURRENT_GENERATIONS_PER_USER', 4)),
+    degrade=os.getenv('RATE_LIMIT_DEGRADE', 'false').lower() in ('1', 'true', 'yes')
+)
+
+Gauge('travel_planner_job_queue_depth', 'Plan generation jobs waiting for a worker',
+      lambda: job_queue.stats()['depth'])
+
+CIRCUIT_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+if ai_planner is not None:
+    Gauge('travel_planner_circuit_state', 'Gemini circuit breaker state (0 closed, 1 half open, 2 open)',
+          lambda: CIRCUIT_STATES[ai_planner.circuit_breaker.state])
+    Gauge('travel_planner_similar_plan_index_size', 'Plans held in the similar-plan index',
+          lambda: len(ai_planner.similar_plans))
+    for stage in ('sdk_import', 'client_init', 'first_request'):
+        Gauge(f'travel_planner_cold_start_{stage}_seconds', f'Cold start: {stage.replace("_", " ")} time',
+              lambda stage=stage: ai_planner.cold_start[f'{stage}_seconds'])
+
+@app.before_request
+def start_job_workers():
+    # Started on the first request rather than at import, so the reloader's
+    # parent process never picks up jobs
+    job_queue.start()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    # Streamed responses are timed up to the first byte only
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    started = g.get('request_started')
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+@app.after_request
+def compress_large_responses(response):
+    return compress_response(response, request.accept_encodings)
+
+@app.route('/metrics')
+def metrics():
+    """Request, stage timing and generation metrics in Prometheus text format"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/')
 def home():
     return jsonify({"message": "Welcome to AI Travel Planner API", "status": "running"})
@@ -80,7 +295,7 @@ def register():
             return jsonify({"error": "Mobile number already registered"}), 400
     
     user = {
-        "id": len(users) + 1,
+        "id": users.next_id(),
         "name": data['name'],
         "email": data.get('email', ''),
         "mobile": data.get('mobile', ''),
@@ -88,7 +303,11 @@ def register():
         "created_at": datetime.now().isoformat()
     }
     
-    users.append(user)
+    try:
+        users.add(user)
+    except ValueError as e:
+        # Lost a race with a concurrent registration for the same email/mobile
+        return jsonify({"error": str(e)}), 400
     session['user_id'] = user['id']
     session['user_name'] = user['name']
     
@@ -151,7 +370,7 @@ def get_current_user():
         return jsonify({"error": "Not authenticated"}), 401
     
     user_id = session['user_id']
-    user = next((u for u in users if u['id'] == user_id), None)
+    user = find_user_by_id(user_id)
     
     if not user:
         return jsonify({"error": "User not found"}), 404
@@ -174,45 +393,223 @@ def generate_travel_plan():
 
     data = request.get_json()
 
-    if not data:
-        return jsonify({"error": "No data provided"}), 400
+    error = validate_plan_input(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    if wants_async():
+        try:
+            admission = admission_control.admit(session['user_id'], concurrent=False)
+        except RateLimited as e:
+            return rate_limited_response(e)
+        payload = {key: value for key, value in data.items() if key != DEGRADED_JOB_KEY}
+        if admission.degraded:
+            payload[DEGRADED_JOB_KEY] = True
+        try:
+            job = job_queue.submit(session['user_id'], payload)
+        except QueueFull:
+            return jsonify({"error": "Too many pending plan requests, try again later"}), 503
+        status_url = f"/api/jobs/{job['id']}"
+        return jsonify({"job_id": job['id'], "status": job['status'], "status_url": status_url}), 202, {
+            "Location": status_url
+        }
 
-    # Validate required fields
-    required_fields = ['budget', 'travelers', 'destinations']
-    for field in required_fields:
-        if field not in data or not data[field]:
-            return jsonify({"error": f"Missing required field: {field}"}), 400
+    try:
+        admission = admission_control.admit(session['user_id'])
+    except RateLimited as e:
+        return rate_limited_response(e)
 
     try:
-        # Generate mock travel plan (AI temporarily disabled)
-        ai_plan = generate_mock_travel_plan(data)
-
-        # Create plan record
-        plan = {
-            "id": len(travel_plans) + 1,
-            "user_id": session['user_id'],
-            "user_input": data,
-            "ai_plan": ai_plan,
-            "created_at": datetime.now().isoformat(),
-            "type": "ai_generated"
-        }
+        with admission:
+            with span('generation'):
+                ai_plan = generate_degraded_plan(data) if admission.degraded else generate_plan(data)
 
-        travel_plans.append(plan)
-        return jsonify(plan), 201
+        plan = save_plan(session['user_id'], data, ai_plan)
+        return jsonify(plan), 201, degraded_headers(ai_plan)
 
     except Exception as e:
         print(f"Error generating travel plan: {e}")
         return jsonify({"error": "Failed to generate travel plan"}), 500
 
+@app.route('/api/generate-plans', methods=['POST'])
+def generate_travel_plans():
+    """Generate travel plans for a batch of inputs
+
+    Accepts a JSON list of plan inputs (or {"plans": [...]}) and returns one
+    result per input, in order: the stored plan, or the error for that input.
+    """
+    if not is_authenticated():
+        return jsonify({"error": "Authentication required"}), 401
+
+    data = request.get_json(silent=True)
+    items = data.get('plans') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Expected a non-empty list of plan inputs"}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {MAX_BATCH_SIZE} plans per batch"}), 400
+
+    valid, errors = validate_batch(items, validate_plan_input)
+    results = [{"index": index, "error": error} for index, error in errors.items()]
+    if not valid:
+        # Nothing to generate, so nothing is charged against the rate limits
+        results.sort(key=lambda result: result['index'])
+        return jsonify({"results": results, "succeeded": 0, "failed": len(errors)})
+
+    try:
+        admission = admission_control.admit(session['user_id'], cost=len(valid))
+    except RateLimited as e:
+        return rate_limited_response(e)
+
+    try:
+        with admission, span('generation'):
+            if admission.degraded:
+                outcomes = [(generate_degraded_plan(item), None) for _, item in valid]
+            else:
+                outcomes = generate_plans([item for _, item in valid])
+    except Exception as e:
+        print(f"Error generating travel plans: {e}")
+        return jsonify({"error": "Failed to generate travel plans"}), 500
+
+    failed = len(errors)
+    for (index, item), (ai_plan, error) in zip(valid, outcomes):
+        if error is not None:
+            results.append({"index": index, "error": "Failed to generate travel plan"})
+            failed += 1
+        else:
+            results.append({"index": index, "plan": save_plan(session['user_id'], item, ai_plan)})
+
+    results.sort(key=lambda result: result['index'])
+    return jsonify({
+        "results": results,
+        "succeeded": len(items) - failed,
+        "failed": failed
+    })
+
+@app.route('/api/generate-plan/stream', methods=['POST'])
+def generate_travel_plan_stream():
+    """Generate a travel plan, streaming its sections as Server-Sent Events
+
+    Emits destination, one day event per itinerary day, budget_breakdown
+    and the remaining sections as they become available, then a final
+    plan event carrying the stored plan record.
+    """
+    if not is_authenticated():
+        return jsonify({"error": "Authentication required"}), 401
+
+    data = request.get_json()
+
+    error = validate_plan_input(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    user_id = session['user_id']
+    try:
+        admission = admission_control.admit(user_id)
+    except RateLimited as e:
+        return rate_limited_response(e)
+
+    def events():
+        # The in-flight slot is held until the stream ends or is closed
+        with admission:
+            try:
+                for event, payload in stream_plan(data, degraded=admission.degraded):
+                    if event == 'plan':
+                        payload = save_plan(user_id, data, payload)
+                    yield format_sse(event, payload)
+            except Exception as e:
+                print(f"Error streaming travel plan: {e}")
+                yield format_sse('error', {"error": "Failed to generate travel plan"})
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route('/api/jobs/metrics', methods=['GET'])
+def get_job_metrics():
+    """Queue depth, wait times and outcome counts of the job queue"""
+    if not is_authenticated():
+        return jsonify({"error": "Authentication required"}), 401
+
+    return jsonify(job_queue.stats())
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Poll a plan generation job"""
+    if not is_authenticated():
+        return jsonify({"error": "Authentication required"}), 401
+
+    job = job_queue.get(job_id)
+    if not job or job['user_id'] != session['user_id']:
+        return jsonify({"error": "Job not found or access denied"}), 404
+
+    return jsonify(job_response(job))
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a plan generation job that has not started yet"""
+    if not is_authenticated():
+        return jsonify({"error": "Authentication required"}), 401
+
+    job = job_queue.get(job_id)
+    if not job or job['user_id'] != session['user_id']:
+        return jsonify({"error": "Job not found or access denied"}), 404
+
+    status = job_queue.cancel(job_id)
+    if status != 'cancelled':
+        return jsonify({"error": f"Job is already {status}"}), 409
+    return jsonify({"message": "Job cancelled successfully"})
+
 @app.route('/api/plans', methods=['GET'])
 def get_plans():
-    """Get all travel plans for current user"""
+    """Get travel plans for current user
+
+    Without query parameters the full list is returned, oldest first.
+    With ?limit=N[&cursor=C] a newest-first page is returned together
+    with the cursor for the next page. ?fields=summary leaves out the
+    itinerary and other plan details.
+
+    Responses carry an ETag; a matching If-None-Match gets 304 without
+    the plans being loaded.
+    """
     if not is_authenticated():
         return jsonify({"error": "Authentication required"}), 401
 
     user_id = session['user_id']
-    user_plans = [plan for plan in travel_plans if plan['user_id'] == user_id]
-    return jsonify(user_plans)
+
+    fields = request.args.get('fields', 'full')
+    if fields not in ('full', 'summary'):
+        return jsonify({"error": "fields must be 'full' or 'summary'"}), 400
+
+    # Read the version before the plans, so a concurrent change can only
+    # make the tag older than the body, never newer
+    etag = plans_etag(user_id)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = app.make_response(plans_listing(user_id, fields))
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def plans_listing(user_id, fields):
+    """Body of GET /api/plans (see get_plans)"""
+    project = plan_summary if fields == 'summary' else (lambda plan: plan)
+
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        return jsonify([project(plan) for plan in travel_plans.list_for_user(user_id)])
+
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    cursor = request.args.get('cursor', type=int)
+    if limit is None or not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+    if 'cursor' in request.args and cursor is None:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    plans, next_cursor = travel_plans.page_for_user(user_id, limit, cursor)
+    return jsonify({"plans": [project(plan) for plan in plans], "next_cursor": next_cursor})
 
 @app.route('/api/plans/<int:plan_id>', methods=['DELETE'])
 def delete_plan(plan_id):
@@ -220,24 +617,166 @@ def delete_plan(plan_id):
     if not is_authenticated():
         return jsonify({"error": "Authentication required"}), 401
 
-    global travel_plans
     user_id = session['user_id']
 
     # Find plan and check ownership
-    plan = next((p for p in travel_plans if p['id'] == plan_id and p['user_id'] == user_id), None)
+    plan = travel_plans.get(plan_id, user_id=user_id)
     if not plan:
         return jsonify({"error": "Plan not found or access denied"}), 404
 
-    travel_plans = [p for p in travel_plans if p['id'] != plan_id]
+    # A concurrent request may have deleted it since
+    if travel_plans.remove(plan_id) is None:
+        return jsonify({"error": "Plan not found or access denied"}), 404
     return jsonify({"message": "Plan deleted successfully"})
 
+@app.route('/api/plans/<int:plan_id>', methods=['PATCH'])
+def update_plan(plan_id):
+    """Change a plan's inputs, regenerating only the parts they affect
+
+    Takes the changed user_input fields (or {"user_input": {...}}). Budget
+    changes are recomputed locally and added days are generated on their
+    own; the "update" report says what was recomputed.
+    """
+    if not is_authenticated():
+        return jsonify({"error": "Authentication required"}), 401
+
+    user_id = session['user_id']
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and isinstance(data.get('user_input'), dict):
+        data = data['user_input']
+    if not isinstance(data, dict) or not data:
+        return jsonify({"error": "No changes provided"}), 400
+
+    plan = travel_plans.get(plan_id, user_id=user_id)
+    if not plan:
+        return jsonify({"error": "Plan not found or access denied"}), 404
+
+    new_input = dict(plan['user_input'], **data)
+    _, errors = validate_batch([new_input], validate_plan_input)
+    if errors:
+        return jsonify({"error": errors[0]}), 400
+
+    update = plan_update(plan['ai_plan'], plan['user_input'], new_input)
+    admission = None
+    if needs_generation(update):
+        try:
+            admission = admission_control.admit(user_id)
+        except RateLimited as e:
+            return rate_limited_response(e)
+
+    try:
+        with admission or nullcontext():
+            regenerate = generate_degraded_plan if admission and admission.degraded else generate_plan
+            generate_days = ai_planner.generate_itinerary_days if ai_planner else generate_mock_days
+            with span('generation'):
+                ai_plan, report = apply_update(plan['ai_plan'], new_input, update, regenerate, generate_days)
+
+        if report['changed_fields'] or new_input != plan['user_input']:
+            plan = dict(plan, user_input=new_input, ai_plan=ai_plan)
+            with span('storage'):
+                if travel_plans.update(plan) is None:
+                    return jsonify({"error": "Plan not found or access denied"}), 404
+        return jsonify({"plan": plan, "update": report}), 200, degraded_headers(ai_plan)
+
+    except Exception as e:
+        print(f"Error updating travel plan: {e}")
+        return jsonify({"error": "Failed to update travel plan"}), 500
+
+@app.route('/api/admin/plans/export', methods=['GET'])
+def export_plans():
+    """Stream every user's plans as NDJSON, lowest plan id first
+
+    Optional filters: ?user_id=N, ?created_from= (inclusive) and
+    ?created_to= (exclusive), as ISO 8601 dates or times.
+    """
+    if not is_admin():
+        return jsonify({"error": "Admin access required"}), 403
+
+    try:
+        filters = export_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return Response(export_chunks(travel_plans, **filters), mimetype='application/x-ndjson', headers={
+        "Cache-Control": "no-store"
+    })
+
+@app.route('/api/admin/plans/import', methods=['POST'])
+def import_plans():
+    """Bulk-insert plans from an NDJSON body, as produced by the export
+
+    ?ids=keep (the default) keeps plan ids and rejects ids already taken;
+    ?ids=new gives every plan a new id. The body is read line by line.
+    """
+    if not is_admin():
+        return jsonify({"error": "Admin access required"}), 403
+
+    ids = request.args.get('ids', 'keep')
+    if ids not in ('keep', 'new'):
+        return jsonify({"error": "ids must be 'keep' or 'new'"}), 400
+
+    try:
+        with span('storage'):
+            report = import_lines(travel_plans, request.stream, keep_ids=ids == 'keep')
+    except Exception as e:
+        print(f"Error importing travel plans: {e}")
+        return jsonify({"error": "Failed to import travel plans"}), 500
+    return jsonify(report)
+
+# Plan generation: Gemini when configured, else the mock generator
+def generate_plan(user_input):
+    """Plan for one request"""
+    if ai_planner is None:
+        return generate_mock_travel_plan(user_input)
+    return ai_planner.generate_travel_plan(user_input)
+
+def generate_plans(inputs):
+    """One (plan, error) pair per input of a batch, in order"""
+    if ai_planner is None:
+        return [(plan, None) for plan in generate_mock_travel_plans(inputs)]
+    return ai_planner.generate_travel_plans(inputs)
+
+def stream_plan(user_input, degraded=False):
+    """Yield the plan section by section, ending with ("plan", plan)"""
+    if ai_planner is None or degraded:
+        return stream_mock_travel_plan(user_input, degraded=degraded)
+    return ai_planner.stream_travel_plan(user_input)
+
 # Mock travel plan generator
 def generate_mock_travel_plan(user_input):
-    """Generate mock travel plan"""
+    """Generate mock travel plan, one destination at a time for multi-destination trips"""
+    return generate_multi_destination_plan(user_input, generate_single_mock_travel_plan)
+
+def generate_mock_travel_plans(inputs):
+    """Generate mock travel plans for a batch of validated inputs
+
+    Costs for every destination of every input are computed together in
+    one vectorized pass, then each plan is assembled around them.
+    """
+    sub_inputs = []
+    for user_input in inputs:
+        destinations = split_destinations(user_input.get('destinations', ''))
+        sub_inputs.append(split_user_input(user_input, destinations) if len(destinations) > 1 else [user_input])
+
+    costs = iter(mock_costs([float(s.get('budget', 1000)) for legs in sub_inputs for s in legs]))
+
+    plans = []
+    for legs in sub_inputs:
+        leg_plans = [generate_single_mock_travel_plan(leg, next(costs)) for leg in legs]
+        plans.append(merge_plans(leg_plans) if len(leg_plans) > 1 else leg_plans[0])
+    return plans
+
+def generate_single_mock_travel_plan(user_input, costs=None):
+    """Generate mock travel plan for the first destination
+
+    costs (from mock_cost) can be passed in when computed for a whole batch.
+    """
     destinations = user_input.get('destinations', '').split(',')
     main_destination = destinations[0].strip() if destinations else "Amazing Destination"
-    budget = int(user_input.get('budget', 1000))
-    travelers = int(user_input.get('travelers', 1))
+    budget = float(user_input.get('budget', 1000))
+    travelers = int(float(user_input.get('travelers', 1)))
+    if costs is None:
+        costs = mock_cost(budget)
 
     # Location-specific data
     location_data = get_location_specific_data(main_destination.lower())
@@ -272,14 +811,8 @@ def generate_mock_travel_plan(user_input):
                 "estimated_cost": 150
             }
         ],
-        "total_estimated_cost": min(budget, budget * 0.95),
-        "budget_breakdown": {
-            "accommodation": budget * 0.3,
-            "transportation": budget * 0.25,
-            "food": budget * 0.25,
-            "activities": budget * 0.15,
-            "miscellaneous": budget * 0.05
-        },
+        "total_estimated_cost": costs['total_estimated_cost'],
+        "budget_breakdown": costs['budget_breakdown'],
         "tips": location_data['tips'][:4],
         "best_time_to_visit": location_data['best_time'],
         "local_cuisine": location_data['cuisine'][:4],
@@ -288,50 +821,93 @@ def generate_mock_travel_plan(user_input):
         "note": "This is a sample plan. For AI-generated plans, install required dependencies."
     }
 
+def generate_mock_days(user_input, day_numbers, existing_days=()):
+    """Mock itinerary days for the given day numbers, for trips made longer"""
+    destinations = split_destinations(user_input.get('destinations', ''))
+    location_data = get_location_specific_data(destinations[0] if destinations else "Amazing Destination")
+    places = location_data['places']
+    cuisine = location_data['cuisine']
+    culture = location_data['culture']
+
+    return [
+        {
+            "day": number,
+            "title": f"Discover {places[number % len(places)]}",
+            "activities": [
+                f"Visit {places[number % len(places)]}",
+                f"Experience {culture[number % len(culture)]}",
+                f"Try {cuisine[number % len(cuisine)]}",
+                "Evening at leisure"
+            ],
+            "estimated_cost": 150
+        }
+        for number in day_numbers
+    ]
+
+def generate_degraded_plan(user_input):
+    """Cheap plan served when upstream limits are exhausted (RATE_LIMIT_DEGRADE)
+
+    A cached or similar AI plan when the planner has one, else a skeleton
+    plan; neither calls Gemini, looks up destinations or fans out.
+    """
+    plan = ai_planner.cached_travel_plan(user_input) if ai_planner else None
+    if plan is None:
+        plan = generate_skeleton_plan(user_input)
+    plan['degraded'] = True
+    return plan
+
+def generate_skeleton_plan(user_input):
+    """Outline plan: one open day per trip day and the budget split, nothing looked up"""
+    name = ', '.join(split_destinations(user_input.get('destinations', ''))) or "Custom Destination"
+    costs = mock_cost(float(user_input.get('budget', 1000)))
+    days = min(trip_days(user_input) or 1, MAX_SKELETON_DAYS)
+
+    return {
+        "destination": {"name": name, "country": "Various", "description": f"Trip to {name}"},
+        "itinerary": [
+            {
+                "day": number,
+                "title": f"Day {number} in {name}",
+                "activities": ["Free time to explore"],
+                "estimated_cost": 0
+            }
+            for number in range(1, days + 1)
+        ],
+        "total_estimated_cost": costs['total_estimated_cost'],
+        "budget_breakdown": costs['budget_breakdown'],
+        "ai_generated": False,
+        "note": "The planner is busy, so this is an outline. Try again shortly for a detailed plan."
+    }
+
+def stream_mock_travel_plan(user_input, degraded=False):
+    """Yield the mock plan section by section, ending with ("plan", plan)"""
+    plan = generate_degraded_plan(user_input) if degraded else generate_mock_travel_plan(user_input)
+    yield from iter_plan_events(plan)
+    yield 'plan', plan
+
 def get_location_specific_data(destination):
     """Get location-specific data"""
     destination = destination.lower().strip()
 
-    # Indian States Database
-    if 'uttar pradesh' in destination or 'up' in destination:
-        return {
-            'name': 'Uttar Pradesh',
-            'country': 'India',
-            'main_city': 'Lucknow',
-            'description': 'The heartland of India with rich cultural heritage',
-            'places': ['Taj Mahal (Agra)', 'Varanasi Ghats', 'Mathura-Vrindavan', 'Lucknow'],
-            'cuisine': ['Lucknowi Biryani', 'Petha (Agra)', 'Kachori-Sabzi', 'Tunde Kabab'],
-            'culture': ['Ganga Aarti at Varanasi', 'Holi at Mathura', 'Mughal Architecture', 'Classical Music'],
-            'tips': ['Visit Taj Mahal at sunrise', 'Respect religious customs', 'Try street food safely', 'Book trains in advance'],
-            'best_time': 'October to March (Winter season)'
-        }
-    elif 'rajasthan' in destination:
-        return {
-            'name': 'Rajasthan',
-            'country': 'India',
-            'main_city': 'Jaipur',
-            'description': 'Land of Kings with magnificent palaces and forts',
-            'places': ['Jaipur (Pink City)', 'Udaipur (City of Lakes)', 'Jodhpur (Blue City)', 'Jaisalmer'],
-            'cuisine': ['Dal Baati Churma', 'Laal Maas', 'Gatte ki Sabzi', 'Pyaaz Kachori'],
-            'culture': ['Folk Music and Dance', 'Camel Safari', 'Palace Architecture', 'Puppet Shows'],
-            'tips': ['Carry sunscreen', 'Try camel safari', 'Book heritage hotels', 'Stay hydrated'],
-            'best_time': 'October to March (Winter season)'
-        }
-    else:
-        return {
-            'name': destination.title(),
-            'country': 'Various',
-            'main_city': destination.title(),
-            'description': f'A wonderful destination - {destination.title()}',
-            'places': ['Main City Center', 'Local Attractions', 'Cultural Sites', 'Shopping Areas'],
-            'cuisine': ['Local Specialties', 'Traditional Dishes', 'Street Food', 'Regional Delicacies'],
-            'culture': ['Local Traditions', 'Cultural Sites', 'Festivals', 'Art and Crafts'],
-            'tips': ['Research local customs', 'Try local cuisine', 'Respect traditions', 'Stay safe'],
-            'best_time': 'Check local weather patterns'
-        }
+    with span('destination_lookup'):
+        data = get_destination_index().find(destination)
+    if data:
+        return data
+
+    return {
+        'name': destination.title(),
+        'country': 'Various',
+        'main_city': destination.title(),
+        'description': f'A wonderful destination - {destination.title()}',
+        'places': ['Main City Center', 'Local Attractions', 'Cultural Sites', 'Shopping Areas'],
+        'cuisine': ['Local Specialties', 'Traditional Dishes', 'Street Food', 'Regional Delicacies'],
+        'culture': ['Local Traditions', 'Cultural Sites', 'Festivals', 'Art and Crafts'],
+        'tips': ['Research local customs', 'Try local cuisine', 'Respect traditions', 'Stay safe'],
+        'best_time': 'Check local weather patterns'
+    }
 
 if __name__ == '__main__':
     print("🚀 Starting AI Travel Planner API...")
     print("📍 Server running on: http://localhost:5000")
-    print("⚠️ Using Mock Data (AI dependencies not installed)")
+    print("🤖 Using Gemini AI" if ai_planner else "⚠️ Using Mock Data (GEMINI_API_KEY not set)")
     app.run(debug=True, port=5000)
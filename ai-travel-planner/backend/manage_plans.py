@@ -0,0 +1,74 @@
+"""Export or import the plans in the SQLite database as NDJSON
+
+The same format as GET /api/admin/plans/export and POST
+/api/admin/plans/import, read from and written to the database directly,
+so it works while the server is down. Plans stream through one batch at
+a time, however many there are.
+
+Run from the backend folder:
+    python manage_plans.py export --output plans.ndjson
+    python manage_plans.py export --user-id 3 --created-from 2024-01-01 --created-to 2024-02-01
+    python manage_plans.py import plans.ndjson
+    python manage_plans.py import --ids new - < plans.ndjson
+"""
+import argparse
+import json
+import os
+import sys
+
+from plan_transfer import IMPORT_BATCH_SIZE, export_chunks, export_filters, import_lines
+from store import create_stores
+
+
+def export(plans, args):
+    try:
+        filters = export_filters(vars(args))
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    out = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for chunk in export_chunks(plans, **filters):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    return 0
+
+
+def import_(plans, args):
+    source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    try:
+        report = import_lines(plans, source, keep_ids=args.ids == 'keep', batch_size=args.batch_size)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+    print(json.dumps(report, indent=2))
+    return 1 if report['failed'] else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default=os.getenv('DATABASE_PATH', 'travel_planner.db'))
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help="write plans as NDJSON")
+    export_parser.add_argument('--output', default='-', help="file to write, - for stdout")
+    export_parser.add_argument('--user-id', dest='user_id')
+    export_parser.add_argument('--created-from', dest='created_from', help="inclusive, ISO 8601")
+    export_parser.add_argument('--created-to', dest='created_to', help="exclusive, ISO 8601")
+
+    import_parser = commands.add_parser('import', help="insert plans from NDJSON")
+    import_parser.add_argument('input', help="file to read, - for stdin")
+    import_parser.add_argument('--ids', choices=('keep', 'new'), default='keep',
+                               help="keep plan ids (rejecting ids already taken) or assign new ones")
+    import_parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    _, plans = create_stores('sqlite', args.database)
+    return export(plans, args) if args.command == 'export' else import_(plans, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Counters, histograms and stage timing spans, exposed in Prometheus text format
+
+Kept deliberately small: recording a value is a dict lookup and an
+addition under a lock, cheap enough to leave on in production.
+
+    with span('prompt_build'):
+        prompt = build_plan_prompt(user_input)
+    UPSTREAM_ERRORS.inc()
+    render()  # text for GET /metrics
+"""
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds in seconds, from a cache hit up to a slow Gemini call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_metrics = []
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonically increasing count, optionally split by labels"""
+
+    kind = 'counter'
+    # Counter samples, and so their HELP and TYPE lines, end in _total
+    suffix = '_total'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        if not values and not self.labelnames:
+            values = {(): 0}
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{self.suffix}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """Distribution of observed values (seconds) in cumulative buckets"""
+
+    kind = 'histogram'
+    suffix = ''
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # per-bucket counts (the last one is +Inf), sum
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, **labels):
+        """Context manager observing the time spent in its block"""
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else _format_value(float(bound))
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', le)])} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Gauge:
+    """Current value read from a callback when metrics are rendered
+
+    A callback returning None (no value yet) leaves the series out.
+    """
+
+    kind = 'gauge'
+    suffix = ''
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+        _metrics.append(self)
+
+    def samples(self):
+        try:
+            value = self.read()
+        except Exception as e:
+            print(f"Error reading gauge {self.name}: {e}")
+            return
+        if value is not None:
+            yield f"{self.name} {_format_value(value)}"
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in list(_metrics):
+        name = metric.name + metric.suffix
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+HTTP_REQUESTS = Counter(
+    'travel_planner_http_requests', 'HTTP requests handled', ('endpoint', 'method', 'status')
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'travel_planner_http_request_duration_seconds', 'Time spent in route handlers', ('endpoint', 'method')
+)
+STAGE_SECONDS = Histogram(
+    'travel_planner_stage_duration_seconds', 'Time spent in each stage of plan generation', ('stage',)
+)
+PLAN_CACHE_LOOKUPS = Counter(
+    'travel_planner_plan_cache_lookups', 'Plan cache lookups by result (hit or miss)', ('result',)
+)
+MOCK_FALLBACKS = Counter(
+    'travel_planner_mock_fallbacks', 'Plans served by the mock generator instead of Gemini', ('reason',)
+)
+PARSE_FAILURES = Counter(
+    'travel_planner_plan_parse_failures', 'Gemini responses that could not be fully parsed', ('kind',)
+)
+UPSTREAM_ERRORS = Counter(
+    'travel_planner_upstream_errors', 'Errors raised by Gemini generate_content calls'
+)
+GEMINI_TOKENS = Counter(
+    'travel_planner_gemini_tokens', 'Gemini tokens by prompt version and kind (input, output or cached)',
+    ('prompt_version', 'kind')
+)
+GEMINI_CALL_SECONDS = Histogram(
+    'travel_planner_gemini_call_duration_seconds', 'Latency of successful Gemini calls by prompt version',
+    ('prompt_version',)
+)
+
+
+def span(stage):
+    """Context manager timing one stage into travel_planner_stage_duration_seconds"""
+    return STAGE_SECONDS.time(stage=stage)
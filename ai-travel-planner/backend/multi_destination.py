@@ -0,0 +1,152 @@
+"""Planning multi-destination trips one destination at a time, in parallel"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+DEFAULT_MAX_FANOUT = int(os.getenv('MAX_DESTINATION_FANOUT', 4))
+
+# Threads shared by all requests for their extra destinations; each request
+# plans one destination on its own thread
+_executor = ThreadPoolExecutor(
+    max_workers=max(1, int(os.getenv('MAX_DESTINATION_WORKERS', 32))), thread_name_prefix='destination'
+)
+
+
+def split_destinations(destinations):
+    """'Goa, Kerala,' -> ['Goa', 'Kerala']"""
+    return [d.strip() for d in str(destinations or '').split(',') if d.strip()]
+
+
+def _split_dates(start_date, end_date, parts):
+    """Split an ISO date range into consecutive (start, end) legs, or None"""
+    try:
+        start = date.fromisoformat(str(start_date))
+        end = date.fromisoformat(str(end_date))
+    except ValueError:
+        return None
+    total_days = (end - start).days + 1
+    if total_days < parts:
+        return None
+
+    legs = []
+    for i in range(parts):
+        leg_days = total_days // parts + (1 if i < total_days % parts else 0)
+        leg_end = start + timedelta(days=leg_days - 1)
+        legs.append((start.isoformat(), leg_end.isoformat()))
+        start = leg_end + timedelta(days=1)
+    return legs
+
+
+def split_user_input(user_input, destinations):
+    """One sub-request per destination, sharing the budget and dates evenly"""
+    try:
+        budget = float(user_input.get('budget', 1000))
+    except (TypeError, ValueError):
+        budget = 1000
+    legs = _split_dates(user_input.get('start_date'), user_input.get('end_date'), len(destinations))
+
+    sub_inputs = []
+    for i, destination in enumerate(destinations):
+        sub_input = dict(user_input, destinations=destination, budget=int(budget / len(destinations)))
+        if legs:
+            sub_input['start_date'], sub_input['end_date'] = legs[i]
+        sub_inputs.append(sub_input)
+    return sub_inputs
+
+
+def _unique(items):
+    seen = set()
+    result = []
+    for item in items:
+        key = str(item)
+        if key not in seen:
+            seen.add(key)
+            result.append(item)
+    return result
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+
+
+def merge_plans(plans):
+    """Combine per-destination plans into a single trip plan
+
+    Itinerary days are concatenated with continuous numbering and tagged
+    with their destination; descriptions are kept per destination, one
+    paragraph each; costs and budget categories are summed; list sections
+    are concatenated without repeats. Other sections are taken
+    from the first plan that has them.
+    """
+    destinations = [plan.get('destination', {}) for plan in plans]
+    countries = _unique(d.get('country', 'Various') for d in destinations)
+    descriptions = [(d.get('name', ''), str(d.get('description') or '').strip()) for d in destinations]
+
+    merged = {
+        "destination": {
+            "name": ', '.join(d.get('name', '') for d in destinations),
+            "country": countries[0] if len(countries) == 1 else ', '.join(countries),
+            "description": '\n\n'.join(
+                f"{name}: {text}" if name else text for name, text in descriptions if text
+            )
+        },
+        "destinations": destinations,
+        "itinerary": []
+    }
+
+    for plan, destination in zip(plans, destinations):
+        for day in plan.get('itinerary', []):
+            merged['itinerary'].append(dict(
+                day,
+                day=len(merged['itinerary']) + 1,
+                destination=destination.get('name', '')
+            ))
+
+    merged['total_estimated_cost'] = sum(_number(plan.get('total_estimated_cost')) for plan in plans)
+
+    breakdown = {}
+    for plan in plans:
+        for category, amount in (plan.get('budget_breakdown') or {}).items():
+            breakdown[category] = breakdown.get(category, 0) + _number(amount)
+    merged['budget_breakdown'] = breakdown
+
+    for key in ('tips', 'local_cuisine', 'cultural_highlights'):
+        merged[key] = _unique(item for plan in plans for item in plan.get(key, []))
+
+    merged['best_time_to_visit'] = '; '.join(_unique(
+        f"{d.get('name', '')}: {plan['best_time_to_visit']}"
+        for plan, d in zip(plans, destinations) if plan.get('best_time_to_visit')
+    ))
+    merged['ai_generated'] = all(plan.get('ai_generated') for plan in plans)
+
+    for plan in plans:
+        for key, value in plan.items():
+            merged.setdefault(key, value)
+    return merged
+
+
+def generate_multi_destination_plan(user_input, generate_one, max_fanout=DEFAULT_MAX_FANOUT):
+    """Plan each destination with generate_one concurrently and merge the results
+
+    At most max_fanout destinations (at least one) are generated at the
+    same time for one request, so total latency is close to the slowest
+    destination. Single-destination requests are passed straight to
+    generate_one.
+    """
+    destinations = split_destinations(user_input.get('destinations', ''))
+    if len(destinations) <= 1:
+        return generate_one(user_input)
+
+    sub_inputs = split_user_input(user_input, destinations)
+    fanout = max(1, min(max_fanout, len(sub_inputs)))
+    plans = [None] * len(sub_inputs)
+
+    def plan_every(first):
+        for i in range(first, len(sub_inputs), fanout):
+            plans[i] = generate_one(sub_inputs[i])
+
+    futures = [_executor.submit(plan_every, first) for first in range(1, fanout)]
+    plan_every(0)
+    for future in futures:
+        future.result()
+    return merge_plans(plans)
@@ -0,0 +1,156 @@
+"""Cache of generated travel plans keyed on normalized user input"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_BUDGET_BUCKET = 250
+
+
+def _normalize_text(value):
+    return ' '.join(str(value or '').lower().split())
+
+
+def canonical_input(user_input, budget_bucket=DEFAULT_BUDGET_BUCKET):
+    """Reduce user_input to the fields that shape a plan, in canonical form
+
+    Destinations are trimmed, lowercased, de-duplicated and sorted so that
+    "Goa, Kerala" and "kerala,goa " map to the same plan. The budget is
+    rounded down to a bucket of budget_bucket.
+    """
+    destinations = sorted({
+        _normalize_text(d) for d in str(user_input.get('destinations', '')).split(',')
+        if d.strip()
+    })
+
+    try:
+        budget = int(float(user_input.get('budget', 0)))
+    except (TypeError, ValueError):
+        budget = 0
+    try:
+        travelers = int(user_input.get('travelers', 1))
+    except (TypeError, ValueError):
+        travelers = 1
+
+    preferences = user_input.get('preferences', '')
+    if isinstance(preferences, (list, tuple)):
+        preferences = sorted(_normalize_text(p) for p in preferences)
+    else:
+        preferences = _normalize_text(preferences)
+
+    return {
+        "destinations": destinations,
+        "budget": budget // budget_bucket * budget_bucket,
+        "travelers": travelers,
+        "start_date": str(user_input.get('start_date') or '').strip(),
+        "end_date": str(user_input.get('end_date') or '').strip(),
+        "preferences": preferences,
+        "notes": _normalize_text(user_input.get('notes'))
+    }
+
+
+def cache_key(user_input, budget_bucket=DEFAULT_BUDGET_BUCKET):
+    canonical = canonical_input(user_input, budget_bucket)
+    encoded = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class PlanCache:
+    """LRU + TTL cache of plans with an optional SQLite tier on disk
+
+    Plans are stored as JSON text, so every hit hands out a fresh copy
+    that the caller is free to modify.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, disk_path=None,
+                 budget_bucket=DEFAULT_BUDGET_BUCKET):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.budget_bucket = budget_bucket
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if disk_path:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False, isolation_level=None)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS plan_cache "
+                "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, plan TEXT NOT NULL)"
+            )
+
+    def key(self, user_input):
+        return cache_key(user_input, self.budget_bucket)
+
+    def get(self, user_input):
+        """Return a cached plan for user_input, or None"""
+        key = self.key(user_input)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, encoded = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(encoded)
+                del self._entries[key]
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT expires_at, plan FROM plan_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[0] > now:
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return json.loads(row[1])
+                if row is not None:
+                    self._disk.execute("DELETE FROM plan_cache WHERE key = ?", (key,))
+
+            self.misses += 1
+            return None
+
+    def set(self, user_input, plan):
+        key = self.key(user_input)
+        expires_at = time.time() + self.ttl
+        encoded = json.dumps(plan, separators=(',', ':'))
+
+        with self._lock:
+            self._remember(key, expires_at, encoded)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO plan_cache VALUES (?, ?, ?)", (key, expires_at, encoded)
+                )
+
+    def _remember(self, key, expires_at, encoded):
+        self._entries[key] = (expires_at, encoded)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM plan_cache")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,197 @@
+"""Compact in-memory plan records that share repeated destination data
+
+Plans for popular destinations repeat the same destination description,
+tips, cuisine and culture lists, constant notes and (for mock plans)
+whole itinerary days. PlanRecord keeps a plan in __slots__ objects and
+tuples instead of dicts and lists, interns short strings, and stores
+those repeated sections once in a SharedPool. to_dict() rebuilds
+today's JSON shape on output.
+"""
+import json
+import sys
+import threading
+
+# ai_plan sections holding destination data rather than per-request data
+SHARED_SECTIONS = (
+    'destination', 'tips', 'local_cuisine', 'cultural_highlights',
+    'best_time_to_visit', 'note', 'message', 'accommodation', 'transportation'
+)
+MAX_INTERNED_LENGTH = 64
+RECORD_FIELDS = ('id', 'user_id', 'user_input', 'ai_plan', 'created_at', 'type')
+
+_canonical_json = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, check_circular=False).encode
+
+
+class _Object:
+    """A frozen JSON object: a shared tuple of keys and a tuple of values"""
+
+    __slots__ = ('keys', 'values')
+
+    def __init__(self, keys, values):
+        self.keys = keys
+        self.values = values
+
+
+class SharedPool:
+    """One frozen copy per distinct value, up to max_entries of them
+
+    Values are keyed by their canonical JSON, so 1, 1.0 and true stay
+    distinct. Each share() takes a reference and each release() drops
+    one; a value is forgotten once no record holds it. When full, new
+    values are simply not shared.
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        # canonical JSON -> [frozen value, references], and back by id()
+        self._entries = {}
+        self._keys = {}
+        # long string -> [the shared string, references]
+        self._strings = {}
+        self._key_layouts = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries) + len(self._strings)
+
+    def share(self, value):
+        if isinstance(value, str):
+            return self.share_string(value)
+        key = _canonical_json(value)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1] += 1
+                return entry[0]
+        # Frozen outside the lock; a thread racing on the same value uses ours
+        frozen = freeze(value, self)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_entries:
+                    return frozen
+                entry = self._entries[key] = [frozen, 0]
+                self._keys[id(frozen)] = key
+            entry[1] += 1
+            return entry[0]
+
+    def share_string(self, value):
+        """Long strings (descriptions, notes) are too long to intern"""
+        if len(value) <= MAX_INTERNED_LENGTH:
+            return sys.intern(value)
+        with self._lock:
+            entry = self._strings.get(value)
+            if entry is None:
+                if len(self._strings) >= self.max_entries:
+                    return value
+                entry = self._strings[value] = [value, 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, value):
+        """Drop a reference taken by share(); values the pool does not hold are ignored"""
+        with self._lock:
+            if isinstance(value, str):
+                entry = self._strings.get(value)
+                key = value
+                entries = self._strings
+            else:
+                key = self._keys.get(id(value))
+                entry = self._entries.get(key)
+                entries = self._entries
+            if entry is None or entry[0] is not value:
+                return
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del entries[key]
+                self._keys.pop(id(value), None)
+
+    def key_layout(self, keys):
+        """Shared tuple for a set of dict keys (few distinct layouts exist)"""
+        layout = self._key_layouts.get(keys)
+        if layout is None:
+            layout = tuple(_intern(key) for key in keys)
+            if len(self._key_layouts) < self.max_entries:
+                self._key_layouts[keys] = layout
+        return layout
+
+
+def _intern(value):
+    if isinstance(value, str) and len(value) <= MAX_INTERNED_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+def freeze(value, pool):
+    """JSON value -> compact immutable form (see thaw)"""
+    if isinstance(value, dict):
+        return _Object(pool.key_layout(tuple(value)), tuple(freeze(v, pool) for v in value.values()))
+    if isinstance(value, list):
+        return tuple(freeze(v, pool) for v in value)
+    return _intern(value)
+
+
+def thaw(value):
+    """Compact form -> fresh JSON value"""
+    if isinstance(value, _Object):
+        return {key: thaw(v) for key, v in zip(value.keys, value.values)}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+
+def freeze_ai_plan(ai_plan, pool):
+    """Freeze a generated plan, sharing destination sections and itinerary days"""
+    if not isinstance(ai_plan, dict):
+        return freeze(ai_plan, pool)
+
+    values = []
+    for key, value in ai_plan.items():
+        if key in SHARED_SECTIONS:
+            values.append(pool.share(value))
+        elif key == 'itinerary' and isinstance(value, list):
+            values.append(tuple(pool.share(day) for day in value))
+        else:
+            values.append(freeze(value, pool))
+    return _Object(pool.key_layout(tuple(ai_plan)), tuple(values))
+
+
+class PlanRecord:
+    """A stored travel plan; to_dict() returns the public record shape"""
+
+    __slots__ = ('id', 'user_id', 'created_at', 'type', 'user_input', 'ai_plan', 'extra')
+
+    def __init__(self, plan, pool):
+        self.id = plan['id']
+        self.user_id = plan['user_id']
+        self.created_at = plan.get('created_at')
+        self.type = _intern(plan.get('type'))
+        self.user_input = freeze(plan.get('user_input'), pool)
+        self.ai_plan = freeze_ai_plan(plan.get('ai_plan'), pool)
+        # Any other fields, kept so records round-trip unchanged
+        extra = {key: value for key, value in plan.items() if key not in RECORD_FIELDS}
+        self.extra = freeze(extra, pool) if extra else None
+
+    def to_dict(self):
+        plan = {
+            "id": self.id,
+            "user_id": self.user_id,
+            "user_input": thaw(self.user_input),
+            "ai_plan": thaw(self.ai_plan),
+            "created_at": self.created_at,
+            "type": self.type
+        }
+        if self.extra is not None:
+            plan.update(thaw(self.extra))
+        return plan
+
+    def release(self, pool):
+        """Drop this record's references to values shared in pool, once it is no longer stored"""
+        if not isinstance(self.ai_plan, _Object):
+            return
+        for key, value in zip(self.ai_plan.keys, self.ai_plan.values):
+            if key in SHARED_SECTIONS:
+                pool.release(value)
+            elif key == 'itinerary' and isinstance(value, tuple):
+                for day in value:
+                    pool.release(day)
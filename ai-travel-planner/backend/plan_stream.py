@@ -0,0 +1,394 @@
+"""Incremental, fault-tolerant parsing of travel plan JSON from model output"""
+import json
+import re
+
+NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+STRING_SPECIAL_RE = re.compile(r'["\\]')
+NESTED_SPECIAL_RE = re.compile(r'[{}\[\]"]')
+# Directly inside the itinerary array commas matter too, to find each element
+DAYS_SPECIAL_RE = re.compile(r'[{}\[\]",]')
+NON_SPACE_RE = re.compile(r'\S')
+
+LIST_OF_TEXT_FIELDS = ('tips', 'local_cuisine', 'cultural_highlights')
+
+
+class PlanStreamParser:
+    """Turn a plan JSON document arriving in chunks into (event, data) pairs
+
+    Each top-level field is emitted under its own name as soon as its value
+    is complete, except the itinerary, which is emitted one "day" event per
+    element. Text around the document (prose, ```json fences) is skipped,
+    values with common model mistakes (trailing commas, comments, Python
+    literals, raw newlines in strings) are repaired, and every section is
+    checked against the plan schema before it is emitted. Sections that
+    cannot be recovered are skipped and noted in self.errors, and
+    itinerary elements that are not usable days are counted in
+    self.skipped_days.
+
+    The fields parsed so far are available in self.plan; call finish() at
+    the end of the input to also keep the days of a truncated itinerary.
+    """
+
+    def __init__(self):
+        self.plan = {}
+        self.errors = []
+        self.skipped_days = 0
+        self.done = False
+        self._days = []
+        self._text = ''
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._expect_key = False
+        self._key = None
+        self._value_start = None
+        self._item_start = None
+        self._expect_day = False
+
+    def feed(self, chunk):
+        """Consume a chunk of text and return the events it completed"""
+        self._text += chunk
+        text = self._text
+        events = []
+        i = self._pos
+
+        while i < len(text) and not self.done:
+            if not self._stack:
+                start = find_document_start(text, i)
+                if start is None:
+                    # Keep a brace at the end of the text: its key may arrive
+                    # in the next chunk
+                    pending = text.rfind('{', i)
+                    i = pending if pending != -1 and not text[pending + 1:].strip() else len(text)
+                    break
+                i = start + 1
+                self._stack.append('{')
+                self._expect_key = True
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                match = STRING_SPECIAL_RE.search(text, i)
+                if match is None:
+                    i = len(text)
+                    break
+                i = match.start()
+                if text[i] == '\\':
+                    self._escape = True
+                else:
+                    self._in_string = False
+                    if len(self._stack) == 1 and self._expect_key:
+                        self._key = _loads(text[self._string_start:i + 1])
+                i += 1
+                continue
+
+            in_days = len(self._stack) == 2 and self._key == 'itinerary' and self._stack[1] == '['
+            if len(self._stack) > 1:
+                # Inside a value only brackets and strings matter
+                if not in_days:
+                    pattern = NESTED_SPECIAL_RE
+                else:
+                    pattern = NON_SPACE_RE if self._expect_day else DAYS_SPECIAL_RE
+                match = pattern.search(text, i)
+                if match is None:
+                    i = len(text)
+                    break
+                i = match.start()
+
+            c = text[i]
+            if in_days and self._expect_day:
+                # First character of an itinerary element: anything but an
+                # object is not a day
+                self._expect_day = False
+                if c not in '{]':
+                    self._skip_day()
+            if in_days and c == ',':
+                self._expect_day = True
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+                if len(self._stack) == 1 and not self._expect_key and self._value_start is None:
+                    self._value_start = i
+            elif c in '{[':
+                depth = len(self._stack)
+                if depth == 1 and self._value_start is None:
+                    self._value_start = i
+                elif depth == 2 and c == '{' and in_days:
+                    self._item_start = i
+                if depth == 1 and c == '[' and self._key == 'itinerary':
+                    self._expect_day = True
+                self._stack.append(c)
+            elif c in '}]':
+                self._stack.pop()
+                depth = len(self._stack)
+                if depth == 2 and self._item_start is not None:
+                    self._complete_day(events, text[self._item_start:i + 1])
+                    self._item_start = None
+                elif depth == 1:
+                    self._complete_value(events, text[self._value_start:i + 1])
+                elif depth == 0:
+                    if self._value_start is not None:
+                        self._complete_value(events, text[self._value_start:i])
+                    self.done = True
+            elif c == ':':
+                self._expect_key = False
+            elif c == ',':
+                if self._value_start is not None:
+                    self._complete_value(events, text[self._value_start:i])
+                self._expect_key = True
+            elif not c.isspace() and not self._expect_key and self._value_start is None:
+                self._value_start = i
+
+            i += 1
+
+        self._pos = i
+        return events
+
+    def finish(self):
+        """Mark the end of input and return the plan recovered so far"""
+        if not self.done:
+            if self._stack:
+                self.errors.append("truncated: document ended before its closing brace")
+            if 'itinerary' not in self.plan and self._days:
+                self.plan['itinerary'] = list(self._days)
+        return self.plan
+
+    def _complete_day(self, events, raw):
+        day = validate_day(_loads(raw, repair=True), len(self._days) + 1)
+        if day is None:
+            self._skip_day()
+            return
+        self._days.append(day)
+        events.append(('day', day))
+
+    def _skip_day(self):
+        self.errors.append(f"itinerary[{len(self._days) + self.skipped_days}]: invalid day")
+        self.skipped_days += 1
+
+    def _complete_value(self, events, raw):
+        key, self._key, self._value_start = self._key, None, None
+        if key is None:
+            return
+        if key == 'itinerary':
+            # Days were validated and emitted one by one
+            self.plan[key] = list(self._days)
+            if not raw.lstrip().startswith('['):
+                self.errors.append(f"{key}: invalid value")
+            return
+
+        value = validate_section(key, _loads(raw.strip(), repair=True))
+        if value is None:
+            self.errors.append(f"{key}: invalid value")
+            return
+        self.plan[key] = value
+        events.append((key, value))
+
+
+def find_document_start(text, pos=0):
+    """Index of the brace opening the plan document, skipping braces in prose
+
+    Only a brace followed by a key (or by nothing but whitespace and the
+    end of the text) counts; returns None if there is none yet.
+    """
+    while True:
+        start = text.find('{', pos)
+        if start == -1:
+            return None
+        rest = text[start + 1:start + 64].lstrip()
+        if rest[:1] in ('"', '}'):
+            return start
+        if not rest and not text[start + 1:].strip():
+            return None
+        pos = start + 1
+
+
+def _loads(raw, repair=False):
+    try:
+        return json.loads(raw)
+    except ValueError:
+        if not repair:
+            return None
+    try:
+        return json.loads(repair_json(raw))
+    except ValueError:
+        return None
+
+
+def repair_json(raw):
+    """Fix the JSON mistakes models commonly make, leaving strings intact
+
+    Drops // and /* */ comments and trailing commas, maps Python literals
+    (True, False, None) to JSON, and escapes raw newlines and tabs inside
+    strings.
+    """
+    out = []
+    i = 0
+    in_string = False
+    while i < len(raw):
+        c = raw[i]
+        if in_string:
+            if c == '\\':
+                out.append(raw[i:i + 2])
+                i += 2
+                continue
+            if c == '"':
+                in_string = False
+            elif c == '\n':
+                c = '\\n'
+            elif c == '\t':
+                c = '\\t'
+            out.append(c)
+        elif c == '"':
+            in_string = True
+            out.append(c)
+        elif raw.startswith('//', i):
+            end = raw.find('\n', i)
+            i = len(raw) if end == -1 else end
+            continue
+        elif raw.startswith('/*', i):
+            end = raw.find('*/', i + 2)
+            i = len(raw) if end == -1 else end + 2
+            continue
+        elif c == ',':
+            rest = raw[i + 1:].lstrip()
+            if not rest or rest[0] not in '}]':
+                out.append(c)
+        else:
+            for literal, replacement in (('True', 'true'), ('False', 'false'), ('None', 'null')):
+                if raw.startswith(literal, i) and not raw[i + len(literal):i + len(literal) + 1].isalnum():
+                    out.append(replacement)
+                    i += len(literal)
+                    break
+            else:
+                out.append(c)
+                i += 1
+            continue
+        i += 1
+    return ''.join(out)
+
+
+def to_number(value):
+    """100, 100.5, "$1,200" or "about 300 USD" -> number; else None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        match = NUMBER_RE.search(value.replace(',', ''))
+        if match:
+            number = float(match.group())
+            return int(number) if number.is_integer() else number
+    return None
+
+
+def _text_list(value):
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return None
+    return [str(item) for item in value if isinstance(item, (str, int, float)) and str(item).strip()]
+
+
+def validate_day(day, default_number):
+    """Normalize one itinerary day, or return None if it is unusable"""
+    if not isinstance(day, dict):
+        return None
+    day = dict(day)
+    number = to_number(day.get('day'))
+    day['day'] = int(number) if number is not None else default_number
+    day['title'] = str(day.get('title') or f"Day {day['day']}")
+    day['activities'] = _text_list(day.get('activities')) or []
+    cost = to_number(day.get('estimated_cost'))
+    day['estimated_cost'] = cost if cost is not None else 0
+    return day
+
+
+def validate_section(key, value):
+    """Normalize a top-level plan section, or return None if it is unusable"""
+    if value is None:
+        return None
+    if key == 'destination':
+        if isinstance(value, str):
+            value = {"name": value}
+        if not isinstance(value, dict) or not value.get('name'):
+            return None
+        return value
+    if key in ('total_estimated_cost',):
+        return to_number(value)
+    if key == 'budget_breakdown':
+        if not isinstance(value, dict):
+            return None
+        breakdown = {category: to_number(amount) for category, amount in value.items()}
+        return {category: amount for category, amount in breakdown.items() if amount is not None}
+    if key in LIST_OF_TEXT_FIELDS:
+        return _text_list(value)
+    if key == 'best_time_to_visit':
+        return value if isinstance(value, str) else None
+    if key in ('accommodation', 'transportation'):
+        return value if isinstance(value, dict) else None
+    return value
+
+
+def parse_plan_text(text):
+    """Parse a complete model response; returns (plan, errors, complete, skipped_days)
+
+    Well-formed documents are decoded in one go; anything else goes
+    through the incremental parser's recovery.
+    """
+    start = find_document_start(text)
+    if start is not None:
+        try:
+            document, _ = json.JSONDecoder().raw_decode(text, start)
+        except ValueError:
+            document = None
+        if isinstance(document, dict):
+            plan, errors, skipped_days = validate_plan(document)
+            return plan, errors, True, skipped_days
+
+    parser = PlanStreamParser()
+    parser.feed(text)
+    plan = parser.finish()
+    return plan, parser.errors, parser.done, parser.skipped_days
+
+
+def validate_plan(document):
+    """Validate every section of an already decoded plan; returns (plan, errors, skipped_days)"""
+    plan = {}
+    errors = []
+    skipped_days = 0
+    for key, value in document.items():
+        if key == 'itinerary':
+            days = []
+            for i, day in enumerate(value if isinstance(value, list) else []):
+                day = validate_day(day, len(days) + 1)
+                if day is None:
+                    errors.append(f"itinerary[{i}]: invalid day")
+                    skipped_days += 1
+                else:
+                    days.append(day)
+            plan[key] = days
+            continue
+        section = validate_section(key, value)
+        if section is None:
+            errors.append(f"{key}: invalid value")
+        else:
+            plan[key] = section
+    return plan, errors, skipped_days
+
+
+def iter_plan_events(plan):
+    """Yield the events a streamed plan would produce, for already built plans"""
+    if 'destination' in plan:
+        yield 'destination', plan['destination']
+    for day in plan.get('itinerary', []):
+        yield 'day', day
+    if 'budget_breakdown' in plan:
+        yield 'budget_breakdown', plan['budget_breakdown']
+    for key, value in plan.items():
+        if key not in ('destination', 'itinerary', 'budget_breakdown'):
+            yield key, value
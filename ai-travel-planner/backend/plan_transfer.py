@@ -0,0 +1,133 @@
+"""Bulk export and import of travel plans as NDJSON, one plan per line
+
+    filters = export_filters({"user_id": "3", "created_from": "2024-01-01"})
+    for chunk in export_chunks(travel_plans, **filters):
+        out.write(chunk)
+    report = import_lines(travel_plans, open('plans.ndjson', 'rb'))
+
+Exports are generated from the store's export_plans() as they are sent
+and imports are inserted batch by batch with add_many(), so neither
+holds more than one batch of plans in memory whatever the total.
+"""
+import json
+from datetime import datetime
+
+# Plans per add_many() call
+IMPORT_BATCH_SIZE = 1000
+# Export lines are joined into chunks of about this many bytes
+EXPORT_CHUNK_SIZE = 64 * 1024
+MAX_REPORTED_ERRORS = 100
+DEFAULT_PLAN_TYPE = 'ai_generated'
+
+
+def parse_created_at(value):
+    """created_at filter in the stored format ('2024-03-01' -> '2024-03-01T00:00:00')
+
+    None for an empty value; raises ValueError if it is not ISO 8601.
+    """
+    if value is None or not str(value).strip():
+        return None
+    return datetime.fromisoformat(str(value).strip()).isoformat()
+
+
+def export_filters(args):
+    """Keyword filters for export_chunks from query-style args; raises ValueError"""
+    filters = {"user_id": None}
+    user_id = args.get('user_id')
+    if user_id not in (None, ''):
+        try:
+            filters['user_id'] = int(user_id)
+        except (TypeError, ValueError):
+            raise ValueError("user_id must be an integer") from None
+    for name in ('created_from', 'created_to'):
+        try:
+            filters[name] = parse_created_at(args.get(name))
+        except ValueError:
+            raise ValueError(f"{name} must be an ISO 8601 date or time") from None
+    return filters
+
+
+def export_chunks(store, user_id=None, created_from=None, created_to=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """NDJSON of the matching plans as bytes chunks, lowest plan id first"""
+    lines, size = [], 0
+    for document in store.export_plans(user_id, created_from, created_to):
+        line = (document + '\n').encode()
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield b''.join(lines)
+            lines, size = [], 0
+    if lines:
+        yield b''.join(lines)
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_plan_line(line, keep_ids=True):
+    """Plan record from one NDJSON line; raises ValueError if it is not a valid plan"""
+    plan = json.loads(line)
+    if not isinstance(plan, dict):
+        raise ValueError("Line is not a JSON object")
+    if keep_ids and not _is_int(plan.get('id')):
+        raise ValueError("id must be an integer")
+    if not _is_int(plan.get('user_id')):
+        raise ValueError("user_id must be an integer")
+    for field in ('user_input', 'ai_plan'):
+        if not isinstance(plan.get(field), dict):
+            raise ValueError(f"{field} must be an object")
+    created_at = plan.get('created_at')
+    if not isinstance(created_at, str) or not created_at:
+        raise ValueError("created_at must be a non-empty string")
+    return {
+        "id": plan['id'] if keep_ids else None,
+        "user_id": plan['user_id'],
+        "user_input": plan['user_input'],
+        "ai_plan": plan['ai_plan'],
+        "created_at": created_at,
+        "type": plan.get('type') or DEFAULT_PLAN_TYPE
+    }
+
+
+def import_lines(store, lines, keep_ids=True, batch_size=IMPORT_BATCH_SIZE):
+    """Insert the plans of NDJSON lines (str or bytes) in batches
+
+    With keep_ids, plans keep their ids and those whose id is already
+    taken are rejected; otherwise every plan gets a new id. Invalid lines
+    are rejected too, without stopping the import. Returns imported and
+    failed counts plus the first MAX_REPORTED_ERRORS errors by line number.
+    """
+    report = {"imported": 0, "failed": 0, "errors": []}
+
+    def fail(number, message):
+        report['failed'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({"line": number, "error": message})
+
+    def flush(batch):
+        plans = [plan for _, plan in batch]
+        if not keep_ids:
+            for plan, plan_id in zip(plans, store.next_ids(len(plans))):
+                plan['id'] = plan_id
+        skipped = store.add_many(plans)
+        for position in skipped:
+            number, plan = batch[position]
+            fail(number, f"Duplicate plan id: {plan['id']}")
+        report['imported'] += len(plans) - len(skipped)
+
+    batch = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            batch.append((number, parse_plan_line(line, keep_ids)))
+        except ValueError as e:
+            fail(number, str(e))
+            continue
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return report
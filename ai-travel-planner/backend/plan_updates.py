@@ -0,0 +1,200 @@
+"""Incremental plan updates: redo only the parts of a plan an input change affects
+
+    update = plan_update(ai_plan, old_input, new_input)
+    if needs_generation(update):
+        ...  # admission control, as for a new plan
+    ai_plan, report = apply_update(ai_plan, new_input, update, regenerate, generate_days)
+
+- destinations, travelers, preferences or notes changed: full regeneration
+- budget changed: budget_breakdown and total_estimated_cost are rescaled
+  locally, with no model call
+- dates changed: the itinerary keeps its days and they are re-dated. A
+  trip that only moves keeps every day; one that grows or shrinks gains
+  or loses days at whichever end moved, and only the added days are
+  generated. Multi-destination trips that change length are regenerated
+  instead, since their days are split per leg.
+"""
+import copy
+from datetime import date, timedelta
+
+from multi_destination import split_destinations
+
+# Inputs the plan prompt is built from (see prompts.REQUEST_DEFAULTS)
+PLAN_FIELDS = ('destinations', 'budget', 'travelers', 'start_date', 'end_date', 'preferences', 'notes')
+REGENERATE_FIELDS = ('destinations', 'travelers', 'preferences', 'notes')
+DATE_FIELDS = ('start_date', 'end_date')
+# Top-level plan sections, as in prompts.PLAN_PROMPT_PREFIX plus merged trips' destinations
+PLAN_SECTIONS = ('destination', 'destinations', 'itinerary', 'accommodation', 'transportation',
+                 'total_estimated_cost', 'budget_breakdown', 'tips', 'best_time_to_visit',
+                 'local_cuisine', 'cultural_highlights')
+
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+
+def changed_fields(old_input, new_input):
+    """Plan inputs whose value differs, in PLAN_FIELDS order ('2000' equals 2000)"""
+    return [field for field in PLAN_FIELDS if _text(old_input.get(field)) != _text(new_input.get(field))]
+
+
+def _budget(user_input):
+    try:
+        budget = float(user_input.get('budget'))
+    except (TypeError, ValueError):
+        return None
+    return budget if budget > 0 else None
+
+
+def _date(user_input, field):
+    try:
+        return date.fromisoformat(_text(user_input.get(field)))
+    except ValueError:
+        return None
+
+
+def trip_days(user_input):
+    """Number of days between start_date and end_date (inclusive), or None if not both set"""
+    start, end = _date(user_input, 'start_date'), _date(user_input, 'end_date')
+    if start is None or end is None:
+        return None
+    days = (end - start).days + 1
+    return days if days > 0 else None
+
+
+def _date_change(old_input, new_input, length):
+    """Days added (+) or removed (-) at the start and at the end of a `length`-day itinerary
+
+    The old itinerary is taken to run from the old start_date. A trip
+    that only moves, or whose old dates are unknown or do not overlap the
+    new ones, keeps its days from the first one and changes at the end.
+    """
+    days = trip_days(new_input)
+    old_start, new_start = _date(old_input, 'start_date'), _date(new_input, 'start_date')
+    if old_start is None or trip_days(old_input) is None or days == length:
+        return 0, days - length
+    old_end = old_start + timedelta(days=length - 1)
+    new_end = new_start + timedelta(days=days - 1)
+    if new_start > old_end or new_end < old_start:
+        return 0, days - length
+    return (old_start - new_start).days, (new_end - old_end).days
+
+
+def plan_update(ai_plan, old_input, new_input):
+    """Work out what changing old_input to new_input means for ai_plan
+
+    Returns a dict: changed_fields, regenerate (bool), budget (old, new)
+    or None, add_days (numbers in the new itinerary), remove_days (numbers
+    in the old one), start_change (days added, or if negative removed, at
+    the start) and start_date (to re-date the days from, or None).
+    """
+    changed = changed_fields(old_input, new_input)
+    update = {"changed_fields": changed, "regenerate": False, "budget": None,
+              "add_days": [], "remove_days": [], "start_change": 0, "start_date": None}
+    itinerary = ai_plan.get('itinerary') if isinstance(ai_plan, dict) else None
+    if not changed:
+        return update
+    if any(field in REGENERATE_FIELDS for field in changed) or not isinstance(itinerary, list):
+        update['regenerate'] = True
+        return update
+
+    if 'budget' in changed:
+        old_budget, new_budget = _budget(old_input), _budget(new_input)
+        if old_budget is None or new_budget is None:
+            update['regenerate'] = True
+            return update
+        update['budget'] = (old_budget, new_budget)
+
+    days = trip_days(new_input)
+    # Flexible dates keep the itinerary as is
+    if any(field in DATE_FIELDS for field in changed) and days is not None:
+        update['start_date'] = _date(new_input, 'start_date')
+        if days != len(itinerary) and len(split_destinations(new_input.get('destinations'))) > 1:
+            update['regenerate'] = True
+            return update
+        start, end = _date_change(old_input, new_input, len(itinerary))
+        update['start_change'] = start
+        update['add_days'] = list(range(1, start + 1)) + list(range(days - end + 1, days + 1))
+        update['remove_days'] = (list(range(1, -start + 1))
+                                 + list(range(len(itinerary) + end + 1, len(itinerary) + 1)))
+    return update
+
+
+def needs_generation(update):
+    """True if applying the update calls the plan generator"""
+    return update['regenerate'] or bool(update['add_days'])
+
+
+def _scale(value, factor):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return round(value * factor, 2)
+    return value
+
+
+def apply_update(ai_plan, new_input, update, regenerate, generate_days):
+    """Return (new ai_plan, report) for an update from plan_update
+
+    regenerate(user_input) builds a whole plan; generate_days(user_input,
+    day_numbers, existing_days) returns just the listed itinerary days.
+    The report lists the changed inputs, the recomputed sections and
+    which itinerary days were kept and added (numbered as in the new
+    itinerary) and removed (numbered as in the old one). Days are
+    renumbered from 1 and, when the dates changed, given their date.
+    """
+    report = {
+        "changed_fields": update['changed_fields'],
+        "regenerated": update['regenerate'],
+        "recomputed": [],
+        "kept_days": [],
+        "added_days": update['add_days'],
+        "removed_days": update['remove_days']
+    }
+    if update['regenerate']:
+        plan = regenerate(new_input)
+        report['recomputed'] = [section for section in PLAN_SECTIONS if section in plan]
+        return plan, report
+
+    plan = copy.deepcopy(ai_plan)
+    start = update['start_change']
+    removed_at_start = max(0, -start)
+    removed_at_end = len(update['remove_days']) - removed_at_start
+    added_at_start = update['add_days'][:max(0, start)]
+    added_at_end = update['add_days'][max(0, start):]
+
+    kept = plan['itinerary'][removed_at_start:len(plan['itinerary']) - removed_at_end]
+    _renumber(kept, len(added_at_start) + 1)
+    report['kept_days'] = list(range(len(added_at_start) + 1, len(added_at_start) + len(kept) + 1))
+    before = generate_days(new_input, added_at_start, kept) if added_at_start else []
+    after = generate_days(new_input, added_at_end, before + kept) if added_at_end else []
+    plan['itinerary'] = before + kept + after
+    _renumber(plan['itinerary'], 1, update['start_date'])
+    if update['add_days'] or update['remove_days'] or update['start_date']:
+        report['recomputed'].append('itinerary')
+
+    if update['budget']:
+        old_budget, new_budget = update['budget']
+        report['recomputed'] += rescale_budget(plan, new_budget / old_budget)
+    return plan, report
+
+
+def _renumber(days, first, start_date=None):
+    """Number the days in place from `first` and, given a start_date, date them"""
+    for number, day in enumerate(days, first):
+        if isinstance(day, dict):
+            day['day'] = number
+            if start_date is not None:
+                day['date'] = (start_date + timedelta(days=number - 1)).isoformat()
+
+
+def rescale_budget(plan, factor):
+    """Scale a plan's budget_breakdown and total cost in place; returns the sections changed"""
+    recomputed = []
+    if isinstance(plan.get('budget_breakdown'), dict):
+        plan['budget_breakdown'] = {
+            category: _scale(amount, factor) for category, amount in plan['budget_breakdown'].items()
+        }
+        recomputed.append('budget_breakdown')
+    if 'total_estimated_cost' in plan:
+        plan['total_estimated_cost'] = _scale(plan['total_estimated_cost'], factor)
+        recomputed.append('total_estimated_cost')
+    return recomputed
@@ -0,0 +1,146 @@
+"""Gemini prompt for travel plans, split into a static prefix and a per-request part
+
+The prefix (instructions, state examples and the JSON schema) is identical
+for every request and always sent first and byte-for-byte unchanged, so
+it can be reused by prefix caching on the model side. Only the short
+request section is rendered per call, from a template compiled once at
+import. Bump PROMPT_VERSION whenever either part changes so token usage
+can be compared between versions.
+"""
+from string import Formatter
+
+PROMPT_VERSION = 'v2'
+DAYS_PROMPT_VERSION = 'days-v1'
+
+PLAN_PROMPT_PREFIX = """You are a travel planner. Create a detailed travel plan for the destinations in the request below.
+
+IMPORTANT: For each destination mentioned, include the most famous and must-visit places within that region.
+
+For example:
+- If destination is "Uttar Pradesh" or "UP", include places like Agra (Taj Mahal), Varanasi, Mathura, Vrindavan, Lucknow, Ayodhya, Allahabad
+- If destination is "Rajasthan", include Jaipur, Udaipur, Jodhpur, Jaisalmer, Pushkar, Mount Abu
+- If destination is "Kerala", include Kochi, Munnar, Alleppey, Thekkady, Wayanad
+- If destination is "Goa", include North Goa beaches, South Goa, Old Goa churches, Dudhsagar Falls
+- If destination is "Himachal Pradesh", include Shimla, Manali, Dharamshala, Kasol, Spiti Valley
+
+Please provide a comprehensive travel plan in JSON format with this structure:
+{
+    "destination": {
+        "name": "Main destination name",
+        "country": "Country",
+        "description": "Brief description"
+    },
+    "itinerary": [
+        {
+            "day": 1,
+            "title": "Day title",
+            "activities": ["Activity 1", "Activity 2"],
+            "estimated_cost": 100
+        }
+    ],
+    "accommodation": {
+        "type": "Hotel type",
+        "estimated_cost_per_night": 80,
+        "recommendations": ["Hotel 1", "Hotel 2"]
+    },
+    "transportation": {
+        "type": "Transport type",
+        "estimated_cost": 300,
+        "recommendations": "Transport tips"
+    },
+    "total_estimated_cost": 1000,
+    "budget_breakdown": {
+        "accommodation": 300,
+        "transportation": 200,
+        "food": 250,
+        "activities": 200,
+        "miscellaneous": 50
+    },
+    "tips": ["Tip 1", "Tip 2"],
+    "best_time_to_visit": "Season info",
+    "local_cuisine": ["Food 1", "Food 2"],
+    "cultural_highlights": ["Culture 1", "Culture 2"]
+}
+
+"""
+
+PLAN_REQUEST_TEMPLATE = """Travel Requirements:
+Destinations: {destinations}
+Budget: ${budget}
+Travelers: {travelers} people
+Travel dates: {start_date} to {end_date}
+Preferences: {preferences}
+Notes: {notes}
+
+Make sure the plan fits within ${budget} budget.
+"""
+
+REQUEST_DEFAULTS = {
+    'destinations': '',
+    'budget': 'Not specified',
+    'travelers': 1,
+    'start_date': 'Flexible',
+    'end_date': 'Flexible',
+    'preferences': 'General travel',
+    'notes': 'None'
+}
+
+
+def compile_template(template):
+    """Split a str.format template into (literal, field) pairs once"""
+    return [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+
+
+_REQUEST_PARTS = compile_template(PLAN_REQUEST_TEMPLATE)
+
+
+def build_plan_request(user_input):
+    """Render the per-request section of the prompt"""
+    parts = []
+    for literal, field in _REQUEST_PARTS:
+        parts.append(literal)
+        if field is not None:
+            value = user_input.get(field)
+            parts.append(str(value if value not in (None, '') else REQUEST_DEFAULTS[field]))
+    return ''.join(parts)
+
+
+def build_plan_prompt(user_input):
+    """Full prompt: the static prefix followed by the request section"""
+    return PLAN_PROMPT_PREFIX + build_plan_request(user_input)
+
+
+DAYS_PROMPT_PREFIX = """You are a travel planner extending an existing travel plan with extra days.
+Plan only the requested days: new places and activities that fit the trip below and do not repeat the days already planned.
+
+"""
+
+DAYS_RESPONSE_FORMAT = """Respond with JSON only, in this structure:
+{
+    "itinerary": [
+        {
+            "day": 4,
+            "title": "Day title",
+            "activities": ["Activity 1", "Activity 2"],
+            "estimated_cost": 100
+        }
+    ]
+}
+"""
+
+
+def build_days_prompt(user_input, day_numbers, existing_days):
+    """Prompt for just the listed itinerary days of an existing plan (see plan_updates)"""
+    planned = '\n'.join(
+        f"Day {day.get('day', i + 1)}: {day.get('title', '')}"
+        for i, day in enumerate(existing_days) if isinstance(day, dict)
+    ) or 'None'
+    return (DAYS_PROMPT_PREFIX + build_plan_request(user_input)
+            + f"\nDays already planned:\n{planned}\n\n"
+            + f"Plan days {day_numbers[0]} to {day_numbers[-1]} only.\n"
+            + DAYS_RESPONSE_FORMAT)
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) when the API reports none"""
+    return max(1, len(text) // 4)
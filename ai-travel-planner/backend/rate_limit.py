@@ -0,0 +1,203 @@
+"""Admission control for plan generation: token buckets and a concurrency cap
+
+Each generation request takes tokens from its user's bucket and from a
+global bucket, and holds one of a limited number of in-flight slots while
+it runs. Limiter state lives in a backend: in process memory by default,
+or in SQLite so all worker processes share the same limits.
+"""
+import math
+import threading
+import time
+import uuid
+
+from metrics import Counter
+
+ADMISSION_REJECTIONS = Counter(
+    'travel_planner_admission_rejections', 'Generation requests rejected with 429', ('scope',)
+)
+DEGRADED_ADMISSIONS = Counter(
+    'travel_planner_degraded_admissions', 'Generation requests served a cheap fallback plan because upstream limits were hit'
+)
+
+USER_SCOPES = ('user', 'user_concurrency')
+
+# Seconds before an unreleased in-flight slot (e.g. of a crashed worker) expires
+DEFAULT_SLOT_LEASE = 300
+
+
+class RateLimited(Exception):
+    """Raised when a request is over a limit
+
+    scope is 'user' or 'user_concurrency' for the user's own limits, and
+    'global' or 'concurrency' for the limits shared by everyone.
+    """
+
+    def __init__(self, scope, retry_after):
+        super().__init__(f"Rate limit exceeded: {scope}")
+        self.scope = scope
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_seconds(self):
+        """Whole seconds for the Retry-After header"""
+        return max(1, math.ceil(self.retry_after))
+
+
+def refill(tokens, updated_at, now, rate, burst):
+    """Tokens in a bucket at `now`, given its level at `updated_at`"""
+    return min(burst, tokens + max(0.0, now - updated_at) * rate)
+
+
+def take(tokens, rate, burst, cost):
+    """(new level, None) if cost can be taken, else (tokens, seconds to wait)
+
+    Costs larger than the burst are allowed once the bucket is full and
+    leave it in debt, so big batches are admitted but pay for themselves
+    before the next request.
+    """
+    needed = min(cost, burst)
+    if tokens >= needed:
+        return tokens - cost, None
+    return tokens, (needed - tokens) / rate
+
+
+class MemoryLimiterBackend:
+    """Limiter state for a single process"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, buckets, slots, now, lease):
+        """Take from every bucket and hold every slot, or nothing at all
+
+        buckets are (scope, key, rate, burst, cost) and slots are
+        (scope, key, limit). Returns a slot id for release() (None
+        if no slots were asked for); raises RateLimited.
+        """
+        with self._lock:
+            if slots:
+                self._slots = {
+                    slot_id: slot for slot_id, slot in self._slots.items() if slot[1] > now
+                }
+                for scope, key, limit in slots:
+                    if sum(1 for keys, _ in self._slots.values() if key in keys) >= limit:
+                        raise RateLimited(scope, 1)
+
+            levels = {}
+            for scope, key, rate, burst, cost in buckets:
+                tokens, updated_at = self._buckets.get(key, (burst, now))
+                level, wait = take(refill(tokens, updated_at, now, rate, burst), rate, burst, cost)
+                if wait is not None:
+                    raise RateLimited(scope, wait)
+                levels[key] = (level, now)
+            self._buckets.update(levels)
+
+            if not slots:
+                return None
+            slot_id = uuid.uuid4().hex
+            self._slots[slot_id] = ({key for _, key, _ in slots}, now + lease)
+            return slot_id
+
+    def release(self, slot_id):
+        with self._lock:
+            self._slots.pop(slot_id, None)
+
+
+def create_limiter_backend(backend='memory', database_path=None):
+    """Build the limiter backend (see store.create_stores for the options)"""
+    if backend == 'memory':
+        return MemoryLimiterBackend()
+    if backend == 'sqlite':
+        from sqlite_store import SQLiteDatabase, SQLiteLimiterBackend
+        return SQLiteLimiterBackend(SQLiteDatabase(database_path or 'travel_planner.db'))
+    raise ValueError(f"Unknown limiter backend: {backend}")
+
+
+class Admission:
+    """A granted request; use as a context manager to free its slot when done"""
+
+    def __init__(self, backend, slot_id, degraded=False):
+        self.degraded = degraded
+        self._backend = backend
+        self._slot_id = slot_id
+
+    def release(self):
+        if self._slot_id is not None:
+            self._backend.release(self._slot_id)
+            self._slot_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+        return False
+
+
+class AdmissionController:
+    """Per-user and global token buckets plus in-flight generation caps
+
+    Rates are requests per minute and bursts are bucket sizes; a rate or
+    cap of 0 disables that limit. Requests over their user's limits are
+    always rejected. With degrade=True, requests that only hit the global
+    rate or the global concurrency cap are admitted as degraded instead,
+    still holding a per-user slot, and the caller serves a cheap plan.
+    """
+
+    def __init__(self, backend, user_rate=30, user_burst=10, global_rate=600, global_burst=100,
+                 max_concurrent=32, max_concurrent_per_user=4, degrade=False,
+                 lease=DEFAULT_SLOT_LEASE, clock=time.time):
+        self.backend = backend
+        self.user_rate = user_rate / 60.0
+        self.user_burst = user_burst
+        self.global_rate = global_rate / 60.0
+        self.global_burst = global_burst
+        self.max_concurrent = max_concurrent
+        self.max_concurrent_per_user = max_concurrent_per_user
+        self.degrade = degrade
+        self.lease = lease
+        self.clock = clock
+
+    def admit(self, user_id, cost=1, concurrent=True):
+        """Admit a request of `cost` generations or raise RateLimited
+
+        Set concurrent=False for requests that only enqueue work and so
+        hold no in-flight slot.
+        """
+        user_key = f"user:{user_id}"
+        user_buckets = []
+        if self.user_rate > 0:
+            user_buckets.append(('user', user_key, self.user_rate, self.user_burst, cost))
+        global_buckets = []
+        if self.global_rate > 0:
+            global_buckets.append(('global', 'global', self.global_rate, self.global_burst, cost))
+
+        user_slots = []
+        global_slots = []
+        if concurrent and self.max_concurrent_per_user > 0:
+            user_slots.append(('user_concurrency', user_key, self.max_concurrent_per_user))
+        if concurrent and self.max_concurrent > 0:
+            global_slots.append(('concurrency', 'global', self.max_concurrent))
+
+        now = self.clock()
+        try:
+            slot_id = self.backend.acquire(
+                user_buckets + global_buckets, user_slots + global_slots, now, self.lease
+            )
+            return Admission(self.backend, slot_id)
+        except RateLimited as e:
+            if e.scope in USER_SCOPES or not self.degrade:
+                ADMISSION_REJECTIONS.inc(scope=e.scope)
+                raise
+
+        # Upstream limits are exhausted: still charge the user and hold their
+        # slot, then degrade
+        try:
+            slot_id = self.backend.acquire(user_buckets, user_slots, now, self.lease)
+        except RateLimited as e:
+            ADMISSION_REJECTIONS.inc(scope=e.scope)
+            raise
+        DEGRADED_ADMISSIONS.inc()
+        return Admission(self.backend, slot_id, degraded=True)
@@ -0,0 +1,334 @@
+"""Deadlines, retries, hedged requests and a circuit breaker around Gemini calls
+
+    upstream = ResilientCaller(timeout=30, retries=2, hedge_after='p95', breaker=CircuitBreaker())
+    response = upstream.call(lambda: model.generate_content(prompt))
+
+Each attempt runs on a worker thread and is given up once its timeout
+passes; streamed responses are read through iter_until so the deadline
+also covers the chunks after the first. A Python thread cannot be cancelled, so an abandoned call runs
+to completion in the background and its result is dropped. Failed and
+timed out attempts are retried after a jittered exponential backoff for
+as long as the overall deadline allows.
+
+With hedging on, an attempt still running after hedge_after seconds (or
+after the p95 of recent successful calls, with 'p95') gets one duplicate
+request, and whichever answers first is used.
+
+The circuit breaker opens after failure_threshold failed attempts in a
+row. While it is open, calls raise CircuitOpen at once so the caller can
+serve the mock plan. After reset_timeout one trial call is let through:
+success closes the circuit again, failure keeps it open.
+"""
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from metrics import Counter
+
+UPSTREAM_ATTEMPTS = Counter(
+    'travel_planner_upstream_attempts', 'Gemini call attempts by outcome (success, error or timeout)', ('outcome',)
+)
+UPSTREAM_RETRIES = Counter('travel_planner_upstream_retries', 'Gemini calls retried after a failed attempt')
+UPSTREAM_HEDGES = Counter(
+    'travel_planner_upstream_hedges', 'Duplicate Gemini requests by result (won, lost or failed)', ('result',)
+)
+CIRCUIT_TRANSITIONS = Counter(
+    'travel_planner_circuit_transitions', 'Circuit breaker state changes by new state', ('state',)
+)
+CIRCUIT_REJECTIONS = Counter('travel_planner_circuit_rejections', 'Gemini calls refused while the circuit was open')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 8.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+# Successful calls needed before an adaptive ('p95') hedge delay is used
+MIN_HEDGE_SAMPLES = 20
+LATENCY_SAMPLES = 500
+# Returned by next() once a stream has no more chunks
+_END = object()
+
+
+class UpstreamTimeout(Exception):
+    """Raised when an attempt gets no answer within its timeout"""
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Upstream circuit open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+def parse_hedge_after(value):
+    """None (off), a fixed delay in seconds, or a percentile like 0.95 from 'p95'"""
+    value = (value or '').strip().lower()
+    if value in ('', 'off', 'false', 'none', '0'):
+        return None
+    if value.startswith('p'):
+        return ('percentile', float(value[1:]) / 100)
+    return float(value)
+
+
+class CircuitBreaker:
+    """Closed, open or half-open (see module docstring); failure_threshold=0 disables it"""
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._trial_started = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go ahead now
+
+        Once reset_timeout has passed, a single trial call is allowed; a
+        trial that never reports back is replaced after another
+        reset_timeout.
+        """
+        if not self.failure_threshold:
+            return True
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self._opened_at < self.reset_timeout:
+                    return False
+                self._set_state(HALF_OPEN)
+            if self._trial_started is not None and now - self._trial_started < self.reset_timeout:
+                return False
+            self._trial_started = now
+            return True
+
+    def retry_after(self):
+        """Seconds until the next trial call is allowed (0 when closed)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_started = None
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        if not self.failure_threshold:
+            return
+        with self._lock:
+            self.failures += 1
+            self._trial_started = None
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self.opened += 1
+                self._set_state(OPEN)
+
+    def _set_state(self, state):
+        self.state = state
+        CIRCUIT_TRANSITIONS.inc(state=state)
+
+
+class ResilientCaller:
+    """Runs upstream calls with timeouts, retries, hedging and a circuit breaker
+
+    timeout bounds each attempt and deadline the whole call, retries and
+    backoff waits included (0 for no limit; the deadline defaults to
+    room for every attempt). hedge_after is None, seconds, or a value
+    from parse_hedge_after.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, deadline=None, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 max_backoff=DEFAULT_MAX_BACKOFF, hedge_after=None, breaker=None, max_workers=64):
+        self.timeout = timeout
+        self.deadline = timeout * (retries + 1) if deadline is None else deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker(failure_threshold=0)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='upstream-call')
+        self._random = random.Random()
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+        self.counts = {"calls": 0, "retries": 0, "timeouts": 0, "hedges": 0, "hedge_wins": 0, "rejected": 0}
+
+    def call(self, fn):
+        """fn() with the policies above; raises CircuitOpen, UpstreamTimeout or fn's last error"""
+        self._count('calls')
+        if not self.breaker.allow():
+            self._count('rejected')
+            CIRCUIT_REJECTIONS.inc()
+            raise CircuitOpen(self.breaker.retry_after())
+
+        deadline = time.monotonic() + self.deadline if self.deadline else None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                delay = self._random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+                # No retry once the deadline is too close or the circuit has opened
+                if (deadline is not None and time.monotonic() + delay >= deadline) or not self.breaker.allow():
+                    break
+                self._count('retries')
+                UPSTREAM_RETRIES.inc()
+                time.sleep(delay)
+
+            timeout = self.timeout or None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            try:
+                result = self._attempt(fn, timeout)
+            except Exception as e:
+                error = e
+                self.breaker.record_failure()
+                continue
+            self.breaker.record_success()
+            return result
+        raise error
+
+    def call_deadline(self):
+        """time.monotonic() by which a call started now must finish, or None"""
+        return time.monotonic() + self.deadline if self.deadline else None
+
+    def iter_until(self, chunks, deadline):
+        """Yield from chunks, raising UpstreamTimeout once deadline passes
+
+        Each chunk is waited for on a worker thread, so a stalled stream
+        cannot hold the caller past the deadline.
+        """
+        chunks = iter(chunks)
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            try:
+                if remaining is not None and remaining <= 0:
+                    raise FutureTimeout()
+                future = self._executor.submit(next, chunks, _END)
+                chunk = future.result(timeout=remaining)
+            except FutureTimeout:
+                UPSTREAM_ATTEMPTS.inc(outcome='timeout')
+                self._count('timeouts')
+                self.breaker.record_failure()
+                raise UpstreamTimeout("Upstream stream did not finish within its deadline") from None
+            if chunk is _END:
+                return
+            yield chunk
+
+    def hedge_delay(self):
+        """Seconds after which a slow attempt is hedged, or None"""
+        if self.hedge_after is None:
+            return None
+        if not isinstance(self.hedge_after, tuple):
+            return self.hedge_after
+        _, fraction = self.hedge_after
+        with self._lock:
+            if len(self._latencies) < MIN_HEDGE_SAMPLES:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    def _attempt(self, fn, timeout):
+        """One attempt, plus its hedge if it runs long"""
+        hedge_delay = self.hedge_delay()
+        if timeout is None and hedge_delay is None:
+            try:
+                result = self._timed(fn)
+            except Exception:
+                UPSTREAM_ATTEMPTS.inc(outcome='error')
+                raise
+            UPSTREAM_ATTEMPTS.inc(outcome='success')
+            return result
+
+        started = time.monotonic()
+        end = started + timeout if timeout is not None else None
+        hedge_at = started + hedge_delay if hedge_delay is not None else None
+        if end is not None and hedge_at is not None and hedge_at >= end:
+            hedge_at = None
+        pending = {self._executor.submit(self._timed, fn): 'primary'}
+        hedged = False
+        error = None
+        while pending:
+            wakes = [t for t in (end, hedge_at) if t is not None]
+            done, _ = wait(pending, timeout=max(0.0, min(wakes) - time.monotonic()) if wakes else None,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                role = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    UPSTREAM_ATTEMPTS.inc(outcome='error')
+                    error = e
+                    continue
+                UPSTREAM_ATTEMPTS.inc(outcome='success')
+                if hedged:
+                    UPSTREAM_HEDGES.inc(result='won' if role == 'hedge' else 'lost')
+                    if role == 'hedge':
+                        self._count('hedge_wins')
+                for other in pending:
+                    other.cancel()
+                return result
+
+            now = time.monotonic()
+            if pending and end is not None and now >= end:
+                for future in pending:
+                    future.cancel()
+                UPSTREAM_ATTEMPTS.inc(outcome='timeout')
+                if hedged:
+                    UPSTREAM_HEDGES.inc(result='failed')
+                self._count('timeouts')
+                raise UpstreamTimeout(f"No answer from upstream within {timeout:.1f}s")
+            if pending and hedge_at is not None and now >= hedge_at:
+                pending[self._executor.submit(self._timed, fn)] = 'hedge'
+                hedge_at = None
+                hedged = True
+                self._count('hedges')
+
+        if hedged:
+            UPSTREAM_HEDGES.inc(result='failed')
+        raise error
+
+    def _timed(self, fn):
+        started = time.monotonic()
+        result = fn()
+        with self._lock:
+            self._latencies.append(time.monotonic() - started)
+        return result
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+            latencies = sorted(self._latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 1)
+
+        hedge_delay = self.hedge_delay()
+        return dict(
+            counts,
+            circuit=self.breaker.state,
+            circuit_opened=self.breaker.opened,
+            hedge_delay_ms=None if hedge_delay is None else round(hedge_delay * 1000, 1),
+            p50_call_ms=percentile(0.50),
+            p95_call_ms=percentile(0.95),
+            p99_call_ms=percentile(0.99)
+        )
@@ -0,0 +1,125 @@
+"""Production server: several worker processes sharing one listening socket
+
+The parent binds the port, forks --workers processes that each import the
+app and serve it on a threaded WSGI server, and restarts any worker that
+dies. Workers share nothing in memory, so users, plans, sessions, jobs
+and rate limits all live in the SQLite database (STORAGE_BACKEND=sqlite
+is the default here).
+
+Run from the backend folder (SECRET_KEY, or FLASK_SECRET_KEY from .env,
+is only needed with SESSION_BACKEND=cookie):
+    python serve.py --workers 4 --port 5000
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from sessions import DEFAULT_SECRET_KEY, secret_key_from_env
+
+# Seconds between checks for dead workers
+SUPERVISE_INTERVAL = 0.5
+
+
+def run_worker(fd, host, port):
+    """Worker process: import the app after the fork and serve the shared socket"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from werkzeug.serving import make_server
+    import main
+
+    server = make_server(host, port, main.app, threaded=True, fd=fd)
+    server.serve_forever()
+
+
+def bind(host, port, backlog=1024):
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def prepare_environment(workers):
+    """Shared state for the workers; returns an error message if it is unusable"""
+    # Read .env now, as main.py would, so the checks below see its settings
+    load_dotenv()
+    os.environ.setdefault('STORAGE_BACKEND', 'sqlite')
+    if workers > 1 and os.environ['STORAGE_BACKEND'] != 'sqlite':
+        return "Several workers need STORAGE_BACKEND=sqlite (memory storage is per process)"
+    if workers > 1 and os.getenv('SESSION_BACKEND') in ('memory', 'cookie'):
+        # Cookie sessions work across workers but cannot be revoked on logout
+        print(f"⚠️  SESSION_BACKEND={os.environ['SESSION_BACKEND']}: sessions are not shared server-side")
+    storage_backend = os.environ['STORAGE_BACKEND']
+    session_backend = os.getenv('SESSION_BACKEND', 'sqlite' if storage_backend == 'sqlite' else 'cookie')
+    # Server-side session cookies hold only a random id and are not signed
+    if session_backend == 'cookie' and secret_key_from_env() in (None, DEFAULT_SECRET_KEY):
+        return "SECRET_KEY (or FLASK_SECRET_KEY) must be set to a private value: it signs the session cookies"
+
+    if os.environ['STORAGE_BACKEND'] == 'sqlite':
+        # Create the schema once, before the workers race to open the database
+        from sqlite_store import SQLiteDatabase
+        SQLiteDatabase(os.getenv('DATABASE_PATH', 'travel_planner.db')).close()
+    return None
+
+
+def serve(host, port, workers):
+    error = prepare_environment(workers)
+    if error:
+        print(error, file=sys.stderr)
+        return 1
+
+    sock = bind(host, port)
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        print("⚠️  Worker processes need fork; serving from a single process")
+        run_worker(sock.fileno(), host, port)
+        return 0
+
+    context = multiprocessing.get_context('fork')
+
+    def start_worker():
+        process = context.Process(target=run_worker, args=(sock.fileno(), host, port), daemon=True)
+        process.start()
+        return process
+
+    print(f"🚀 Starting AI Travel Planner API with {workers} workers")
+    print(f"📍 Server running on: http://{host}:{port}")
+    processes = [start_worker() for _ in range(workers)]
+
+    stopping = []
+    def stop(signum, frame):
+        stopping.append(signum)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while not stopping:
+        time.sleep(SUPERVISE_INTERVAL)
+        for i, process in enumerate(processes):
+            if not stopping and not process.is_alive():
+                print(f"Worker {process.pid} exited with {process.exitcode}; restarting")
+                processes[i] = start_worker()
+
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join(timeout=10)
+    sock.close()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default=os.getenv('HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_WORKERS', os.cpu_count() or 1)))
+    args = parser.parse_args()
+    sys.exit(serve(args.host, args.port, args.workers))
+
+
+if __name__ == '__main__':
+    main()
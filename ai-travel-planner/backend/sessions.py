@@ -0,0 +1,141 @@
+"""Server-side sessions: the cookie holds a random id, the data lives in a store
+
+Flask's default sessions keep everything in a signed cookie, so logging
+out cannot revoke a copied cookie. With a ServerSessionInterface the data
+is kept in process memory or in SQLite, and every worker process sharing
+the database sees the same sessions.
+"""
+import os
+import secrets
+import threading
+import time
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+# Expired sessions are purged at most this often (seconds)
+PURGE_INTERVAL = 300
+# Cookie signing key used when none is configured; it is public, so anyone
+# could forge cookies signed with it
+DEFAULT_SECRET_KEY = 'ai_travel_planner_secret_key_2024'
+
+
+def new_session_id():
+    return secrets.token_urlsafe(32)
+
+
+def secret_key_from_env():
+    """SECRET_KEY, or FLASK_SECRET_KEY as in the .env file; None if neither is set"""
+    return os.getenv('SECRET_KEY') or os.getenv('FLASK_SECRET_KEY') or None
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session data plus the id it is stored under (None until first saved)"""
+
+    def __init__(self, initial=None, sid=None):
+        def on_update(session):
+            session.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = sid is None
+        self.modified = False
+        # Logging in or out gets a fresh id (no session fixation)
+        self.user_id_at_open = self.get('user_id')
+
+
+class MemorySessionStore:
+    """Sessions of a single process"""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id, now):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry[1] <= now:
+                return None
+            return dict(entry[0])
+
+    def save(self, session_id, data, expires_at):
+        with self._lock:
+            self._sessions[session_id] = (dict(data), expires_at)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def purge(self, now):
+        with self._lock:
+            self._sessions = {
+                session_id: entry for session_id, entry in self._sessions.items() if entry[1] > now
+            }
+
+
+def create_session_store(backend='memory', database_path=None):
+    """Build the session store (see store.create_stores for the options)"""
+    if backend == 'memory':
+        return MemorySessionStore()
+    if backend == 'sqlite':
+        from sqlite_store import SQLiteDatabase, SQLiteSessionStore
+        return SQLiteSessionStore(SQLiteDatabase(database_path or 'travel_planner.db'))
+    raise ValueError(f"Unknown session backend: {backend}")
+
+
+class ServerSessionInterface(SessionInterface):
+    """Flask session interface backed by a session store
+
+    Sessions expire on the server after app.permanent_session_lifetime;
+    the cookie settings (name, domain, secure, samesite) are Flask's.
+    Sessions are only written when they change.
+    """
+
+    def __init__(self, store, clock=time.time):
+        self.store = store
+        self.clock = clock
+        self._next_purge = 0.0
+
+    def open_session(self, app, request):
+        session_id = request.cookies.get(self.get_cookie_name(app))
+        if session_id:
+            data = self.store.get(session_id, self.clock())
+            if data is not None:
+                return ServerSession(data, sid=session_id)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.sid is not None:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = self.clock()
+        rotate = session.sid is not None and session.get('user_id') != session.user_id_at_open
+        if rotate:
+            self.store.delete(session.sid)
+        if session.sid is None or rotate:
+            session.sid = new_session_id()
+        elif not session.modified:
+            return
+
+        self.store.save(session.sid, dict(session), now + app.permanent_session_lifetime.total_seconds())
+        response.set_cookie(
+            name, session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+        response.vary.add('Cookie')
+
+        if now >= self._next_purge:
+            self._next_purge = now + PURGE_INTERVAL
+            self.store.purge(now)
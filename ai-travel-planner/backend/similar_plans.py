@@ -0,0 +1,240 @@
+"""Nearest-neighbour index over generated plans, to reuse a close match instead of calling Gemini
+
+Each indexed plan is a small feature vector: log budget, travelers, trip
+length in days and a hashed bag of preference words. Vectors live in
+NumPy arrays per destination (the destination has to match exactly), so
+a lookup is one vectorized distance computation over the plans for that
+destination. Plans are added one at a time as they are generated.
+
+    index = SimilarPlanIndex(threshold=0.9)
+    index.add(user_input, plan)
+    match = index.find(other_input)   # (plan rescaled to the new budget, similarity) or None
+
+Similarity is 1 minus a weighted distance in [0, 1]: a doubled budget,
+doubled group or doubled trip length each count as fully different on
+that feature, preferences by cosine distance.
+"""
+import json
+import math
+import re
+import threading
+import time
+import zlib
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:  # optional; without it nothing is indexed
+    np = None
+
+from destinations import get_destination_index
+from metrics import Counter, span
+from multi_destination import split_destinations
+from plan_updates import rescale_budget, trip_days
+
+SIMILAR_PLAN_LOOKUPS = Counter(
+    'travel_planner_similar_plan_lookups', 'Similar-plan index lookups by result (hit or miss)', ('result',)
+)
+
+DEFAULT_THRESHOLD = 0.9
+# Plans kept per destination; the oldest are overwritten once full
+DEFAULT_MAX_PER_DESTINATION = 10000
+PREFERENCE_DIMENSIONS = 16
+# budget, travelers, days, preferences
+FEATURE_WEIGHTS = (0.3, 0.2, 0.3, 0.2)
+LATENCY_SAMPLES = 1000
+
+_WORD_RE = re.compile(r"[a-z]+")
+_LOG2 = math.log(2)
+
+
+def destination_key(destinations):
+    """Canonical destination (dataset key when known, else normalized text)
+
+    None for multi-destination trips, which are not indexed: their plans
+    are merged from per-destination plans, and those are indexed instead.
+    """
+    names = split_destinations(destinations)
+    if len(names) != 1:
+        return None
+    keys = get_destination_index().find_keys(names[0])
+    return keys[0] if keys else ' '.join(names[0].lower().split())
+
+
+def features(user_input):
+    """(log budget, travelers, days or 0, preference vector) of a request, or None if unusable"""
+    try:
+        budget = float(user_input.get('budget'))
+        travelers = float(user_input.get('travelers', 1))
+    except (TypeError, ValueError):
+        return None
+    if budget <= 0 or travelers <= 0:
+        return None
+
+    preferences = user_input.get('preferences') or ''
+    if isinstance(preferences, (list, tuple)):
+        preferences = ' '.join(str(p) for p in preferences)
+    counts = [0.0] * PREFERENCE_DIMENSIONS
+    for word in _WORD_RE.findall(f"{preferences} {user_input.get('notes') or ''}".lower()):
+        counts[zlib.crc32(word.encode()) % PREFERENCE_DIMENSIONS] += 1.0
+    vector = np.array(counts, dtype=np.float32)
+    norm = math.sqrt(sum(count * count for count in counts))
+    if norm:
+        vector /= norm
+    return math.log(budget), travelers, float(trip_days(user_input) or 0), vector
+
+
+class _Shard:
+    """Feature arrays and plans of one destination, grown by doubling"""
+
+    def __init__(self, capacity):
+        self.numeric = np.zeros((capacity, 3), dtype=np.float32)
+        self.preferences = np.zeros((capacity, PREFERENCE_DIMENSIONS), dtype=np.float32)
+        # (plan JSON, budget) per row
+        self.entries = [None] * capacity
+        self.size = 0
+        self.next = 0
+
+    def grow(self, capacity):
+        numeric = np.zeros((capacity, 3), dtype=np.float32)
+        numeric[:self.size] = self.numeric[:self.size]
+        preferences = np.zeros((capacity, PREFERENCE_DIMENSIONS), dtype=np.float32)
+        preferences[:self.size] = self.preferences[:self.size]
+        self.numeric, self.preferences = numeric, preferences
+        self.entries += [None] * (capacity - len(self.entries))
+
+
+class SimilarPlanIndex:
+    """Plans indexed by destination and request features (see module docstring)
+
+    A threshold of 0 disables the index. Plans are stored as JSON text, so
+    every match hands out a fresh copy.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, max_per_destination=DEFAULT_MAX_PER_DESTINATION,
+                 initial_capacity=64):
+        self.threshold = threshold
+        self.max_per_destination = max_per_destination
+        self.initial_capacity = initial_capacity
+        self.enabled = np is not None and threshold > 0
+        self._shards = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def __len__(self):
+        with self._lock:
+            return sum(shard.size for shard in self._shards.values())
+
+    def add(self, user_input, plan):
+        """Index a generated single-destination plan under its request"""
+        if not self.enabled:
+            return
+        key = destination_key(user_input.get('destinations'))
+        vector = features(user_input) if key is not None else None
+        if vector is None:
+            return
+        log_budget, travelers, days, preferences = vector
+        encoded = plan if isinstance(plan, str) else json.dumps(plan, separators=(',', ':'))
+
+        with self._lock:
+            shard = self._shards.get(key)
+            if shard is None:
+                shard = self._shards[key] = _Shard(min(self.initial_capacity, self.max_per_destination))
+            if shard.next == len(shard.entries) and shard.size < self.max_per_destination:
+                shard.grow(min(len(shard.entries) * 2, self.max_per_destination))
+            slot = shard.next
+            shard.numeric[slot] = (log_budget, travelers, days)
+            shard.preferences[slot] = preferences
+            shard.entries[slot] = (encoded, math.exp(log_budget))
+            shard.size = max(shard.size, slot + 1)
+            shard.next = (slot + 1) % self.max_per_destination
+
+    def find(self, user_input):
+        """(closest plan rescaled to this budget, similarity) if above the threshold, else None"""
+        if not self.enabled:
+            return None
+        key = destination_key(user_input.get('destinations'))
+        vector = features(user_input) if key is not None else None
+        if vector is None:
+            return None
+        started = time.perf_counter()
+        with span('similar_lookup'):
+            match = self._nearest(key, vector)
+        self._record(match is not None and match[1] >= self.threshold, time.perf_counter() - started)
+        if match is None or match[1] < self.threshold:
+            return None
+
+        (encoded, budget), similarity = match
+        plan = json.loads(encoded)
+        rescale_budget(plan, math.exp(vector[0]) / budget)
+        return plan, similarity
+
+    def _nearest(self, key, vector):
+        """((plan JSON, its budget), similarity) of the closest plan, or None"""
+        log_budget, travelers, days, preferences = vector
+        with self._lock:
+            shard = self._shards.get(key)
+            if shard is None or shard.size == 0:
+                return None
+            # Distances are computed outside the lock. A lookup racing an
+            # add() may miss the newest plan or, once a full destination
+            # wraps around, score a row as it is overwritten; the entry
+            # returned is still one consistent (plan, budget) pair
+            size = shard.size
+            numeric = shard.numeric[:size]
+            stored_preferences = shard.preferences[:size]
+            entries = shard.entries
+
+        budget_distance = np.minimum(np.abs(numeric[:, 0] - log_budget) / _LOG2, 1.0)
+        group_distance = np.minimum(np.abs(numeric[:, 1] - travelers) / np.maximum(numeric[:, 1], travelers), 1.0)
+        stored_days = numeric[:, 2]
+        if days:
+            day_distance = np.where(stored_days > 0,
+                                    np.abs(stored_days - days) / np.maximum(stored_days, days), 1.0)
+        else:
+            day_distance = (stored_days > 0).astype(np.float32)
+        if preferences.any():
+            preference_distance = 1.0 - stored_preferences @ preferences
+        else:
+            preference_distance = stored_preferences.any(axis=1).astype(np.float32)
+
+        budget_weight, group_weight, day_weight, preference_weight = FEATURE_WEIGHTS
+        distance = (budget_weight * budget_distance + group_weight * group_distance
+                    + day_weight * day_distance + preference_weight * preference_distance)
+        best = int(np.argmin(distance))
+        return entries[best], 1.0 - float(distance[best])
+
+    def _record(self, hit, seconds):
+        SIMILAR_PLAN_LOOKUPS.inc(result='hit' if hit else 'miss')
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._latencies.append(seconds)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            latencies = sorted(self._latencies)
+            size = sum(shard.size for shard in self._shards.values())
+            destinations = len(self._shards)
+            array_bytes = sum(shard.numeric.nbytes + shard.preferences.nbytes for shard in self._shards.values())
+
+        def percentile(fraction):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 3)
+
+        return {
+            "size": size,
+            "destinations": destinations,
+            "array_bytes": array_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "p50_lookup_ms": percentile(0.50),
+            "p95_lookup_ms": percentile(0.95)
+        }
@@ -0,0 +1,68 @@
+"""Coalescing of concurrent identical calls into one execution"""
+import copy
+import threading
+
+from metrics import Counter
+
+COALESCED_CALLS = Counter(
+    'travel_planner_coalesced_calls', 'Calls that waited for an identical call in flight instead of running'
+)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run fn once per key while a call for that key is in flight
+
+    Callers arriving while the leader is still running wait for it and
+    receive their own deep copy of its result (or its exception), so
+    they can modify what they get without affecting each other.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            COALESCED_CALLS.inc()
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return copy.deepcopy(call.result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls)
+            }
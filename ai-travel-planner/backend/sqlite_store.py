@@ -0,0 +1,566 @@
+"""SQLite (WAL) storage for users, travel plans, generation jobs and sessions
+
+Drop-in replacement for the in-memory stores in store.py. Every thread
+gets its own connection, statements are kept as module constants so the
+sqlite3 statement cache reuses the compiled form, and plan JSON is stored
+without whitespace.
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from rate_limit import RateLimited, refill, take
+from store import normalize_email, normalize_mobile
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL DEFAULT '',
+    email_normalized TEXT NOT NULL DEFAULT '',
+    mobile TEXT NOT NULL DEFAULT '',
+    password TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS users_email ON users(email_normalized) WHERE email_normalized != '';
+CREATE UNIQUE INDEX IF NOT EXISTS users_mobile ON users(mobile) WHERE mobile != '';
+
+CREATE TABLE IF NOT EXISTS plans (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    type TEXT NOT NULL DEFAULT '',
+    user_input TEXT NOT NULL,
+    ai_plan TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS plans_user_created ON plans(user_id, created_at);
+CREATE INDEX IF NOT EXISTS plans_user_id ON plans(user_id, id);
+
+CREATE TABLE IF NOT EXISTS plan_set_versions (
+    user_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS plans_insert_version AFTER INSERT ON plans BEGIN
+    INSERT INTO plan_set_versions VALUES (NEW.user_id, 1)
+        ON CONFLICT(user_id) DO UPDATE SET version = version + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS plans_update_version AFTER UPDATE ON plans BEGIN
+    INSERT INTO plan_set_versions VALUES (NEW.user_id, 1)
+        ON CONFLICT(user_id) DO UPDATE SET version = version + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS plans_delete_version AFTER DELETE ON plans BEGIN
+    INSERT INTO plan_set_versions VALUES (OLD.user_id, 1)
+        ON CONFLICT(user_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created_at);
+
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS generation_slots (
+    id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (id, key)
+);
+CREATE INDEX IF NOT EXISTS generation_slots_key ON generation_slots(key, expires_at);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_expires ON sessions(expires_at);
+
+CREATE TABLE IF NOT EXISTS sequences (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO sequences VALUES ('users', (SELECT COALESCE(MAX(id), 0) FROM users));
+INSERT OR IGNORE INTO sequences VALUES ('plans', (SELECT COALESCE(MAX(id), 0) FROM plans));
+
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+-- Random id of this database, set once when the schema is created
+INSERT OR IGNORE INTO metadata VALUES ('database_id', lower(hex(randomblob(4))));
+"""
+
+NEXT_ID = "UPDATE sequences SET value = value + ? WHERE name = ? RETURNING value"
+RAISE_SEQUENCE = "UPDATE sequences SET value = MAX(value, ?) WHERE name = ?"
+SELECT_DATABASE_ID = "SELECT value FROM metadata WHERE key = 'database_id'"
+
+USER_COLUMNS = "id, name, email, mobile, password, created_at"
+INSERT_USER = ("INSERT INTO users (id, name, email, email_normalized, mobile, password, created_at) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?)")
+DELETE_USER = "DELETE FROM users WHERE id = ? RETURNING " + USER_COLUMNS
+SELECT_USER_BY_ID = "SELECT " + USER_COLUMNS + " FROM users WHERE id = ?"
+SELECT_USER_BY_EMAIL = "SELECT " + USER_COLUMNS + " FROM users WHERE email_normalized = ?"
+SELECT_USER_BY_MOBILE = "SELECT " + USER_COLUMNS + " FROM users WHERE mobile = ?"
+SELECT_USERS = "SELECT " + USER_COLUMNS + " FROM users ORDER BY id"
+COUNT_USERS = "SELECT COUNT(*) FROM users"
+
+PLAN_COLUMNS = "id, user_id, created_at, type, user_input, ai_plan"
+INSERT_PLAN = "INSERT INTO plans (" + PLAN_COLUMNS + ") VALUES (?, ?, ?, ?, ?, ?)"
+UPDATE_PLAN = "UPDATE plans SET type = ?, user_input = ?, ai_plan = ? WHERE id = ? AND user_id = ?"
+DELETE_PLAN = "DELETE FROM plans WHERE id = ? RETURNING " + PLAN_COLUMNS
+SELECT_PLAN = "SELECT " + PLAN_COLUMNS + " FROM plans WHERE id = ?"
+SELECT_USER_PLANS = "SELECT " + PLAN_COLUMNS + " FROM plans WHERE user_id = ? ORDER BY id"
+SELECT_USER_PAGE = ("SELECT " + PLAN_COLUMNS + " FROM plans WHERE user_id = ? AND id < ? "
+                    "ORDER BY id DESC LIMIT ?")
+COUNT_PLANS = "SELECT COUNT(*) FROM plans"
+SELECT_PLAN_IDS = "SELECT id FROM plans WHERE id IN ({})"
+SELECT_PLAN_SET_VERSION = "SELECT version FROM plan_set_versions WHERE user_id = ?"
+
+JOB_COLUMNS = ("id, user_id, status, payload, result, error, "
+               "created_at, started_at, finished_at, lease_expires_at")
+INSERT_JOB = "INSERT INTO jobs (" + JOB_COLUMNS + ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+SELECT_JOB = "SELECT " + JOB_COLUMNS + " FROM jobs WHERE id = ?"
+CLAIM_JOB = ("UPDATE jobs SET status = 'running', started_at = ?, lease_expires_at = ? "
+             "WHERE id = ? AND status = 'queued' RETURNING " + JOB_COLUMNS)
+FINISH_JOB = ("UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? "
+              "WHERE id = ? AND status = 'running'")
+CANCEL_JOB = "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'"
+SELECT_JOB_STATUS = "SELECT status FROM jobs WHERE id = ?"
+REQUEUE_EXPIRED_JOBS = ("UPDATE jobs SET status = 'queued', started_at = NULL, lease_expires_at = NULL "
+                        "WHERE status = 'running' AND lease_expires_at < ?")
+TAKE_UNCLAIMED_JOBS = ("UPDATE jobs SET lease_expires_at = ? WHERE status = 'queued' "
+                       "AND (lease_expires_at IS NULL OR lease_expires_at < ?) RETURNING id, created_at")
+DELETE_FINISHED_JOBS = ("DELETE FROM jobs WHERE status IN ('succeeded', 'failed', 'cancelled') "
+                        "AND finished_at < ?")
+
+SELECT_BUCKET = "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?"
+UPSERT_BUCKET = ("INSERT INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                 "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at")
+COUNT_SLOTS = "SELECT COUNT(*) FROM generation_slots WHERE key = ? AND expires_at > ?"
+INSERT_SLOT = "INSERT INTO generation_slots (id, key, expires_at) VALUES (?, ?, ?)"
+DELETE_SLOT = "DELETE FROM generation_slots WHERE id = ?"
+DELETE_EXPIRED_SLOTS = "DELETE FROM generation_slots WHERE expires_at <= ?"
+
+SELECT_SESSION = "SELECT data FROM sessions WHERE id = ? AND expires_at > ?"
+UPSERT_SESSION = ("INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?) "
+                  "ON CONFLICT(id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at")
+DELETE_SESSION = "DELETE FROM sessions WHERE id = ?"
+DELETE_EXPIRED_SESSIONS = "DELETE FROM sessions WHERE expires_at <= ?"
+
+
+# SQLite's default limit on ? parameters per statement (before 3.32)
+MAX_QUERY_PARAMETERS = 999
+EXPORT_BATCH_SIZE = 1000
+
+
+def dump_json(value):
+    """Compact JSON encoding used for stored plan documents"""
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+
+class SQLiteDatabase:
+    """Per-thread connection pool for one SQLite database file"""
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        """Return the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+            self._enable_wal(conn)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _enable_wal(self, conn):
+        # Switching a new database to WAL is not covered by the busy timeout,
+        # so retry while other processes are opening it at the same time
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                return
+            except sqlite3.OperationalError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.01)
+
+    def execute(self, sql, params=()):
+        return self.connection().execute(sql, params)
+
+    def next_id(self, sequence):
+        """Atomically allocate the next id, also across processes"""
+        return self.execute(NEXT_ID, (1, sequence)).fetchone()[0]
+
+    def next_ids(self, sequence, count):
+        """Atomically allocate a block of count ids (a range)"""
+        last = self.execute(NEXT_ID, (count, sequence)).fetchone()[0]
+        return range(last - count + 1, last + 1)
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def _user_from_row(row):
+    if row is None:
+        return None
+    return dict(zip(('id', 'name', 'email', 'mobile', 'password', 'created_at'), row))
+
+
+def _plan_from_row(row):
+    if row is None:
+        return None
+    plan_id, user_id, created_at, plan_type, user_input, ai_plan = row
+    return {
+        "id": plan_id,
+        "user_id": user_id,
+        "user_input": json.loads(user_input),
+        "ai_plan": json.loads(ai_plan),
+        "created_at": created_at,
+        "type": plan_type
+    }
+
+
+class SQLiteUserStore:
+    """UserStore backed by the users table"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __len__(self):
+        return self.db.execute(COUNT_USERS).fetchone()[0]
+
+    def __iter__(self):
+        return (_user_from_row(row) for row in self.db.execute(SELECT_USERS))
+
+    def next_id(self):
+        return self.db.next_id('users')
+
+    def add(self, user):
+        try:
+            self.db.execute(INSERT_USER, (
+                user['id'],
+                user['name'],
+                user.get('email') or '',
+                normalize_email(user.get('email')),
+                normalize_mobile(user.get('mobile')),
+                user['password'],
+                user['created_at']
+            ))
+        except sqlite3.IntegrityError as e:
+            message = str(e)
+            if 'email' in message:
+                raise ValueError("Email already registered") from e
+            if 'mobile' in message:
+                raise ValueError("Mobile number already registered") from e
+            raise ValueError(f"Duplicate user id: {user['id']}") from e
+        return user
+
+    def remove(self, user_id):
+        return _user_from_row(self.db.execute(DELETE_USER, (user_id,)).fetchone())
+
+    def get(self, user_id):
+        return _user_from_row(self.db.execute(SELECT_USER_BY_ID, (user_id,)).fetchone())
+
+    def find_by_email(self, email):
+        email = normalize_email(email)
+        if not email:
+            return None
+        return _user_from_row(self.db.execute(SELECT_USER_BY_EMAIL, (email,)).fetchone())
+
+    def find_by_mobile(self, mobile):
+        mobile = normalize_mobile(mobile)
+        if not mobile:
+            return None
+        return _user_from_row(self.db.execute(SELECT_USER_BY_MOBILE, (mobile,)).fetchone())
+
+
+class SQLitePlanStore:
+    """PlanStore backed by the plans table"""
+
+    def __init__(self, db):
+        self.db = db
+        # Versions restart with a recreated database, so tag them with its id
+        self._database_id = db.execute(SELECT_DATABASE_ID).fetchone()[0]
+
+    def __len__(self):
+        return self.db.execute(COUNT_PLANS).fetchone()[0]
+
+    def next_id(self):
+        return self.db.next_id('plans')
+
+    def next_ids(self, count):
+        return self.db.next_ids('plans', count)
+
+    def add(self, plan):
+        try:
+            self.db.execute(INSERT_PLAN, (
+                plan['id'],
+                plan['user_id'],
+                plan['created_at'],
+                plan.get('type', ''),
+                dump_json(plan['user_input']),
+                dump_json(plan['ai_plan'])
+            ))
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"Duplicate plan id: {plan['id']}") from e
+        return plan
+
+    def add_many(self, plans):
+        """Insert a batch of plans in one transaction (see PlanStore.add_many)"""
+        conn = self.db.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            taken = set()
+            ids = [plan['id'] for plan in plans]
+            for start in range(0, len(ids), MAX_QUERY_PARAMETERS):
+                chunk = ids[start:start + MAX_QUERY_PARAMETERS]
+                sql = SELECT_PLAN_IDS.format(','.join('?' * len(chunk)))
+                taken.update(row[0] for row in conn.execute(sql, chunk))
+
+            skipped, rows = [], []
+            for position, plan in enumerate(plans):
+                if plan['id'] in taken:
+                    skipped.append(position)
+                    continue
+                taken.add(plan['id'])
+                rows.append((
+                    plan['id'],
+                    plan['user_id'],
+                    plan['created_at'],
+                    plan.get('type', ''),
+                    dump_json(plan['user_input']),
+                    dump_json(plan['ai_plan'])
+                ))
+            conn.executemany(INSERT_PLAN, rows)
+            if rows:
+                # Ids from next_id() must stay above every imported id
+                conn.execute(RAISE_SEQUENCE, (max(row[0] for row in rows), 'plans'))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return skipped
+
+    def update(self, plan):
+        cursor = self.db.execute(UPDATE_PLAN, (
+            plan.get('type', ''),
+            dump_json(plan['user_input']),
+            dump_json(plan['ai_plan']),
+            plan['id'],
+            plan['user_id']
+        ))
+        return plan if cursor.rowcount else None
+
+    def get(self, plan_id, user_id=None):
+        plan = _plan_from_row(self.db.execute(SELECT_PLAN, (plan_id,)).fetchone())
+        if plan is None or (user_id is not None and plan['user_id'] != user_id):
+            return None
+        return plan
+
+    def remove(self, plan_id):
+        return _plan_from_row(self.db.execute(DELETE_PLAN, (plan_id,)).fetchone())
+
+    def list_for_user(self, user_id):
+        return [_plan_from_row(row) for row in self.db.execute(SELECT_USER_PLANS, (user_id,))]
+
+    def export_plans(self, user_id=None, created_from=None, created_to=None, batch_size=EXPORT_BATCH_SIZE):
+        """Plans matching the filters, in id order (see PlanStore.export_plans)
+
+        Rows are read batch_size at a time, each batch a fresh query after
+        the last id seen, so no read transaction stays open during a long
+        export. The stored JSON columns are copied into the output as is.
+        """
+        conditions, params = ["id > ?"], []
+        if user_id is not None:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+        if created_from:
+            conditions.append("created_at >= ?")
+            params.append(created_from)
+        if created_to:
+            conditions.append("created_at < ?")
+            params.append(created_to)
+        sql = ("SELECT " + PLAN_COLUMNS + " FROM plans WHERE " + " AND ".join(conditions)
+               + " ORDER BY id LIMIT ?")
+
+        last_id = -2 ** 63
+        while True:
+            rows = self.db.execute(sql, (last_id, *params, batch_size)).fetchall()
+            for plan_id, owner, created_at, plan_type, user_input, ai_plan in rows:
+                yield (f'{{"id":{plan_id},"user_id":{owner},"user_input":{user_input},"ai_plan":{ai_plan},'
+                       f'"created_at":{dump_json(created_at)},"type":{dump_json(plan_type)}}}')
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    def page_for_user(self, user_id, limit, cursor=None):
+        # Fetch one extra row to know whether another page follows
+        rows = self.db.execute(SELECT_USER_PAGE, (
+            user_id,
+            cursor if cursor is not None else 2 ** 63 - 1,
+            limit + 1
+        )).fetchall()
+        plans = [_plan_from_row(row) for row in rows[:limit]]
+        next_cursor = plans[-1]['id'] if len(rows) > limit else None
+        return plans, next_cursor
+
+    def version_for_user(self, user_id):
+        """Opaque token that changes whenever the user's plans change
+
+        Kept up to date by triggers, so writes from every process count.
+        """
+        row = self.db.execute(SELECT_PLAN_SET_VERSION, (user_id,)).fetchone()
+        return f"{self._database_id}.{row[0] if row else 0}"
+
+
+def _job_from_row(row):
+    if row is None:
+        return None
+    job = dict(zip(('id', 'user_id', 'status', 'payload', 'result', 'error',
+                    'created_at', 'started_at', 'finished_at', 'lease_expires_at'), row))
+    job['payload'] = json.loads(job['payload'])
+    job['result'] = json.loads(job['result']) if job['result'] is not None else None
+    return job
+
+
+class SQLiteJobStore:
+    """JobStore backed by the jobs table
+
+    Queued jobs outlive the process, and running jobs whose lease expired
+    (their worker died) are put back in the queue by recover(). Queued
+    jobs are leased too, to the process whose queue holds them, so only
+    one process recovers each.
+    """
+
+    durable = True
+
+    def __init__(self, db):
+        self.db = db
+
+    def add(self, job):
+        self.db.execute(INSERT_JOB, (
+            job['id'], job['user_id'], job['status'], dump_json(job['payload']),
+            None, None, job['created_at'], None, None, job.get('lease_expires_at')
+        ))
+        return job
+
+    def get(self, job_id):
+        return _job_from_row(self.db.execute(SELECT_JOB, (job_id,)).fetchone())
+
+    def claim(self, job_id, started_at, lease_expires_at):
+        return _job_from_row(self.db.execute(CLAIM_JOB, (started_at, lease_expires_at, job_id)).fetchone())
+
+    def finish(self, job_id, status, finished_at, result=None, error=None):
+        self.db.execute(FINISH_JOB, (
+            status, finished_at, dump_json(result) if result is not None else None, error, job_id
+        ))
+
+    def cancel(self, job_id, finished_at):
+        self.db.execute(CANCEL_JOB, (finished_at, job_id))
+        row = self.db.execute(SELECT_JOB_STATUS, (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def recover(self, now, lease_expires_at):
+        self.db.execute(REQUEUE_EXPIRED_JOBS, (now,))
+        rows = self.db.execute(TAKE_UNCLAIMED_JOBS, (lease_expires_at, now)).fetchall()
+        return [job_id for job_id, _ in sorted(rows, key=lambda row: row[1])]
+
+    def purge(self, finished_before):
+        self.db.execute(DELETE_FINISHED_JOBS, (finished_before,))
+
+
+class SQLiteLimiterBackend:
+    """Rate limiter state shared by every process using the database
+
+    Same contract as rate_limit.MemoryLimiterBackend. Each acquire runs in
+    one write transaction, so concurrent workers never both take the last
+    token or slot.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def acquire(self, buckets, slots, now, lease):
+        conn = self.db.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if slots:
+                conn.execute(DELETE_EXPIRED_SLOTS, (now,))
+                for scope, key, limit in slots:
+                    if conn.execute(COUNT_SLOTS, (key, now)).fetchone()[0] >= limit:
+                        raise RateLimited(scope, 1)
+
+            levels = []
+            for scope, key, rate, burst, cost in buckets:
+                row = conn.execute(SELECT_BUCKET, (key,)).fetchone()
+                tokens, updated_at = row if row else (burst, now)
+                level, wait = take(refill(tokens, updated_at, now, rate, burst), rate, burst, cost)
+                if wait is not None:
+                    raise RateLimited(scope, wait)
+                levels.append((key, level, now))
+            conn.executemany(UPSERT_BUCKET, levels)
+
+            slot_id = uuid.uuid4().hex if slots else None
+            conn.executemany(INSERT_SLOT, [(slot_id, key, now + lease) for _, key, _ in slots])
+            conn.execute("COMMIT")
+            return slot_id
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def release(self, slot_id):
+        self.db.execute(DELETE_SLOT, (slot_id,))
+
+
+class SQLiteSessionStore:
+    """Session store shared by every process using the database
+
+    Same contract as sessions.MemorySessionStore.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def get(self, session_id, now):
+        row = self.db.execute(SELECT_SESSION, (session_id, now)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id, data, expires_at):
+        self.db.execute(UPSERT_SESSION, (session_id, dump_json(data), expires_at))
+
+    def delete(self, session_id):
+        self.db.execute(DELETE_SESSION, (session_id,))
+
+    def purge(self, now):
+        self.db.execute(DELETE_EXPIRED_SESSIONS, (now,))
@@ -0,0 +1,390 @@
+"""In-memory storage for users, travel plans and generation jobs"""
+import json
+import threading
+import uuid
+from bisect import bisect_left, insort
+
+from plan_records import PlanRecord, SharedPool
+
+
+def normalize_email(email):
+    """Canonical form used for email lookups"""
+    return (email or '').strip().lower()
+
+
+def normalize_mobile(mobile):
+    """Canonical form used for mobile lookups"""
+    return (mobile or '').strip()
+
+
+class IdAllocator:
+    """Monotonic ids that are never handed out twice, safe across threads"""
+
+    def __init__(self, last=0):
+        self._last = last
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            self._last += 1
+            return self._last
+
+    def take(self, count):
+        """A block of count consecutive ids, as a range"""
+        with self._lock:
+            first = self._last + 1
+            self._last += count
+            return range(first, self._last + 1)
+
+    def observe(self, used_id):
+        """Keep later ids above an id that was assigned elsewhere"""
+        with self._lock:
+            if used_id > self._last:
+                self._last = used_id
+
+
+class UserStore:
+    """User records indexed by id, normalized email and mobile
+
+    Writes take one lock, since email and mobile must be unique across
+    all users; lookups read the indexes without locking.
+    """
+
+    def __init__(self):
+        self._by_id = {}
+        self._by_email = {}
+        self._by_mobile = {}
+        self._ids = IdAllocator()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(list(self._by_id.values()))
+
+    def next_id(self):
+        return self._ids.next()
+
+    def add(self, user):
+        """Insert a user and index it by id, email and mobile"""
+        email = normalize_email(user.get('email'))
+        mobile = normalize_mobile(user.get('mobile'))
+        with self._lock:
+            if user['id'] in self._by_id:
+                raise ValueError(f"Duplicate user id: {user['id']}")
+            if email and email in self._by_email:
+                raise ValueError("Email already registered")
+            if mobile and mobile in self._by_mobile:
+                raise ValueError("Mobile number already registered")
+
+            self._by_id[user['id']] = user
+            if email:
+                self._by_email[email] = user
+            if mobile:
+                self._by_mobile[mobile] = user
+        self._ids.observe(user['id'])
+        return user
+
+    def remove(self, user_id):
+        """Delete a user and drop its index entries"""
+        with self._lock:
+            user = self._by_id.pop(user_id, None)
+            if user is None:
+                return None
+
+            email = normalize_email(user.get('email'))
+            mobile = normalize_mobile(user.get('mobile'))
+            if email and self._by_email.get(email) is user:
+                del self._by_email[email]
+            if mobile and self._by_mobile.get(mobile) is user:
+                del self._by_mobile[mobile]
+        return user
+
+    def get(self, user_id):
+        return self._by_id.get(user_id)
+
+    def find_by_email(self, email):
+        email = normalize_email(email)
+        return self._by_email.get(email) if email else None
+
+    def find_by_mobile(self, mobile):
+        mobile = normalize_mobile(mobile)
+        return self._by_mobile.get(mobile) if mobile else None
+
+
+class _Partition:
+    """The plan ids and version of the users whose ids hash to one stripe"""
+
+    __slots__ = ('lock', 'ids_by_user', 'versions')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids_by_user = {}
+        self.versions = {}
+
+
+class PlanStore:
+    """Travel plans indexed by id and by owning user
+
+    Plans are kept as compact PlanRecords sharing repeated destination
+    data (see plan_records); reads return fresh dicts of the usual shape.
+    Pass compact=False to keep the dicts as given instead.
+
+    Safe to use from many threads. Users are spread over `stripes`
+    partitions, each with its own lock, so writes for different users
+    rarely wait on each other; the id index is a plain dict, whose single
+    operations are atomic.
+    """
+
+    def __init__(self, compact=True, stripes=16):
+        self._pool = SharedPool() if compact else None
+        self._by_id = {}
+        self._partitions = [_Partition() for _ in range(stripes)]
+        self._ids = IdAllocator()
+        # Versions restart with the process, so tag them with this instance
+        self._epoch = uuid.uuid4().hex[:8]
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def next_id(self):
+        """Allocate a plan id that is never reused, even after deletes"""
+        return self._ids.next()
+
+    def next_ids(self, count):
+        """Allocate a block of count plan ids at once (a range)"""
+        return self._ids.take(count)
+
+    def _partition(self, user_id):
+        return self._partitions[hash(user_id) % len(self._partitions)]
+
+    def add(self, plan):
+        """Insert a plan and index it under its owner"""
+        record = PlanRecord(plan, self._pool) if self._pool is not None else plan
+        partition = self._partition(plan['user_id'])
+        with partition.lock:
+            if self._by_id.setdefault(plan['id'], record) is not record:
+                self._release(record)
+                raise ValueError(f"Duplicate plan id: {plan['id']}")
+            insort(partition.ids_by_user.setdefault(plan['user_id'], []), plan['id'])
+            partition.versions[plan['user_id']] = partition.versions.get(plan['user_id'], 0) + 1
+        self._ids.observe(plan['id'])
+        return plan
+
+    def add_many(self, plans):
+        """Insert a batch of plans, skipping those whose id is taken
+
+        Returns the positions in `plans` of the skipped plans.
+        """
+        skipped = []
+        for position, plan in enumerate(plans):
+            try:
+                self.add(plan)
+            except ValueError:
+                skipped.append(position)
+        return skipped
+
+    def update(self, plan):
+        """Replace a stored plan (same id and owner); None if there is none"""
+        record = PlanRecord(plan, self._pool) if self._pool is not None else plan
+        partition = self._partition(plan['user_id'])
+        with partition.lock:
+            current = self._by_id.get(plan['id'])
+            if current is None or self._owner(current) != plan['user_id']:
+                self._release(record)
+                return None
+            self._by_id[plan['id']] = record
+            partition.versions[plan['user_id']] = partition.versions.get(plan['user_id'], 0) + 1
+        self._release(current)
+        return plan
+
+    def get(self, plan_id, user_id=None):
+        """Return a plan, optionally only if it belongs to user_id"""
+        plan = self._by_id.get(plan_id)
+        if plan is None or (user_id is not None and self._owner(plan) != user_id):
+            return None
+        return self._output(plan)
+
+    def remove(self, plan_id):
+        """Delete a plan without touching other users' data"""
+        plan = self._by_id.get(plan_id)
+        if plan is None:
+            return None
+
+        user_id = self._owner(plan)
+        partition = self._partition(user_id)
+        with partition.lock:
+            if self._by_id.get(plan_id) is not plan:
+                return None
+            del self._by_id[plan_id]
+            ids = partition.ids_by_user[user_id]
+            del ids[bisect_left(ids, plan_id)]
+            if not ids:
+                del partition.ids_by_user[user_id]
+            partition.versions[user_id] = partition.versions.get(user_id, 0) + 1
+        self._release(plan)
+        return self._output(plan)
+
+    def _release(self, plan):
+        """Give back a record's shared values once it is no longer stored"""
+        if isinstance(plan, PlanRecord):
+            plan.release(self._pool)
+
+    @staticmethod
+    def _owner(plan):
+        return plan.user_id if isinstance(plan, PlanRecord) else plan['user_id']
+
+    @staticmethod
+    def _output(plan):
+        return plan.to_dict() if isinstance(plan, PlanRecord) else plan
+
+    def version_for_user(self, user_id):
+        """Opaque token that changes whenever the user's plans change"""
+        return f"{self._epoch}.{self._partition(user_id).versions.get(user_id, 0)}"
+
+    def _user_ids(self, user_id):
+        partition = self._partition(user_id)
+        with partition.lock:
+            return list(partition.ids_by_user.get(user_id, ()))
+
+    def _plans(self, plan_ids):
+        # Records are copied out after the partition lock is released;
+        # a plan deleted in the meantime is simply left out
+        plans = []
+        for plan_id in plan_ids:
+            plan = self._by_id.get(plan_id)
+            if plan is not None:
+                plans.append(self._output(plan))
+        return plans
+
+    def list_for_user(self, user_id):
+        """All plans of a user, oldest first"""
+        return self._plans(self._user_ids(user_id))
+
+    def export_plans(self, user_id=None, created_from=None, created_to=None):
+        """Plans matching the filters, in id order, each as compact JSON text
+
+        created_from is inclusive and created_to exclusive; both are ISO
+        8601 strings compared with created_at as text. Only the plan ids
+        are copied up front: plans added meanwhile are left out and plans
+        deleted meanwhile are skipped.
+        """
+        plan_ids = self._user_ids(user_id) if user_id is not None else sorted(self._by_id)
+        for plan_id in plan_ids:
+            plan = self._by_id.get(plan_id)
+            if plan is None:
+                continue
+            created_at = (plan.created_at if isinstance(plan, PlanRecord) else plan.get('created_at')) or ''
+            if (created_from and created_at < created_from) or (created_to and created_at >= created_to):
+                continue
+            yield json.dumps(self._output(plan), separators=(',', ':'), ensure_ascii=False)
+
+    def page_for_user(self, user_id, limit, cursor=None):
+        """Newest-first page of a user's plans older than the cursor plan id
+
+        Returns (plans, next_cursor); next_cursor is None on the last page.
+        """
+        partition = self._partition(user_id)
+        with partition.lock:
+            ids = partition.ids_by_user.get(user_id, [])
+            end = len(ids) if cursor is None else bisect_left(ids, cursor)
+            start = max(0, end - limit)
+            page = ids[start:end]
+            next_cursor = ids[start] if start > 0 else None
+        return self._plans(reversed(page)), next_cursor
+
+
+def create_stores(backend='memory', database_path=None):
+    """Build the (users, travel_plans) stores for the configured backend
+
+    'memory' keeps everything in process (the default, used for tests);
+    'sqlite' persists to database_path and can be shared between workers.
+    """
+    if backend == 'memory':
+        return UserStore(), PlanStore()
+    if backend == 'sqlite':
+        from sqlite_store import SQLiteDatabase, SQLitePlanStore, SQLiteUserStore
+        db = SQLiteDatabase(database_path or 'travel_planner.db')
+        return SQLiteUserStore(db), SQLitePlanStore(db)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+class JobStore:
+    """Background generation jobs, kept in process memory"""
+
+    durable = False
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def add(self, job):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def claim(self, job_id, started_at, lease_expires_at):
+        """Move a queued job to running; None if someone else got it first"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] != 'queued':
+                return None
+            job.update(status='running', started_at=started_at, lease_expires_at=lease_expires_at)
+            return dict(job)
+
+    def finish(self, job_id, status, finished_at, result=None, error=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job['status'] == 'running':
+                job.update(status=status, finished_at=finished_at, result=result, error=error)
+
+    def cancel(self, job_id, finished_at):
+        """Cancel a queued job and return its resulting status"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job['status'] == 'queued':
+                job.update(status='cancelled', finished_at=finished_at)
+            return job['status']
+
+    def recover(self, now, lease_expires_at):
+        """Lease out the queued jobs no queue holds, oldest first, and return their ids
+
+        Running jobs whose lease expired are queued again first. Nothing
+        survives a restart in memory.
+        """
+        with self._lock:
+            jobs = []
+            for job in self._jobs.values():
+                expired = (job.get('lease_expires_at') or 0) < now
+                if job['status'] == 'running' and expired:
+                    job.update(status='queued', started_at=None, lease_expires_at=None)
+                if job['status'] == 'queued' and expired:
+                    job['lease_expires_at'] = lease_expires_at
+                    jobs.append(job)
+            return [job['id'] for job in sorted(jobs, key=lambda job: job['created_at'])]
+
+    def purge(self, finished_before):
+        """Drop finished, failed and cancelled jobs that ended before finished_before"""
+        with self._lock:
+            self._jobs = {
+                job_id: job for job_id, job in self._jobs.items()
+                if job['status'] in ('queued', 'running') or job['finished_at'] >= finished_before
+            }
+
+
+def create_job_store(backend='memory', database_path=None):
+    """Build the job store for the configured backend (see create_stores)"""
+    if backend == 'memory':
+        return JobStore()
+    if backend == 'sqlite':
+        from sqlite_store import SQLiteDatabase, SQLiteJobStore
+        return SQLiteJobStore(SQLiteDatabase(database_path or 'travel_planner.db'))
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,101 @@
+"""render() output checked against the Prometheus text exposition format"""
+import math
+import re
+
+import pytest
+
+import metrics
+from metrics import MOCK_FALLBACKS, Counter, Gauge, Histogram, render
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+# Sample names each metric type may use, as suffixes of its family name
+SAMPLE_SUFFIXES = {'counter': ('',), 'gauge': ('',), 'histogram': ('_bucket', '_sum', '_count')}
+
+
+def parse(text):
+    """{family: {"type", "help", "samples": [(name, labels, value)]}}; asserts the format holds"""
+    families, family = {}, None
+    for line in text.splitlines():
+        if line.startswith('# HELP '):
+            family, help_text = line[len('# HELP '):].split(' ', 1)
+            assert family not in families, f"{family} declared twice"
+            families[family] = {"help": help_text, "type": None, "samples": []}
+        elif line.startswith('# TYPE '):
+            name, kind = line[len('# TYPE '):].split(' ')
+            assert name == family, f"TYPE {name} does not follow its HELP"
+            families[family]['type'] = kind
+        else:
+            match = SAMPLE.match(line)
+            assert match, f"not a sample line: {line!r}"
+            name, labels, value = match.groups()
+            kind = families[family]['type']
+            assert any(name == family + suffix for suffix in SAMPLE_SUFFIXES[kind]), \
+                f"sample {name} does not belong to {kind} {family}"
+            families[family]['samples'].append((name, dict(LABEL.findall(labels or '')), float(value)))
+    return families
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    """Metrics created by a test leave the global registry when it ends"""
+    monkeypatch.setattr(metrics, '_metrics', list(metrics._metrics))
+
+
+def test_counters_are_declared_with_the_total_suffix():
+    counter = Counter('test_render_requests', 'Requests', ('route',))
+    counter.inc(route='/a')
+    counter.inc(2, route='/b "quoted"')
+
+    families = parse(render())
+
+    assert 'test_render_requests' not in families
+    family = families['test_render_requests_total']
+    assert family['type'] == 'counter'
+    assert family['samples'] == [
+        ('test_render_requests_total', {'route': '/a'}, 1.0),
+        ('test_render_requests_total', {'route': '/b \\"quoted\\"'}, 2.0)
+    ]
+
+
+def test_unlabelled_counter_renders_zero_before_first_increment():
+    Counter('test_render_idle', 'Never incremented')
+
+    family = parse(render())['test_render_idle_total']
+
+    assert family['samples'] == [('test_render_idle_total', {}, 0.0)]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('test_render_seconds', 'Durations', ('stage',), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, stage='x')
+
+    samples = parse(render())['test_render_seconds']['samples']
+
+    buckets = [(labels['le'], value) for name, labels, value in samples if name == 'test_render_seconds_bucket']
+    assert buckets == [('0.1', 1.0), ('1.0', 2.0), ('+Inf', 3.0)]
+    assert ('test_render_seconds_count', {'stage': 'x'}, 3.0) in samples
+    total = next(value for name, _, value in samples if name == 'test_render_seconds_sum')
+    assert math.isclose(total, 5.55)
+
+
+def test_gauge_and_application_metrics_parse():
+    Gauge('test_render_depth', 'Queue depth', lambda: 7)
+    MOCK_FALLBACKS.inc(reason='not_configured')
+
+    families = parse(render())
+
+    assert families['test_render_depth']['samples'] == [('test_render_depth', {}, 7.0)]
+    assert families['travel_planner_mock_fallbacks_total']['type'] == 'counter'
+    assert all(family['type'] for family in families.values())
+
+
+def test_gauge_without_a_value_has_no_sample():
+    Gauge('test_render_pending', 'Not measured yet', lambda: None)
+
+    assert parse(render())['test_render_pending']['samples'] == []
+
+
+def test_metrics_from_other_tests_are_not_registered():
+    assert not [metric.name for metric in metrics._metrics if metric.name.startswith('test_')]
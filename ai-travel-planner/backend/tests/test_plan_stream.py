@@ -0,0 +1,87 @@
+"""PlanStreamParser recovery of model output and skipped itinerary days"""
+import json
+
+from plan_stream import PlanStreamParser, parse_plan_text
+
+PLAN = {
+    "destination": {"name": "Kyoto", "country": "Japan"},
+    "itinerary": [
+        {"day": 1, "title": "Temples", "activities": ["Kinkaku-ji"], "estimated_cost": 40},
+        {"day": 2, "title": "Gardens", "activities": ["Ryoan-ji"], "estimated_cost": "35"}
+    ],
+    "total_estimated_cost": 900,
+    "tips": ["Buy a bus pass"]
+}
+
+
+def stream(text, size):
+    parser = PlanStreamParser()
+    events = []
+    for i in range(0, len(text), size):
+        events += parser.feed(text[i:i + size])
+    return parser, events, parser.finish()
+
+
+def test_events_do_not_depend_on_chunk_size():
+    text = json.dumps(PLAN, indent=2)
+    parser, whole, plan = stream(text, len(text))
+
+    for size in (1, 7, 64):
+        assert stream(text, size)[1] == whole
+    assert [event for event, _ in whole] == ['destination', 'day', 'day', 'total_estimated_cost', 'tips']
+    assert parser.done and not parser.errors
+    assert plan['itinerary'][1]['estimated_cost'] == 35
+
+
+def test_prose_fences_and_json_mistakes_are_repaired():
+    text = ('Here is your plan:\n```json\n{"destination": {"name": "Kyoto",},\n'
+            '"itinerary": [{"day": 1, "title": "Temples", "activities": ["Kinkaku-ji",], "estimated_cost": 40,},],\n'
+            '"best_time_to_visit": "Autumn", // spring is busy\n"tips": None}\n```\nEnjoy!')
+    parser, events, plan = stream(text, 5)
+
+    assert parser.done
+    assert plan['destination'] == {"name": "Kyoto"}
+    assert plan['itinerary'][0]['activities'] == ["Kinkaku-ji"]
+    assert plan['best_time_to_visit'] == "Autumn"
+    assert parser.errors == ["tips: invalid value"]
+
+
+def test_invalid_days_are_skipped_and_counted():
+    document = dict(PLAN, itinerary=["rest day", PLAN['itinerary'][0], 3, {"title": "No number"}])
+    parser, events, plan = stream(json.dumps(document), 16)
+
+    assert [day['title'] for day in plan['itinerary']] == ["Temples", "No number"]
+    assert plan['itinerary'][1]['day'] == 2
+    assert parser.skipped_days == 2
+    assert parser.errors == ["itinerary[0]: invalid day", "itinerary[2]: invalid day"]
+
+
+def test_truncated_document_keeps_complete_days():
+    text = json.dumps(PLAN)
+    cut = text.index('"Gardens"')
+    parser, events, plan = stream(text[:cut], 10)
+
+    assert not parser.done
+    assert [day['title'] for day in plan['itinerary']] == ["Temples"]
+    assert parser.errors == ["truncated: document ended before its closing brace"]
+
+
+def test_parse_plan_text_takes_the_same_recovery_paths():
+    plan, errors, complete, skipped_days = parse_plan_text(json.dumps(PLAN))
+    assert complete and not errors and not skipped_days
+    assert len(plan['itinerary']) == 2
+
+    plan, errors, complete, skipped_days = parse_plan_text(json.dumps(PLAN)[:-1])
+    assert not complete
+    assert len(plan['itinerary']) == 2
+
+
+def test_parse_plan_text_counts_skipped_days_on_both_paths():
+    document = dict(PLAN, itinerary=[PLAN['itinerary'][0], "free day", None])
+
+    whole = parse_plan_text(json.dumps(document))
+    truncated = parse_plan_text(json.dumps(document)[:-1])
+
+    assert whole[1] == ["itinerary[1]: invalid day", "itinerary[2]: invalid day"]
+    assert whole[3] == truncated[3] == 2
+    assert whole[2] and not truncated[2]
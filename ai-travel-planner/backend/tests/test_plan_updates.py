@@ -0,0 +1,100 @@
+"""Re-dating, extending and shortening itineraries with plan_update/apply_update"""
+from plan_updates import apply_update, needs_generation, plan_update
+
+OLD_INPUT = {'destinations': 'Lisbon', 'budget': '1000', 'travelers': 2,
+             'start_date': '2024-03-01', 'end_date': '2024-03-03'}
+
+
+def old_plan():
+    return {
+        "destination": {"name": "Lisbon"},
+        "itinerary": [
+            {"day": n, "date": f"2024-03-0{n}", "title": f"Old {n}", "activities": [], "estimated_cost": 10}
+            for n in (1, 2, 3)
+        ],
+        "total_estimated_cost": 900,
+        "budget_breakdown": {"accommodation": 500, "food": 400}
+    }
+
+
+def generate_days(user_input, day_numbers, existing_days):
+    return [{"day": n, "title": f"New {n}", "activities": [], "estimated_cost": 0} for n in day_numbers]
+
+
+def not_called(*args):
+    raise AssertionError("unexpected generation")
+
+
+def update_to(**changes):
+    new_input = dict(OLD_INPUT, **changes)
+    plan = old_plan()
+    update = plan_update(plan, OLD_INPUT, new_input)
+    return update, apply_update(plan, new_input, update, not_called, generate_days)
+
+
+def summary(plan):
+    return [(day['day'], day['date'], day['title']) for day in plan['itinerary']]
+
+
+def test_moved_trip_keeps_every_day_and_re_dates_it():
+    update, (plan, report) = update_to(start_date='2024-03-10', end_date='2024-03-12')
+
+    assert not needs_generation(update)
+    assert summary(plan) == [(1, '2024-03-10', 'Old 1'), (2, '2024-03-11', 'Old 2'), (3, '2024-03-12', 'Old 3')]
+    assert report['kept_days'] == [1, 2, 3]
+    assert report['added_days'] == report['removed_days'] == []
+
+
+def test_earlier_start_adds_days_at_the_start_only():
+    update, (plan, report) = update_to(start_date='2024-02-28')
+
+    assert update['start_change'] == 2
+    assert needs_generation(update)
+    assert summary(plan) == [
+        (1, '2024-02-28', 'New 1'), (2, '2024-02-29', 'New 2'),
+        (3, '2024-03-01', 'Old 1'), (4, '2024-03-02', 'Old 2'), (5, '2024-03-03', 'Old 3')
+    ]
+    assert report['added_days'] == [1, 2]
+    assert report['kept_days'] == [3, 4, 5]
+
+
+def test_later_start_and_end_remove_and_add_at_each_end():
+    update, (plan, report) = update_to(start_date='2024-03-02', end_date='2024-03-04')
+
+    # Same length but shifted by a day: it only moves
+    assert summary(plan) == [(1, '2024-03-02', 'Old 1'), (2, '2024-03-03', 'Old 2'), (3, '2024-03-04', 'Old 3')]
+
+    update, (plan, report) = update_to(start_date='2024-03-02', end_date='2024-03-05')
+
+    assert update['start_change'] == -1
+    assert summary(plan) == [
+        (1, '2024-03-02', 'Old 2'), (2, '2024-03-03', 'Old 3'), (3, '2024-03-04', 'New 3'), (4, '2024-03-05', 'New 4')
+    ]
+    assert report['removed_days'] == [1]
+    assert report['added_days'] == [3, 4]
+
+
+def test_earlier_end_removes_days_at_the_end():
+    update, (plan, report) = update_to(end_date='2024-03-02')
+
+    assert not needs_generation(update)
+    assert summary(plan) == [(1, '2024-03-01', 'Old 1'), (2, '2024-03-02', 'Old 2')]
+    assert report['removed_days'] == [3]
+
+
+def test_budget_change_rescales_without_generation():
+    update, (plan, report) = update_to(budget=2000)
+
+    assert not needs_generation(update)
+    assert plan['total_estimated_cost'] == 1800
+    assert plan['budget_breakdown'] == {"accommodation": 1000, "food": 800}
+    assert report['recomputed'] == ['budget_breakdown', 'total_estimated_cost']
+
+
+def test_new_destination_regenerates():
+    new_input = dict(OLD_INPUT, destinations='Porto')
+    update = plan_update(old_plan(), OLD_INPUT, new_input)
+    plan, report = apply_update(old_plan(), new_input, update, lambda user_input: {"itinerary": []}, not_called)
+
+    assert update['regenerate'] and report['regenerated']
+    assert plan == {"itinerary": []}
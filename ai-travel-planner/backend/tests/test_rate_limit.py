@@ -0,0 +1,93 @@
+"""Token buckets, concurrency caps and degrade mode of AdmissionController"""
+import pytest
+
+from rate_limit import AdmissionController, RateLimited, create_limiter_backend
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    return create_limiter_backend(request.param, str(tmp_path / 'limits.db'))
+
+
+def controller(backend, clock, **limits):
+    options = dict(user_rate=60, user_burst=2, global_rate=0, max_concurrent=0, max_concurrent_per_user=0)
+    options.update(limits)
+    return AdmissionController(backend, clock=clock, **options)
+
+
+def test_user_bucket_refills_over_time(backend):
+    clock = Clock()
+    limits = controller(backend, clock)
+    limits.admit('a')
+    limits.admit('a')
+
+    with pytest.raises(RateLimited) as e:
+        limits.admit('a')
+    assert e.value.scope == 'user'
+    assert e.value.retry_after == pytest.approx(1.0)
+
+    limits.admit('b')
+    clock.now += 1.0
+    limits.admit('a')
+
+
+def test_batches_larger_than_the_burst_leave_the_bucket_in_debt(backend):
+    clock = Clock()
+    limits = controller(backend, clock)
+    limits.admit('a', cost=5)
+
+    with pytest.raises(RateLimited) as e:
+        limits.admit('a')
+    assert e.value.retry_after == pytest.approx(4.0)
+
+
+def test_concurrency_slots_are_held_until_release(backend):
+    limits = controller(backend, Clock(), user_rate=0, max_concurrent_per_user=1)
+    admission = limits.admit('a')
+
+    with pytest.raises(RateLimited) as e:
+        limits.admit('a')
+    assert e.value.scope == 'user_concurrency'
+    limits.admit('a', concurrent=False).release()
+
+    admission.release()
+    with limits.admit('a'):
+        pass
+
+
+def test_global_limit_rejects_without_degrade(backend):
+    limits = controller(backend, Clock(), global_rate=60, global_burst=1)
+    limits.admit('a')
+
+    with pytest.raises(RateLimited) as e:
+        limits.admit('b')
+    assert e.value.scope == 'global'
+
+
+def test_degrade_admits_over_the_global_limit_but_not_the_user_limit(backend):
+    limits = controller(backend, Clock(), user_burst=1, global_rate=60, global_burst=1, degrade=True)
+
+    assert not limits.admit('a').degraded
+    assert limits.admit('b').degraded
+    with pytest.raises(RateLimited) as e:
+        limits.admit('a')
+    assert e.value.scope == 'user'
+
+
+def test_degraded_admissions_still_hold_the_user_slot(backend):
+    limits = controller(backend, Clock(), user_rate=0, max_concurrent=1, max_concurrent_per_user=1, degrade=True)
+    limits.admit('a')
+    degraded = limits.admit('b')
+
+    assert degraded.degraded
+    with pytest.raises(RateLimited) as e:
+        limits.admit('b')
+    assert e.value.scope == 'user_concurrency'
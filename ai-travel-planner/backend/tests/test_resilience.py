@@ -0,0 +1,115 @@
+"""CircuitBreaker state changes and ResilientCaller deadlines"""
+import threading
+
+import pytest
+
+import resilience
+from resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen, ResilientCaller, UpstreamTimeout
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience, 'time', clock)
+    return clock
+
+
+def test_opens_after_threshold_failures_in_a_row(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.retry_after() == 30
+
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.opened == 2
+    assert not breaker.allow()
+
+
+def test_stalled_trial_is_replaced(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+
+    clock.now += 30
+    assert breaker.allow()
+
+
+def test_threshold_zero_never_opens(clock):
+    breaker = CircuitBreaker(failure_threshold=0)
+    for _ in range(10):
+        breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_open_circuit_rejects_calls():
+    caller = ResilientCaller(timeout=0, retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=30))
+
+    def fail():
+        raise ValueError("upstream down")
+
+    with pytest.raises(ValueError):
+        caller.call(fail)
+    with pytest.raises(CircuitOpen) as e:
+        caller.call(fail)
+    assert e.value.retry_after > 0
+    assert caller.stats()['rejected'] == 1
+
+
+def test_iter_until_stops_a_stalled_stream():
+    stalled = threading.Event()
+
+    def chunks():
+        yield 'a'
+        stalled.wait(5)
+        yield 'b'
+
+    caller = ResilientCaller(timeout=0.05, retries=0)
+    received = []
+    with pytest.raises(UpstreamTimeout):
+        for chunk in caller.iter_until(chunks(), caller.call_deadline()):
+            received.append(chunk)
+    stalled.set()
+
+    assert received == ['a']
+    assert caller.stats()['timeouts'] == 1
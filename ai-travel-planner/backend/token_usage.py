@@ -0,0 +1,54 @@
+"""Per prompt version accounting of Gemini tokens and latency"""
+import threading
+
+from prompts import estimate_tokens
+
+
+def usage_from_response(response, prompt, response_text):
+    """(input_tokens, output_tokens, cached_tokens, estimated) for one call
+
+    Uses the usage metadata Gemini reports when the SDK exposes it and
+    falls back to a character based estimate otherwise.
+    """
+    usage = getattr(response, 'usage_metadata', None)
+    input_tokens = getattr(usage, 'prompt_token_count', None)
+    output_tokens = getattr(usage, 'candidates_token_count', None)
+    if input_tokens is None or output_tokens is None:
+        return estimate_tokens(prompt), estimate_tokens(response_text), 0, True
+    return input_tokens, output_tokens, getattr(usage, 'cached_content_token_count', 0) or 0, False
+
+
+class TokenUsage:
+    """Running totals of tokens and latency for each prompt version"""
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def record(self, version, input_tokens, output_tokens, latency, cached_tokens=0, estimated=False):
+        with self._lock:
+            totals = self._versions.setdefault(version, {
+                "requests": 0,
+                "estimated_requests": 0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "cached_tokens": 0,
+                "latency": 0.0
+            })
+            totals['requests'] += 1
+            totals['estimated_requests'] += 1 if estimated else 0
+            totals['input_tokens'] += input_tokens
+            totals['output_tokens'] += output_tokens
+            totals['cached_tokens'] += cached_tokens
+            totals['latency'] += latency
+
+    def stats(self):
+        """Totals and per-request averages, keyed by prompt version"""
+        with self._lock:
+            versions = {version: dict(totals) for version, totals in self._versions.items()}
+        for totals in versions.values():
+            requests = totals['requests']
+            totals['avg_input_tokens'] = round(totals['input_tokens'] / requests, 1)
+            totals['avg_output_tokens'] = round(totals['output_tokens'] / requests, 1)
+            totals['avg_latency_ms'] = round(totals.pop('latency') / requests * 1000, 1)
+        return versions